@@ -1,11 +1,19 @@
 """Core Agent implementation."""
 
 import asyncio
+import uuid
 from dataclasses import dataclass, field
 from typing import Any, AsyncGenerator, Callable, Awaitable
 
-from honolulu.models.base import ModelProvider, ModelResponse, StreamChunk, ToolCall
+from honolulu.context import ContextWindow
+from honolulu.models.ledger import current_turn
+from honolulu.models.ratelimit import current_session
+from honolulu.models.router import ModelRouter
+from honolulu.models.base import APIMessage, ModelProvider, ModelResponse, StreamChunk, ToolCall
+from honolulu.models.streaming import TextAssembler
+from honolulu.tokens import UsageTracker, estimate_request_tokens
 from honolulu.tools.base import ToolManager, ToolResult
+from honolulu.tools.result_store import ReadResultTool, ResultStore, current_result_store
 
 
 @dataclass
@@ -53,13 +61,50 @@ class Agent:
         tool_manager: ToolManager,
         system_prompt: str | None = None,
         max_iterations: int = 50,
+        parallel_tools: bool = False,
+        max_concurrent_tools: int = 4,
+        pipeline_tools: bool = False,
+        max_tokens: int = 4096,
+        context_window: ContextWindow | None = None,
+        result_store: ResultStore | None = None,
+        attachment_resolver: Callable[[dict], dict | None] | None = None,
+        session_id: str | None = None,
     ):
         self.model = model
+        # Routers and the ledger attribute this agent's model requests to it
+        self.session_id = session_id or uuid.uuid4().hex
         self.tool_manager = tool_manager
         self.system_prompt = system_prompt or self._default_system_prompt()
         self.max_iterations = max_iterations
+        self.max_tokens = max_tokens
+        # Keeps requests within the model's token budget (None = unbounded)
+        self.context_window = context_window
+        # Out-of-band storage for oversized tool outputs
+        self.result_store = result_store
+        if result_store and tool_manager.get(ReadResultTool.name) is None:
+            # Shared catalogs register it once; it finds this store through
+            # current_result_store while this agent's tools run
+            tool_manager.register(ReadResultTool())
+        # Expands attachment handles ({"id": ...}) into inline content
+        self.attachment_resolver = attachment_resolver
+        self.parallel_tools = parallel_tools
+        # Start auto-approved tools as soon as their tool_use block closes
+        self.pipeline_tools = pipeline_tools
+        self._tool_semaphore = asyncio.Semaphore(max(1, max_concurrent_tools))
         self.messages: list[dict] = []
 
+        # Append-only API-format view of self.messages
+        self._api_messages: list[dict] = []
+        self._api_source: list[dict] = self.messages
+        self._converted_count = 0
+
+        # Token accounting for this session
+        self.usage = UsageTracker()
+        # Turn counter, requests are attributed to (session, turn) in the ledger
+        self.turn = 0
+        # Prompt of the current turn, passed to routers as the task hint
+        self._task_hint: str | None = None
+
         # Confirmation callback (set by server)
         self.confirm_callback: ConfirmCallback | None = None
 
@@ -100,6 +145,17 @@ class Agent:
 
         # Add attachments first (images, then documents)
         for attachment in attachments:
+            if self.attachment_resolver:
+                resolved = self.attachment_resolver(attachment)
+                if resolved is None:
+                    filename = attachment.get("filename", "attachment")
+                    content.append({
+                        "type": "text",
+                        "text": f"[Attachment unavailable: {filename}]",
+                    })
+                    continue
+                attachment = resolved
+
             if attachment.get("type") == "image":
                 # Claude Vision format for images
                 content.append({
@@ -129,65 +185,110 @@ class Agent:
         return content
 
     def _convert_messages_for_api(self) -> list[dict]:
-        """Convert internal messages to API format."""
-        api_messages = []
-
-        for msg in self.messages:
-            if msg["role"] == "user":
-                content = self._build_user_content(msg)
-                api_messages.append({"role": "user", "content": content})
-            elif msg["role"] == "assistant":
-                content = []
-                if msg.get("content"):
-                    content.append({"type": "text", "text": msg["content"]})
-                if msg.get("tool_calls"):
-                    for tc in msg["tool_calls"]:
-                        content.append(
-                            {
-                                "type": "tool_use",
-                                "id": tc["id"],
-                                "name": tc["name"],
-                                "input": tc["arguments"],
-                            }
-                        )
-                api_messages.append({"role": "assistant", "content": content})
-            elif msg["role"] == "tool":
-                # Tool results need to be in user message with tool_result type
-                # Find if there's already a user message with tool results
-                if (
-                    api_messages
-                    and api_messages[-1]["role"] == "user"
-                    and isinstance(api_messages[-1]["content"], list)
-                    and api_messages[-1]["content"]
-                    and api_messages[-1]["content"][0].get("type") == "tool_result"
-                ):
-                    api_messages[-1]["content"].append(
-                        {
-                            "type": "tool_result",
-                            "tool_use_id": msg["tool_call_id"],
-                            "content": str(msg["content"]),
-                        }
-                    )
-                else:
-                    api_messages.append(
+        """Convert internal messages to API format.
+
+        The converted history is append-only, so only messages added since the
+        previous call are translated. Returns a shallow copy of the cached view.
+        """
+        if self._api_source is not self.messages or self._converted_count > len(self.messages):
+            # History was replaced or truncated from outside, rebuild from scratch
+            self._reset_api_messages()
+
+        for msg in self.messages[self._converted_count :]:
+            self._append_api_message(msg)
+        self._converted_count = len(self.messages)
+
+        return list(self._api_messages)
+
+    def _append_api_message(self, msg: dict) -> None:
+        """Translate one internal message onto the end of the API view."""
+        api_messages = self._api_messages
+
+        if msg["role"] == "user":
+            content = self._build_user_content(msg)
+            api_messages.append(APIMessage(role="user", content=content))
+        elif msg["role"] == "assistant":
+            content = []
+            if msg.get("content"):
+                content.append({"type": "text", "text": msg["content"]})
+            if msg.get("tool_calls"):
+                for tc in msg["tool_calls"]:
+                    content.append(
                         {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "tool_result",
-                                    "tool_use_id": msg["tool_call_id"],
-                                    "content": str(msg["content"]),
-                                }
-                            ],
+                            "type": "tool_use",
+                            "id": tc["id"],
+                            "name": tc["name"],
+                            "input": tc["arguments"],
                         }
                     )
+            api_messages.append(APIMessage(role="assistant", content=content))
+        elif msg["role"] == "tool":
+            block = {
+                "type": "tool_result",
+                "tool_use_id": msg["tool_call_id"],
+                "content": str(msg["content"]),
+            }
+            # Tool results need to be in user message with tool_result type
+            # Find if there's already a user message with tool results
+            if (
+                api_messages
+                and api_messages[-1]["role"] == "user"
+                and isinstance(api_messages[-1]["content"], list)
+                and api_messages[-1]["content"]
+                and api_messages[-1]["content"][0].get("type") == "tool_result"
+            ):
+                # Replace rather than mutate, earlier snapshots may still be in use
+                api_messages[-1] = APIMessage(
+                    role="user",
+                    content=api_messages[-1]["content"] + [block],
+                )
+            else:
+                api_messages.append(APIMessage(role="user", content=[block]))
+
+    def _prepare_request(self) -> dict[str, Any]:
+        """Build the model call arguments for the current history."""
+        tools = self.tool_manager.get_tool_definitions()
+        messages = self._convert_messages_for_api()
+        if self.context_window:
+            messages = self.context_window.fit(messages, self.system_prompt, tools)
+            self.usage.last_request_estimate = self.context_window.last_estimate
+        else:
+            self.usage.last_request_estimate = estimate_request_tokens(
+                messages, tools, self.system_prompt
+            )
+
+        request: dict[str, Any] = {
+            "messages": messages,
+            "tools": tools,
+            "system": self.system_prompt,
+            "max_tokens": self.max_tokens,
+        }
+        if isinstance(self.model, ModelRouter):
+            request["task_hint"] = self._task_hint
+        return request
+
+    def _bind_session(self) -> None:
+        """Make this agent's session and turn current for the run's model requests.
+
+        Set in the caller's context, so tool tasks and sub-agents started by
+        the run inherit them.
+        """
+        current_session.set(self.session_id)
+        current_turn.set(self.turn)
 
-        return api_messages
+    def _reset_api_messages(self) -> None:
+        """Drop the converted API view so it is rebuilt on next use."""
+        self._api_messages = []
+        self._api_source = self.messages
+        self._converted_count = 0
 
     async def run(self, user_message: str) -> AsyncGenerator[AgentEvent, None]:
         """Run the agent with a user message, yielding events."""
         # Add user message
         self.messages.append({"role": "user", "content": user_message})
+        self.turn += 1
+        self._task_hint = user_message
+        self._bind_session()
 
         yield AgentEvent(type="thinking", content="Processing your request...")
 
@@ -197,15 +298,13 @@ class Agent:
 
             # Call the model
             try:
-                response = await self.model.call(
-                    messages=self._convert_messages_for_api(),
-                    tools=self.tool_manager.get_tool_definitions(),
-                    system=self.system_prompt,
-                )
+                response = await self.model.call(**self._prepare_request())
             except Exception as e:
                 yield AgentEvent(type="error", content=str(e))
                 return
 
+            self._record_usage(response.usage, response.provider)
+
             # Emit text content
             if response.content:
                 yield AgentEvent(type="text", content=response.content)
@@ -227,74 +326,8 @@ class Agent:
                 return
 
             # Process tool calls
-            for tool_call in response.tool_calls:
-                # Emit tool call event
-                requires_confirm = self.tool_manager.requires_confirmation(tool_call.name)
-                # Skip confirmation if user already allowed all for this tool
-                if tool_call.name in self.auto_allowed_tools:
-                    requires_confirm = False
-
-                yield AgentEvent(
-                    type="tool_call",
-                    tool_name=tool_call.name,
-                    tool_args=tool_call.arguments,
-                    tool_call_id=tool_call.id,
-                    requires_confirmation=requires_confirm,
-                )
-
-                # Request confirmation if needed
-                if requires_confirm:
-                    yield AgentEvent(
-                        type="confirm_request",
-                        tool_name=tool_call.name,
-                        tool_args=tool_call.arguments,
-                        tool_call_id=tool_call.id,
-                    )
-
-                    # Wait for confirmation
-                    if self.confirm_callback:
-                        allowed = await self.confirm_callback(
-                            tool_call.id,
-                            tool_call.name,
-                            tool_call.arguments,
-                        )
-                        if not allowed:
-                            # User denied, add a denial message
-                            self.messages.append(
-                                {
-                                    "role": "tool",
-                                    "tool_call_id": tool_call.id,
-                                    "content": "User denied this tool execution.",
-                                }
-                            )
-                            yield AgentEvent(
-                                type="tool_result",
-                                tool_call_id=tool_call.id,
-                                content={"denied": True},
-                            )
-                            continue
-
-                # Execute the tool
-                result = await self.tool_manager.execute(
-                    tool_call.name,
-                    tool_call.arguments,
-                )
-
-                # Add tool result to messages
-                self.messages.append(
-                    {
-                        "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "content": str(result.output) if result.success else str(result.error),
-                    }
-                )
-
-                yield AgentEvent(
-                    type="tool_result",
-                    tool_call_id=tool_call.id,
-                    tool_name=tool_call.name,
-                    content=result.to_dict(),
-                )
+            async for event in self._process_tool_calls(response.tool_calls):
+                yield event
 
         # Max iterations reached
         yield AgentEvent(
@@ -316,12 +349,16 @@ class Agent:
                 - type: "image" or "document"
                 - For images: content_type, base64
                 - For documents: filename, text
+                With an attachment_resolver, an id is enough.
         """
         # Add user message with optional attachments
         msg: dict[str, Any] = {"role": "user", "content": user_message}
         if attachments:
             msg["attachments"] = attachments
         self.messages.append(msg)
+        self.turn += 1
+        self._task_hint = user_message
+        self._bind_session()
 
         yield AgentEvent(type="thinking", content="Processing your request...")
 
@@ -331,36 +368,59 @@ class Agent:
 
             # Use streaming API
             try:
-                accumulated_text = ""
+                accumulated_text = TextAssembler()
                 tool_calls: list[ToolCall] = []
                 current_tool_call: ToolCall | None = None
+                # Tools launched before the stream finished, a prefix of tool_calls
+                started: list[asyncio.Task[ToolResult]] = []
 
-                async for chunk in self.model.stream(
-                    messages=self._convert_messages_for_api(),
-                    tools=self.tool_manager.get_tool_definitions(),
-                    system=self.system_prompt,
-                ):
+                async for chunk in self.model.stream(**self._prepare_request()):
                     if chunk.type == "text":
                         # Emit text delta for streaming
-                        accumulated_text += chunk.content
+                        accumulated_text.append(chunk.content)
                         yield AgentEvent(type="text_delta", content=chunk.content)
 
                     elif chunk.type == "tool_use_start":
                         current_tool_call = chunk.tool_call
 
+                    elif chunk.type == "usage":
+                        self._record_usage(chunk.usage, chunk.provider)
+
                     elif chunk.type == "tool_use_end":
                         if chunk.tool_call:
                             tool_calls.append(chunk.tool_call)
+                            # Overlap tool latency with the rest of the generation
+                            if self.pipeline_tools and len(started) == len(tool_calls) - 1:
+                                if self.tool_manager.can_run_concurrently(chunk.tool_call.name):
+                                    started.append(
+                                        asyncio.create_task(self._execute_tool(chunk.tool_call))
+                                    )
+                                    yield AgentEvent(
+                                        type="tool_call",
+                                        tool_name=chunk.tool_call.name,
+                                        tool_args=chunk.tool_call.arguments,
+                                        tool_call_id=chunk.tool_call.id,
+                                    )
                         current_tool_call = None
 
             except Exception as e:
+                self._cancel_tasks(started)
                 yield AgentEvent(type="error", content=str(e))
                 return
+            except BaseException:
+                # Generator closed or run cancelled mid-stream
+                self._cancel_tasks(started)
+                if accumulated_text:
+                    # Keep the partial answer the user already saw
+                    self.messages.append(
+                        {"role": "assistant", "content": accumulated_text.text()}
+                    )
+                raise
 
             # Add assistant message with accumulated content
             assistant_msg: dict[str, Any] = {"role": "assistant"}
             if accumulated_text:
-                assistant_msg["content"] = accumulated_text
+                assistant_msg["content"] = accumulated_text.text()
             if tool_calls:
                 assistant_msg["tool_calls"] = [
                     {"id": tc.id, "name": tc.name, "arguments": tc.arguments}
@@ -370,76 +430,233 @@ class Agent:
 
             # If no tool calls, we're done
             if not tool_calls:
-                yield AgentEvent(type="done", content=accumulated_text)
+                yield AgentEvent(type="done", content=accumulated_text.text())
                 return
 
             # Process tool calls (same as non-streaming version)
-            for tool_call in tool_calls:
-                requires_confirm = self.tool_manager.requires_confirmation(tool_call.name)
-                if tool_call.name in self.auto_allowed_tools:
-                    requires_confirm = False
+            async for event in self._process_tool_calls(tool_calls, started):
+                yield event
 
+        yield AgentEvent(
+            type="error",
+            content=f"Agent reached maximum iterations ({self.max_iterations})",
+        )
+
+    async def _process_tool_calls(
+        self,
+        tool_calls: list[ToolCall],
+        started: list[asyncio.Task[ToolResult]] | None = None,
+    ) -> AsyncGenerator[AgentEvent, None]:
+        """Execute the tool calls of one model turn, yielding events.
+
+        If the run is cancelled part-way, every call of the turn still gets a
+        tool result, so the history stays valid for the next request.
+        """
+        dispatch = self._dispatch_tool_calls(tool_calls, started)
+        try:
+            async for event in dispatch:
+                yield event
+        except BaseException:
+            await dispatch.aclose()
+            self._close_tool_calls(tool_calls)
+            raise
+
+    async def _dispatch_tool_calls(
+        self,
+        tool_calls: list[ToolCall],
+        started: list[asyncio.Task[ToolResult]] | None = None,
+    ) -> AsyncGenerator[AgentEvent, None]:
+        """Run tool calls in order, concurrently where allowed.
+
+        Results are always recorded in the original tool_use order. In parallel
+        mode, consecutive calls that need no confirmation run concurrently;
+        confirming tools act as barriers and keep their sequential semantics.
+        ``started`` holds tasks already launched while streaming, one per
+        leading call; their tool_call events have been emitted.
+        """
+        if started:
+            try:
+                for tool_call, task in zip(tool_calls, started):
+                    result = await task
+                    await self._record_tool_result(tool_call, result)
+                    yield AgentEvent(
+                        type="tool_result",
+                        tool_call_id=tool_call.id,
+                        tool_name=tool_call.name,
+                        content=result.to_dict(),
+                    )
+            finally:
+                self._cancel_tasks(started)
+            tool_calls = tool_calls[len(started) :]
+
+        if self.parallel_tools:
+            batches = self._batch_tool_calls(tool_calls)
+        else:
+            batches = [[tool_call] for tool_call in tool_calls]
+
+        for batch in batches:
+            if len(batch) == 1:
+                async for event in self._process_tool_call(batch[0]):
+                    yield event
+                continue
+
+            for tool_call in batch:
                 yield AgentEvent(
                     type="tool_call",
                     tool_name=tool_call.name,
                     tool_args=tool_call.arguments,
                     tool_call_id=tool_call.id,
-                    requires_confirmation=requires_confirm,
                 )
 
-                if requires_confirm:
+            tasks = [asyncio.create_task(self._execute_tool(tc)) for tc in batch]
+            try:
+                for tool_call, task in zip(batch, tasks):
+                    result = await task
+                    await self._record_tool_result(tool_call, result)
                     yield AgentEvent(
-                        type="confirm_request",
-                        tool_name=tool_call.name,
-                        tool_args=tool_call.arguments,
+                        type="tool_result",
                         tool_call_id=tool_call.id,
+                        tool_name=tool_call.name,
+                        content=result.to_dict(),
                     )
+            finally:
+                self._cancel_tasks(tasks)
+
+    async def _process_tool_call(self, tool_call: ToolCall) -> AsyncGenerator[AgentEvent, None]:
+        """Confirm (if needed) and execute a single tool call."""
+        requires_confirm = self.tool_manager.requires_confirmation(tool_call.name)
+        # Skip confirmation if user already allowed all for this tool
+        if tool_call.name in self.auto_allowed_tools:
+            requires_confirm = False
 
-                    if self.confirm_callback:
-                        allowed = await self.confirm_callback(
-                            tool_call.id,
-                            tool_call.name,
-                            tool_call.arguments,
-                        )
-                        if not allowed:
-                            self.messages.append(
-                                {
-                                    "role": "tool",
-                                    "tool_call_id": tool_call.id,
-                                    "content": "User denied this tool execution.",
-                                }
-                            )
-                            yield AgentEvent(
-                                type="tool_result",
-                                tool_call_id=tool_call.id,
-                                content={"denied": True},
-                            )
-                            continue
-
-                # Execute the tool
-                result = await self.tool_manager.execute(
+        yield AgentEvent(
+            type="tool_call",
+            tool_name=tool_call.name,
+            tool_args=tool_call.arguments,
+            tool_call_id=tool_call.id,
+            requires_confirmation=requires_confirm,
+        )
+
+        # Request confirmation if needed
+        if requires_confirm:
+            yield AgentEvent(
+                type="confirm_request",
+                tool_name=tool_call.name,
+                tool_args=tool_call.arguments,
+                tool_call_id=tool_call.id,
+            )
+
+            # Wait for confirmation
+            if self.confirm_callback:
+                allowed = await self.confirm_callback(
+                    tool_call.id,
                     tool_call.name,
                     tool_call.arguments,
                 )
+                if not allowed:
+                    # User denied, add a denial message
+                    self.messages.append(
+                        {
+                            "role": "tool",
+                            "tool_call_id": tool_call.id,
+                            "content": "User denied this tool execution.",
+                        }
+                    )
+                    yield AgentEvent(
+                        type="tool_result",
+                        tool_call_id=tool_call.id,
+                        content={"denied": True},
+                    )
+                    return
+
+        result = await self._execute_tool(tool_call)
+        await self._record_tool_result(tool_call, result)
 
+        yield AgentEvent(
+            type="tool_result",
+            tool_call_id=tool_call.id,
+            tool_name=tool_call.name,
+            content=result.to_dict(),
+        )
+
+    def _batch_tool_calls(self, tool_calls: list[ToolCall]) -> list[list[ToolCall]]:
+        """Group consecutive concurrency-safe calls; other calls stand alone."""
+        batches: list[list[ToolCall]] = []
+        current: list[ToolCall] = []
+
+        for tool_call in tool_calls:
+            if self.tool_manager.can_run_concurrently(tool_call.name):
+                current.append(tool_call)
+                continue
+            if current:
+                batches.append(current)
+                current = []
+            batches.append([tool_call])
+
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _execute_tool(self, tool_call: ToolCall) -> ToolResult:
+        """Execute a tool, bounded by the session's concurrency cap."""
+        async with self._tool_semaphore:
+            token = current_result_store.set(self.result_store)
+            try:
+                return await self.tool_manager.execute(
+                    tool_call.name,
+                    tool_call.arguments,
+                )
+            finally:
+                current_result_store.reset(token)
+
+    def _close_tool_calls(self, tool_calls: list[ToolCall]) -> None:
+        """Add a placeholder result for every call left without one."""
+        answered = {
+            msg.get("tool_call_id")
+            for msg in self.messages[-len(tool_calls) :]
+            if msg["role"] == "tool"
+        }
+        for tool_call in tool_calls:
+            if tool_call.id not in answered:
                 self.messages.append(
                     {
                         "role": "tool",
                         "tool_call_id": tool_call.id,
-                        "content": str(result.output) if result.success else str(result.error),
+                        "content": "Tool execution was cancelled before it completed.",
                     }
                 )
 
-                yield AgentEvent(
-                    type="tool_result",
-                    tool_call_id=tool_call.id,
-                    tool_name=tool_call.name,
-                    content=result.to_dict(),
-                )
+    def _record_usage(self, usage: dict[str, int] | None, provider: str | None) -> None:
+        """Accumulate the exact token usage reported for one model request."""
+        if usage:
+            self.usage.record(provider or getattr(self.model, "name", "unknown"), usage)
 
-        yield AgentEvent(
-            type="error",
-            content=f"Agent reached maximum iterations ({self.max_iterations})",
+    @staticmethod
+    def _cancel_tasks(tasks: list[asyncio.Task]) -> None:
+        """Cancel tool tasks that have not finished yet."""
+        for task in tasks:
+            task.cancel()
+
+    async def _record_tool_result(self, tool_call: ToolCall, result: ToolResult) -> None:
+        """Add a tool result to the conversation history.
+
+        Oversized outputs are moved to the result store and replaced by a
+        preview, so they are not re-sent on every later iteration.
+        """
+        content = str(result.output) if result.success else str(result.error)
+        if (
+            self.result_store
+            and tool_call.name != ReadResultTool.name
+            and self.result_store.should_offload(content)
+        ):
+            content = await self.result_store.offload(content)
+
+        self.messages.append(
+            {
+                "role": "tool",
+                "tool_call_id": tool_call.id,
+                "content": content,
+            }
         )
 
     def allow_tool_for_session(self, tool_name: str) -> None:
@@ -450,3 +667,8 @@ class Agent:
         """Clear conversation history."""
         self.messages = []
         self.auto_allowed_tools = set()
+        self._reset_api_messages()
+        if self.context_window:
+            self.context_window.reset()
+        if self.result_store:
+            self.result_store.clear()
@@ -20,6 +20,9 @@ class ModelConfig:
     api_key: str = "${ANTHROPIC_API_KEY}"
     base_url: str | None = None
     max_tokens: int = 8192
+    prompt_caching: bool = False  # Anthropic cache_control breakpoints
+    context_window: int | None = None  # Token budget override, defaults to the model's window
+    options: dict[str, Any] = field(default_factory=dict)  # Type-specific, e.g. fake: script, ttft
 
 
 @dataclass
@@ -28,6 +31,10 @@ class ServerConfig:
 
     host: str = "127.0.0.1"
     port: int = 8420
+    # text_delta coalescing for WebSocket clients
+    stream_flush_ms: int = 30
+    stream_max_frame_bytes: int = 4096
+    stream_max_pending_frames: int = 256  # Agent runs wait while a client is this far behind
 
 
 @dataclass
@@ -50,12 +57,44 @@ class MemoryConfig:
     persist_directory: str | None = None
 
 
+@dataclass
+class ToolsConfig:
+    """Tool execution configuration."""
+
+    parallel: bool = False  # Run read-only tool calls of one turn concurrently
+    max_concurrency: int = 4
+    pipeline: bool = False  # Start read-only tools while the model is still streaming
+    result_offload_threshold: int = 16000  # Chars; larger outputs are stored out-of-band (0 = off)
+    result_store_dir: str | None = None  # Store offloaded outputs on disk instead of in memory
+
+
+@dataclass
+class AttachmentsConfig:
+    """Uploaded attachment configuration."""
+
+    keep_image_turns: int = 3  # Older images become a text placeholder (0 = keep forever)
+    store_max_mb: int = 256  # Server-side attachment store size, least recently used evicted
+    max_image_edge: int = 1568  # Larger uploads are downsized (needs Pillow, 0 = off)
+    image_quality: int = 85  # JPEG/WebP quality when re-encoding
+
+
+@dataclass
+class CacheConfig:
+    """Exact-match model response cache configuration."""
+
+    enabled: bool = False
+    backend: str = "memory"  # "memory" | "disk"
+    ttl_seconds: float | None = 3600.0  # None = never expire
+    max_entries: int = 1000
+    directory: str = ".honolulu/cache"  # Disk backend only
+
+
 @dataclass
 class ProviderConfig:
     """Model provider configuration for multi-model routing."""
 
     name: str
-    type: str  # "anthropic" | "openai"
+    type: str  # "anthropic" | "openai" | "fake"
     api_key: str
     model: str
     base_url: str | None = None
@@ -64,6 +103,11 @@ class ProviderConfig:
     cost_per_1k_input: float = 0.0
     cost_per_1k_output: float = 0.0
     capabilities: list[str] = field(default_factory=list)
+    prompt_caching: bool = False  # Anthropic providers only
+    # Client-side budgets; learned from rate-limit headers when not set
+    requests_per_minute: int | None = None
+    tokens_per_minute: int | None = None
+    options: dict[str, Any] = field(default_factory=dict)  # Type-specific, e.g. fake: script, ttft
 
 
 @dataclass
@@ -71,8 +115,15 @@ class RoutingConfig:
     """Multi-model routing configuration."""
 
     enabled: bool = False
-    strategy: str = "quality-first"  # cost-optimized, quality-first, round-robin
+    # cost-optimized, quality-first, round-robin, latency-aware, smart, cascade
+    strategy: str = "quality-first"
     fallback_enabled: bool = True
+    hedge_delay_ms: int | None = None  # Race a backup provider after this delay (None = off)
+    failure_threshold: int = 5  # Consecutive failures that open a provider's circuit
+    recovery_timeout: float = 30.0  # Seconds an open circuit waits before a trial request
+    health_probe: bool = True  # Probe open circuits in the background
+    cascade_repeat_threshold: int = 2  # Identical tool calls in a turn that escalate (cascade)
+    session_affinity: bool = False  # Keep each session on one provider while it is healthy
     providers: list[ProviderConfig] = field(default_factory=list)
 
 
@@ -84,6 +135,9 @@ class Config:
     model: ModelConfig = field(default_factory=ModelConfig)
     memory: MemoryConfig = field(default_factory=MemoryConfig)
     routing: RoutingConfig = field(default_factory=RoutingConfig)
+    tools: ToolsConfig = field(default_factory=ToolsConfig)
+    attachments: AttachmentsConfig = field(default_factory=AttachmentsConfig)
+    cache: CacheConfig = field(default_factory=CacheConfig)
     permissions: PermissionConfig = field(default_factory=PermissionConfig)
     server: ServerConfig = field(default_factory=ServerConfig)
     mcp_servers: list[MCPServerConfig] = field(default_factory=list)
@@ -112,6 +166,9 @@ class Config:
                 api_key=model_data.get("api_key", "${ANTHROPIC_API_KEY}"),
                 base_url=model_data.get("base_url"),
                 max_tokens=model_data.get("max_tokens", 8192),
+                prompt_caching=model_data.get("prompt_caching", False),
+                context_window=model_data.get("context_window"),
+                options=model_data.get("options", {}),
             )
 
         if "permissions" in data:
@@ -149,20 +206,62 @@ class Config:
                         cost_per_1k_input=p.get("cost_per_1k_input", 0.0),
                         cost_per_1k_output=p.get("cost_per_1k_output", 0.0),
                         capabilities=p.get("capabilities", []),
+                        prompt_caching=p.get("prompt_caching", False),
+                        requests_per_minute=p.get("requests_per_minute"),
+                        tokens_per_minute=p.get("tokens_per_minute"),
+                        options=p.get("options", {}),
                     )
                 )
             config.routing = RoutingConfig(
                 enabled=routing_data.get("enabled", False),
                 strategy=routing_data.get("strategy", "quality-first"),
                 fallback_enabled=routing_data.get("fallback_enabled", True),
+                hedge_delay_ms=routing_data.get("hedge_delay_ms"),
+                failure_threshold=routing_data.get("failure_threshold", 5),
+                recovery_timeout=routing_data.get("recovery_timeout", 30.0),
+                health_probe=routing_data.get("health_probe", True),
+                cascade_repeat_threshold=routing_data.get("cascade_repeat_threshold", 2),
+                session_affinity=routing_data.get("session_affinity", False),
                 providers=providers,
             )
 
+        if "tools" in data:
+            tools_data = data["tools"]
+            config.tools = ToolsConfig(
+                parallel=tools_data.get("parallel", False),
+                max_concurrency=tools_data.get("max_concurrency", 4),
+                pipeline=tools_data.get("pipeline", False),
+                result_offload_threshold=tools_data.get("result_offload_threshold", 16000),
+                result_store_dir=tools_data.get("result_store_dir"),
+            )
+
+        if "attachments" in data:
+            attachments_data = data["attachments"]
+            config.attachments = AttachmentsConfig(
+                keep_image_turns=attachments_data.get("keep_image_turns", 3),
+                store_max_mb=attachments_data.get("store_max_mb", 256),
+                max_image_edge=attachments_data.get("max_image_edge", 1568),
+                image_quality=attachments_data.get("image_quality", 85),
+            )
+
+        if "cache" in data:
+            cache_data = data["cache"]
+            config.cache = CacheConfig(
+                enabled=cache_data.get("enabled", False),
+                backend=cache_data.get("backend", "memory"),
+                ttl_seconds=cache_data.get("ttl_seconds", 3600.0),
+                max_entries=cache_data.get("max_entries", 1000),
+                directory=cache_data.get("directory", ".honolulu/cache"),
+            )
+
         if "server" in data:
             server_data = data["server"]
             config.server = ServerConfig(
                 host=server_data.get("host", "127.0.0.1"),
                 port=server_data.get("port", 8420),
+                stream_flush_ms=server_data.get("stream_flush_ms", 30),
+                stream_max_frame_bytes=server_data.get("stream_max_frame_bytes", 4096),
+                stream_max_pending_frames=server_data.get("stream_max_pending_frames", 256),
             )
 
         if "mcp_servers" in data:
@@ -0,0 +1,275 @@
+"""Token-budgeted context window management for agent history."""
+
+from honolulu.models.base import APIMessage
+from honolulu.tokens import (
+    estimate_message_tokens,
+    estimate_text_tokens,
+    estimate_tools_tokens,
+)
+
+# Context window sizes by model name fragment, most specific first
+MODEL_CONTEXT_WINDOWS: list[tuple[str, int]] = [
+    ("claude", 200_000),
+    ("gpt-4.1", 1_000_000),
+    ("gpt-4o", 128_000),
+    ("gpt-4-turbo", 128_000),
+    ("gpt-4", 8_192),
+    ("gpt-3.5", 16_385),
+    ("o1", 200_000),
+    ("o3", 200_000),
+    ("o4", 200_000),
+    ("deepseek", 64_000),
+    ("qwen-max", 32_000),
+    ("qwen", 128_000),
+]
+DEFAULT_CONTEXT_WINDOW = 128_000
+
+OMITTED_NOTE = "[Earlier conversation omitted to fit the context window]"
+IMAGE_PLACEHOLDER = "[Image from earlier in the conversation omitted]"
+
+
+def get_context_window(model_name: str | None) -> int:
+    """Get the context window size (in tokens) for a model name."""
+    if model_name:
+        name = model_name.lower()
+        for fragment, size in MODEL_CONTEXT_WINDOWS:
+            if fragment in name:
+                return size
+    return DEFAULT_CONTEXT_WINDOW
+
+
+class ContextWindow:
+    """Keeps API-format history within a model's token budget.
+
+    Sits between the agent's converted history and the provider call. When a
+    request is estimated to exceed the budget, tool outputs older than the
+    most recent turns are elided first; then the window start slides forward
+    over whole user turns. The window only ever moves forward and trims down
+    to a low watermark, so the request prefix stays stable (and cacheable)
+    for several turns instead of shifting on every call. An assistant
+    tool_use message and the tool_result message answering it are always
+    kept or dropped together.
+
+    With ``keep_image_turns`` set, images older than that many user turns are
+    always replaced by a short text placeholder, whatever the budget.
+    """
+
+    def __init__(
+        self,
+        context_tokens: int = DEFAULT_CONTEXT_WINDOW,
+        max_output_tokens: int = 4096,
+        keep_recent_turns: int = 2,
+        low_watermark: float = 0.75,
+        elide_min_chars: int = 256,
+        keep_image_turns: int = 0,
+    ):
+        self.context_tokens = context_tokens
+        self.max_output_tokens = max_output_tokens
+        self.keep_recent_turns = max(1, keep_recent_turns)
+        self.low_watermark = low_watermark
+        self.elide_min_chars = elide_min_chars
+        self.keep_image_turns = keep_image_turns  # 0 = keep images forever
+
+        # Estimated input tokens of the last request passed through fit()
+        self.last_estimate = 0
+
+        self._drop_before = 0
+        self._elide_before = 0
+        self._image_before = 0
+        # id(message) -> (message, rendered copy / token estimate)
+        self._elided: dict[int, tuple[dict, dict]] = {}
+        self._imageless: dict[int, tuple[dict, dict]] = {}
+        self._tokens: dict[int, tuple[dict, int]] = {}
+
+    @classmethod
+    def for_model(
+        cls,
+        model_name: str | None,
+        max_output_tokens: int = 4096,
+        context_tokens: int | None = None,
+        **kwargs,
+    ) -> "ContextWindow":
+        """Create a context window sized for a model."""
+        return cls(
+            context_tokens=context_tokens or get_context_window(model_name),
+            max_output_tokens=max_output_tokens,
+            **kwargs,
+        )
+
+    def reset(self) -> None:
+        """Forget window state, e.g. after the history was cleared."""
+        self._drop_before = 0
+        self._elide_before = 0
+        self._image_before = 0
+        self._elided.clear()
+        self._imageless.clear()
+        self._tokens.clear()
+
+    def fit(
+        self,
+        messages: list[dict],
+        system: str | None = None,
+        tools: list[dict] | None = None,
+    ) -> list[dict]:
+        """Return the part of messages to send, within the token budget.
+
+        The input list and its messages are never modified.
+        """
+        if self._drop_before > len(messages):
+            self.reset()
+
+        overhead = estimate_text_tokens(system or "") + estimate_tools_tokens(tools)
+        budget = self.context_tokens - self.max_output_tokens - overhead
+
+        turn_starts = self._turn_starts(messages)
+        if self.keep_image_turns and len(turn_starts) > self.keep_image_turns:
+            self._image_before = max(self._image_before, turn_starts[-self.keep_image_turns])
+
+        window = self._render(messages)
+        total = self._total(window)
+        if total <= budget:
+            if len(self._tokens) > 2 * len(messages) + 64:
+                self._prune_caches(messages)
+            self.last_estimate = total + overhead
+            return window
+
+        target = int(budget * self.low_watermark)
+
+        # 1. Elide tool outputs older than the most recent turns
+        if len(turn_starts) >= self.keep_recent_turns:
+            recent = turn_starts[-self.keep_recent_turns]
+            if recent > self._elide_before:
+                self._elide_before = recent
+                window = self._render(messages)
+                total = self._total(window)
+                if total <= target:
+                    self.last_estimate = total + overhead
+                    return window
+
+        # 2. Slide the window start over whole turns, keeping the current one
+        tokens = [self._estimate(m) for m in window]
+        total = sum(tokens)
+        offset = self._drop_before
+        for start in turn_starts:
+            if total <= target:
+                break
+            if start <= self._drop_before:
+                continue
+            total -= sum(tokens[self._drop_before - offset : start - offset])
+            self._drop_before = start
+
+        # 3. Still too large: elide everything before the latest tool exchange
+        if total > budget:
+            for index in range(len(messages) - 1, -1, -1):
+                if messages[index]["role"] == "assistant":
+                    self._elide_before = max(self._elide_before, index)
+                    break
+
+        self._prune_caches(messages)
+        window = self._render(messages)
+        self.last_estimate = self._total(window) + overhead
+        return window
+
+    def _render(self, messages: list[dict]) -> list[dict]:
+        """Build the window for the current drop/elide positions."""
+        window = []
+        for index in range(self._drop_before, len(messages)):
+            message = messages[index]
+            if index < self._image_before:
+                message = self._drop_images(message)
+            if index < self._elide_before:
+                message = self._elide(message)
+            window.append(message)
+
+        if self._drop_before and window:
+            window[0] = self._with_note(window[0])
+        return window
+
+    def _total(self, window: list[dict]) -> int:
+        return sum(self._estimate(m) for m in window)
+
+    def _estimate(self, message: dict) -> int:
+        """Estimate message tokens, cached per message object."""
+        cached = self._tokens.get(id(message))
+        if cached is not None and cached[0] is message:
+            return cached[1]
+        tokens = estimate_message_tokens(message)
+        self._tokens[id(message)] = (message, tokens)
+        return tokens
+
+    def _elide(self, message: dict) -> dict:
+        """Return message with long tool outputs replaced by a placeholder."""
+        content = message.get("content")
+        if message["role"] != "user" or not isinstance(content, list):
+            return message
+
+        cached = self._elided.get(id(message))
+        if cached is not None and cached[0] is message:
+            return cached[1]
+
+        blocks = []
+        changed = False
+        for block in content:
+            if block.get("type") == "tool_result":
+                output = block.get("content", "")
+                text = output if isinstance(output, str) else str(output)
+                if len(text) >= self.elide_min_chars:
+                    block = {
+                        **block,
+                        "content": f"[Tool output elided to save context: {len(text)} characters]",
+                    }
+                    changed = True
+            blocks.append(block)
+
+        elided = APIMessage({**message, "content": blocks}) if changed else message
+        self._elided[id(message)] = (message, elided)
+        return elided
+
+    def _drop_images(self, message: dict) -> dict:
+        """Return message with image blocks replaced by a placeholder."""
+        content = message.get("content")
+        if message["role"] != "user" or not isinstance(content, list):
+            return message
+
+        cached = self._imageless.get(id(message))
+        if cached is not None and cached[0] is message:
+            return cached[1]
+
+        if any(block.get("type") == "image" for block in content):
+            placeholder = {"type": "text", "text": IMAGE_PLACEHOLDER}
+            blocks = [placeholder if block.get("type") == "image" else block for block in content]
+            result = APIMessage({**message, "content": blocks})
+        else:
+            result = message
+        self._imageless[id(message)] = (message, result)
+        return result
+
+    @staticmethod
+    def _with_note(message: dict) -> dict:
+        """Prefix the first kept message with a note about omitted history."""
+        content = message["content"]
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        return {**message, "content": [{"type": "text", "text": OMITTED_NOTE}, *content]}
+
+    @staticmethod
+    def _turn_starts(messages: list[dict]) -> list[int]:
+        """Indices of user messages that start a turn (not tool results)."""
+        starts = []
+        for index, message in enumerate(messages):
+            if message["role"] != "user":
+                continue
+            content = message["content"]
+            if isinstance(content, list) and content and content[0].get("type") == "tool_result":
+                continue
+            starts.append(index)
+        return starts
+
+    def _prune_caches(self, messages: list[dict]) -> None:
+        """Drop cache entries for messages that left the window."""
+        live = {id(m) for m in messages[self._drop_before :]}
+        self._imageless = {k: v for k, v in self._imageless.items() if k in live}
+        live.update(id(v[1]) for v in self._imageless.values())
+        self._elided = {k: v for k, v in self._elided.items() if k in live}
+        live.update(id(v[1]) for v in self._elided.values())
+        self._tokens = {k: v for k, v in self._tokens.items() if k in live}
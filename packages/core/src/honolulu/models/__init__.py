@@ -4,6 +4,8 @@ from honolulu.models.base import ModelProvider, ModelResponse, ToolCall, StreamC
 from honolulu.models.claude import ClaudeProvider
 from honolulu.models.openai_provider import OpenAIProvider
 from honolulu.models.router import ModelRouter, RoutingStrategy, ProviderConfig
+from honolulu.models.registry import ProviderRegistry
+from honolulu.models.streaming import JSONAssembler, TextAssembler
 
 __all__ = [
     "ModelProvider",
@@ -15,4 +17,7 @@ __all__ = [
     "ModelRouter",
     "RoutingStrategy",
     "ProviderConfig",
+    "ProviderRegistry",
+    "JSONAssembler",
+    "TextAssembler",
 ]
@@ -5,6 +5,16 @@ from dataclasses import dataclass, field
 from typing import Any, AsyncGenerator
 
 
+class APIMessage(dict):
+    """An API-format message that can be weakly referenced.
+
+    The agent builds its converted history from these, so providers can
+    cache per-message work for exactly as long as the message is in use.
+    """
+
+    __slots__ = ("__weakref__",)
+
+
 @dataclass
 class ToolCall:
     """Represents a tool call from the model."""
@@ -12,6 +22,7 @@ class ToolCall:
     id: str
     name: str
     arguments: dict[str, Any]
+    invalid_arguments: bool = False  # The model's arguments were not valid JSON
 
 
 @dataclass
@@ -22,6 +33,9 @@ class ModelResponse:
     tool_calls: list[ToolCall] = field(default_factory=list)
     stop_reason: str | None = None
     usage: dict[str, int] = field(default_factory=dict)
+    provider: str | None = None  # Set by routers to the provider that answered
+    rate_limits: dict[str, str] | None = None  # Rate-limit response headers, if any
+    cached: bool = False  # Replayed from a response cache, not sent to the provider
 
     @property
     def has_tool_calls(self) -> bool:
@@ -32,9 +46,14 @@ class ModelResponse:
 class StreamChunk:
     """A chunk of streaming response."""
 
-    type: str  # "text", "tool_use_start", "tool_use_delta", "tool_use_end"
+    type: str  # "text", "tool_use_start", "tool_use_delta", "tool_use_end", "usage"
     content: str | None = None
+    # On "tool_use_delta" chunks, occasionally set with the partial arguments so far
     tool_call: ToolCall | None = None
+    usage: dict[str, int] | None = None  # Final token usage, on "usage" chunks
+    provider: str | None = None  # Set by routers to the provider that answered
+    rate_limits: dict[str, str] | None = None  # Rate-limit response headers, on "usage" chunks
+    cached: bool = False  # Replayed from a response cache, not sent to the provider
 
 
 class ModelProvider(ABC):
@@ -63,3 +82,7 @@ class ModelProvider(ABC):
     ) -> AsyncGenerator[StreamChunk, None]:
         """Make a streaming call to the model."""
         pass
+
+    async def probe(self) -> ModelResponse:
+        """Make the smallest possible request, to check the provider is up."""
+        return await self.call(messages=[{"role": "user", "content": "ping"}], max_tokens=1)
@@ -0,0 +1,371 @@
+"""Exact-match response cache for model providers."""
+
+import asyncio
+import dataclasses
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, AsyncGenerator, Awaitable, Callable
+
+import aiofiles
+
+from honolulu.models.base import ModelProvider, ModelResponse, StreamChunk, ToolCall
+
+
+class MemoryCacheBackend:
+    """In-process cache, least recently used entries evicted first."""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float | None, Any]] = OrderedDict()
+
+    async def get(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def put(self, key: str, value: Any, expires_at: float | None) -> None:
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCacheBackend:
+    """On-disk cache of one JSON file per entry, surviving restarts.
+
+    Recency is tracked in memory (seeded from file modification times) and
+    the least recently used files are deleted beyond ``max_entries``.
+    """
+
+    def __init__(self, directory: str | Path, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._directory = Path(directory)
+        self._directory.mkdir(parents=True, exist_ok=True)
+        files = sorted(self._directory.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        self._index: OrderedDict[str, None] = OrderedDict((p.stem, None) for p in files)
+
+    async def get(self, key: str) -> Any | None:
+        if key not in self._index:
+            return None
+        path = self._path(key)
+        try:
+            async with aiofiles.open(path, "r", encoding="utf-8") as f:
+                entry = json.loads(await f.read())
+        except (OSError, ValueError):
+            self._index.pop(key, None)
+            return None
+
+        expires_at = entry.get("expires_at")
+        if expires_at is not None and expires_at <= time.time():
+            self._remove(key)
+            return None
+        self._index.move_to_end(key)
+        os.utime(path)
+        return entry["value"]
+
+    async def put(self, key: str, value: Any, expires_at: float | None) -> None:
+        data = json.dumps({"expires_at": expires_at, "value": value}, ensure_ascii=False)
+        # Write then rename, so readers never see a partial file
+        temp = self._path(key).with_suffix(".tmp")
+        async with aiofiles.open(temp, "w", encoding="utf-8") as f:
+            await f.write(data)
+        os.replace(temp, self._path(key))
+
+        self._index[key] = None
+        self._index.move_to_end(key)
+        while len(self._index) > self.max_entries:
+            self._remove(next(iter(self._index)))
+
+    async def clear(self) -> None:
+        for key in list(self._index):
+            self._remove(key)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _remove(self, key: str) -> None:
+        self._index.pop(key, None)
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+    def _path(self, key: str) -> Path:
+        return self._directory / f"{key}.json"
+
+
+def _response_to_dict(response: ModelResponse) -> dict:
+    return dataclasses.asdict(response)
+
+
+def _response_from_dict(data: dict) -> ModelResponse:
+    data = dict(data)
+    data["tool_calls"] = [ToolCall(**tc) for tc in data.get("tool_calls", [])]
+    return ModelResponse(**data)
+
+
+def _chunk_to_dict(chunk: StreamChunk) -> dict:
+    return dataclasses.asdict(chunk)
+
+
+def _chunk_from_dict(data: dict) -> StreamChunk:
+    data = dict(data)
+    if data.get("tool_call"):
+        data["tool_call"] = ToolCall(**data["tool_call"])
+    return StreamChunk(**data)
+
+
+def _replayed_usage(usage: dict[str, int] | None) -> dict[str, int] | None:
+    """Usage of a cache hit: nothing was sent, so nothing was spent."""
+    return {key: 0 for key in usage} if usage else usage
+
+
+def _replayed(item: ModelResponse | StreamChunk) -> ModelResponse | StreamChunk:
+    """Mark a response or chunk as served without its own upstream request."""
+    item.usage = _replayed_usage(item.usage)
+    item.rate_limits = None
+    item.cached = True
+    return item
+
+
+class _StreamFlight:
+    """An upstream stream shared by every identical concurrent request."""
+
+    def __init__(self) -> None:
+        self.chunks: list[StreamChunk] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.consumers = 0
+        self.task: asyncio.Task | None = None
+        self._changed = asyncio.Event()
+
+    def push(self, chunk: StreamChunk) -> None:
+        self.chunks.append(chunk)
+        self._notify()
+
+    def finish(self, error: BaseException | None = None) -> None:
+        self.done = True
+        self.error = error
+        self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def replay(self) -> AsyncGenerator[StreamChunk, None]:
+        """Yield copies of all chunks, waiting for the upstream as needed."""
+        index = 0
+        while True:
+            if index < len(self.chunks):
+                yield dataclasses.replace(self.chunks[index])
+                index += 1
+            elif self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            else:
+                await self._changed.wait()
+
+
+class ResponseCache:
+    """Exact-match cache of model responses, with single-flight requests.
+
+    Requests are keyed by a canonical hash of the provider's model and the
+    request (messages, tools, system prompt, max tokens). Identical requests
+    in flight at the same time share one upstream call or stream. Cache hits
+    report zero token usage, since nothing was sent to the provider.
+    """
+
+    def __init__(
+        self,
+        backend: MemoryCacheBackend | DiskCacheBackend | None = None,
+        ttl: float | None = 3600.0,
+    ):
+        self.backend = backend or MemoryCacheBackend()
+        self.ttl = ttl  # Seconds, None = never expire
+        self._calls: dict[str, asyncio.Task] = {}
+        self._streams: dict[str, _StreamFlight] = {}
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0  # Requests that joined an identical in-flight request
+
+    @staticmethod
+    def key(identity: str, kind: str, request: dict) -> str:
+        """Canonical hash of a request to a provider."""
+        canonical = json.dumps(
+            {"provider": identity, "kind": kind, **request},
+            sort_keys=True,
+            separators=(",", ":"),
+            ensure_ascii=False,
+            default=str,
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _expires_at(self) -> float | None:
+        return time.time() + self.ttl if self.ttl is not None else None
+
+    async def call(self, key: str, fetch: Callable[[], Awaitable[ModelResponse]]) -> ModelResponse:
+        """Get a cached response, or fetch it once for all identical callers."""
+        cached = await self.backend.get(key)
+        if cached is not None:
+            self.hits += 1
+            return _replayed(_response_from_dict(cached))
+
+        task = self._calls.get(key)
+        leader = task is None
+        if leader:
+            self.misses += 1
+            task = self._calls[key] = asyncio.create_task(self._fetch(key, fetch))
+        else:
+            self.coalesced += 1
+        # A cancelled caller must not cancel the request for the others
+        response = _response_from_dict(_response_to_dict(await asyncio.shield(task)))
+        # Only the caller that started the request accounts for it
+        return response if leader else _replayed(response)
+
+    async def _fetch(
+        self, key: str, fetch: Callable[[], Awaitable[ModelResponse]]
+    ) -> ModelResponse:
+        try:
+            response = await fetch()
+            await self.backend.put(key, _response_to_dict(response), self._expires_at())
+            return response
+        finally:
+            self._calls.pop(key, None)
+
+    async def stream(
+        self, key: str, open_stream: Callable[[], AsyncGenerator[StreamChunk, None]]
+    ) -> AsyncGenerator[StreamChunk, None]:
+        """Replay a cached stream, or stream once for all identical callers."""
+        cached = await self.backend.get(key)
+        if cached is not None:
+            self.hits += 1
+            for data in cached:
+                yield _replayed(_chunk_from_dict(data))
+            return
+
+        flight = self._streams.get(key)
+        leader = flight is None
+        if leader:
+            self.misses += 1
+            flight = self._streams[key] = _StreamFlight()
+            flight.task = asyncio.create_task(self._produce(key, flight, open_stream))
+        else:
+            self.coalesced += 1
+
+        flight.consumers += 1
+        try:
+            async for chunk in flight.replay():
+                yield chunk if leader else _replayed(chunk)
+        finally:
+            flight.consumers -= 1
+            if flight.consumers == 0 and not flight.done:
+                # Everyone stopped listening, stop the upstream too
+                flight.task.cancel()
+
+    async def _produce(
+        self,
+        key: str,
+        flight: _StreamFlight,
+        open_stream: Callable[[], AsyncGenerator[StreamChunk, None]],
+    ) -> None:
+        """Drive the upstream stream into the flight, caching it when complete."""
+        chunks = open_stream()
+        try:
+            async for chunk in chunks:
+                flight.push(chunk)
+        except asyncio.CancelledError:
+            flight.finish(RuntimeError("Stream was cancelled"))
+            raise
+        except Exception as e:
+            flight.finish(e)
+            return
+        finally:
+            await chunks.aclose()
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+
+        flight.finish()
+        value = [_chunk_to_dict(chunk) for chunk in flight.chunks]
+        await self.backend.put(key, value, self._expires_at())
+
+    async def clear(self) -> None:
+        await self.backend.clear()
+
+    def to_dict(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.backend),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "coalesced": self.coalesced,
+        }
+
+
+class CachedProvider(ModelProvider):
+    """Wraps a provider with a response cache."""
+
+    def __init__(
+        self,
+        provider: ModelProvider,
+        cache: ResponseCache | None = None,
+        identity: str | None = None,
+    ):
+        self.provider = provider
+        self.cache = cache or ResponseCache()
+        self.name = provider.name
+        # What makes two providers answer alike: by default the provider
+        # type, endpoint and model
+        if identity is None:
+            base_url = getattr(getattr(provider, "client", None), "base_url", None)
+            model = getattr(provider, "model", "")
+            identity = f"{type(provider).__name__}:{base_url or ''}:{model}"
+        self._identity = identity
+
+    def __getattr__(self, name: str) -> Any:
+        # Everything else (model, client, ...) comes from the wrapped provider
+        if name == "provider":
+            raise AttributeError(name)
+        return getattr(self.provider, name)
+
+    async def call(
+        self,
+        messages: list[dict],
+        tools: list[dict] | None = None,
+        system: str | None = None,
+        max_tokens: int = 4096,
+    ) -> ModelResponse:
+        request = {"messages": messages, "tools": tools, "system": system, "max_tokens": max_tokens}
+        key = self.cache.key(self._identity, "call", request)
+        return await self.cache.call(key, lambda: self.provider.call(**request))
+
+    async def stream(
+        self,
+        messages: list[dict],
+        tools: list[dict] | None = None,
+        system: str | None = None,
+        max_tokens: int = 4096,
+    ) -> AsyncGenerator[StreamChunk, None]:
+        request = {"messages": messages, "tools": tools, "system": system, "max_tokens": max_tokens}
+        key = self.cache.key(self._identity, "stream", request)
+        async for chunk in self.cache.stream(key, lambda: self.provider.stream(**request)):
+            yield chunk
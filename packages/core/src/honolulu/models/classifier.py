@@ -0,0 +1,124 @@
+"""Local heuristic classification of agent turns for smart routing."""
+
+from dataclasses import dataclass, field
+from enum import Enum
+
+
+class TaskComplexity(Enum):
+    """How demanding a turn looks."""
+
+    SIMPLE = "simple"  # Short question or chat, no tools
+    MODERATE = "moderate"
+    COMPLEX = "complex"  # Long or multimodal prompt, heavy multi-step tool use
+
+
+# User prompt length (characters) thresholds
+SHORT_PROMPT_CHARS = 200
+MEDIUM_PROMPT_CHARS = 800
+LONG_PROMPT_CHARS = 3000
+
+# Tools that change things or spawn more work, as opposed to reading
+HEAVY_TOOL_PREFIXES = ("file_write", "bash_exec", "delegate_to_")
+
+# Recent tool calls considered when looking at tool types
+RECENT_TOOLS = 8
+
+# Score at or above which a turn is complex
+COMPLEX_SCORE = 3
+
+
+@dataclass
+class TurnFeatures:
+    """Features of the current turn, taken from the request alone."""
+
+    prompt_chars: int = 0  # Text of the user message that started the turn
+    has_images: bool = False
+    has_code: bool = False
+    iterations: int = 0  # Model responses so far in this turn
+    tool_calls: int = 0  # Tool calls made so far in this turn
+    recent_tools: list[str] = field(default_factory=list)  # Newest first
+
+    @property
+    def tool_density(self) -> float:
+        """Tool calls per model response in this turn."""
+        return self.tool_calls / self.iterations if self.iterations else 0.0
+
+
+def is_tool_results(message: dict) -> bool:
+    """Check if a user message only carries tool results, which continue a turn."""
+    content = message.get("content")
+    return (
+        isinstance(content, list)
+        and bool(content)
+        and all(isinstance(b, dict) and b.get("type") == "tool_result" for b in content)
+    )
+
+
+def extract_features(messages: list[dict], task_hint: str | None = None) -> TurnFeatures:
+    """Extract turn features from API-format messages.
+
+    Walks back from the end to the user message that started the turn, so
+    the cost is bounded by the turn, not the whole history. ``task_hint``
+    stands in for the prompt if no user text is found.
+    """
+    features = TurnFeatures()
+
+    for message in reversed(messages):
+        content = message.get("content")
+        blocks = content if isinstance(content, list) else [{"type": "text", "text": content}]
+
+        if is_tool_results(message):
+            continue
+        if message.get("role") == "assistant":
+            features.iterations += 1
+            for block in reversed(blocks):
+                if isinstance(block, dict) and block.get("type") == "tool_use":
+                    features.tool_calls += 1
+                    if len(features.recent_tools) < RECENT_TOOLS:
+                        features.recent_tools.append(block.get("name", ""))
+            continue
+
+        for block in blocks:
+            if isinstance(block, str):
+                block = {"type": "text", "text": block}
+            if block.get("type") == "text":
+                text = block.get("text") or ""
+                features.prompt_chars += len(text)
+                features.has_code = features.has_code or "```" in text
+            elif block.get("type") == "image":
+                features.has_images = True
+        break
+
+    if not features.prompt_chars and task_hint:
+        features.prompt_chars = len(task_hint)
+        features.has_code = "```" in task_hint
+    return features
+
+
+def classify(features: TurnFeatures) -> TaskComplexity:
+    """Score a turn's features into a complexity class."""
+    score = 0
+
+    if features.has_images:
+        score += 2
+    if features.prompt_chars >= LONG_PROMPT_CHARS:
+        score += 2
+    elif features.prompt_chars >= MEDIUM_PROMPT_CHARS:
+        score += 1
+    if features.has_code:
+        score += 1
+
+    if features.tool_calls >= 6:
+        score += 2
+    elif features.tool_calls >= 2:
+        score += 1
+    if features.tool_density >= 2:
+        score += 1
+    if any(name.startswith(HEAVY_TOOL_PREFIXES) for name in features.recent_tools):
+        score += 1
+
+    if score >= COMPLEX_SCORE:
+        return TaskComplexity.COMPLEX
+    if score == 0 and features.prompt_chars <= SHORT_PROMPT_CHARS:
+        return TaskComplexity.SIMPLE
+    return TaskComplexity.MODERATE
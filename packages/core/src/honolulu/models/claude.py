@@ -1,11 +1,17 @@
 """Claude model provider using Anthropic SDK."""
 
+import inspect
 import json
 from typing import Any, AsyncGenerator
 
 from anthropic import AsyncAnthropic
 
 from honolulu.models.base import ModelProvider, ModelResponse, StreamChunk, ToolCall
+from honolulu.models.ratelimit import rate_limit_headers
+from honolulu.models.streaming import JSONAssembler
+
+# Anthropic prompt caching breakpoint marker
+CACHE_CONTROL = {"type": "ephemeral"}
 
 
 class ClaudeProvider(ModelProvider):
@@ -18,21 +24,30 @@ class ClaudeProvider(ModelProvider):
         api_key: str | None = None,
         model: str = "claude-sonnet-4-20250514",
         base_url: str | None = None,
+        prompt_caching: bool = False,
+        client: AsyncAnthropic | None = None,
+        max_retries: int | None = None,
     ):
-        self.client = AsyncAnthropic(
+        # An existing client can be passed in to share its connection pool.
+        # max_retries=None keeps the SDK's own retries; routers pass 0 and
+        # retry themselves.
+        retries = {} if max_retries is None else {"max_retries": max_retries}
+        self.client = client or AsyncAnthropic(
             api_key=api_key,
             base_url=base_url,
+            **retries,
         )
         self.model = model
+        self.prompt_caching = prompt_caching
 
-    async def call(
+    def _build_request(
         self,
         messages: list[dict],
-        tools: list[dict] | None = None,
-        system: str | None = None,
-        max_tokens: int = 4096,
-    ) -> ModelResponse:
-        """Make a non-streaming call to Claude."""
+        tools: list[dict] | None,
+        system: str | None,
+        max_tokens: int,
+    ) -> dict[str, Any]:
+        """Build request kwargs shared by call and stream."""
         kwargs: dict[str, Any] = {
             "model": self.model,
             "messages": messages,
@@ -45,7 +60,73 @@ class ClaudeProvider(ModelProvider):
         if tools:
             kwargs["tools"] = tools
 
-        response = await self.client.messages.create(**kwargs)
+        if self.prompt_caching:
+            self._add_cache_breakpoints(kwargs)
+
+        return kwargs
+
+    def _add_cache_breakpoints(self, kwargs: dict[str, Any]) -> None:
+        """Place cache_control breakpoints on the stable parts of a request.
+
+        Uses the four breakpoints the API allows: the system prompt, the last
+        tool definition, and a rolling pair on the history (the final message,
+        which writes the cache for the next turn, and the previous user
+        message, which reads what the last turn wrote). Inputs are copied,
+        never mutated.
+        """
+        if "system" in kwargs:
+            kwargs["system"] = [
+                {"type": "text", "text": kwargs["system"], "cache_control": CACHE_CONTROL}
+            ]
+
+        if "tools" in kwargs:
+            tools = list(kwargs["tools"])
+            tools[-1] = {**tools[-1], "cache_control": CACHE_CONTROL}
+            kwargs["tools"] = tools
+
+        messages = list(kwargs["messages"])
+        breakpoints = 0
+        for index in range(len(messages) - 1, -1, -1):
+            if breakpoints == 2:
+                break
+            if breakpoints == 1 and messages[index]["role"] != "user":
+                continue
+            marked = self._with_cache_control(messages[index])
+            if marked is not None:
+                messages[index] = marked
+                breakpoints += 1
+        kwargs["messages"] = messages
+
+    @staticmethod
+    def _with_cache_control(message: dict) -> dict | None:
+        """Return a copy of message with a breakpoint on its last block."""
+        content = message["content"]
+        if isinstance(content, str):
+            if not content:
+                return None
+            content = [{"type": "text", "text": content}]
+        elif not content:
+            return None
+
+        blocks = list(content)
+        blocks[-1] = {**blocks[-1], "cache_control": CACHE_CONTROL}
+        return {**message, "content": blocks}
+
+    async def call(
+        self,
+        messages: list[dict],
+        tools: list[dict] | None = None,
+        system: str | None = None,
+        max_tokens: int = 4096,
+    ) -> ModelResponse:
+        """Make a non-streaming call to Claude."""
+        kwargs = self._build_request(messages, tools, system, max_tokens)
+
+        raw = await self.client.messages.with_raw_response.create(**kwargs)
+        # parse() is a coroutine on some SDK versions and synchronous on others
+        response = raw.parse()
+        if inspect.isawaitable(response):
+            response = await response
 
         # Parse response
         content = None
@@ -67,10 +148,8 @@ class ClaudeProvider(ModelProvider):
             content=content,
             tool_calls=tool_calls,
             stop_reason=response.stop_reason,
-            usage={
-                "input_tokens": response.usage.input_tokens,
-                "output_tokens": response.usage.output_tokens,
-            },
+            usage=self._usage_dict(response.usage),
+            rate_limits=rate_limit_headers(raw.headers),
         )
 
     async def stream(
@@ -81,23 +160,24 @@ class ClaudeProvider(ModelProvider):
         max_tokens: int = 4096,
     ) -> AsyncGenerator[StreamChunk, None]:
         """Make a streaming call to Claude."""
-        kwargs: dict[str, Any] = {
-            "model": self.model,
-            "messages": messages,
-            "max_tokens": max_tokens,
-        }
-
-        if system:
-            kwargs["system"] = system
-
-        if tools:
-            kwargs["tools"] = tools
+        kwargs = self._build_request(messages, tools, system, max_tokens)
 
         current_tool_call: dict[str, Any] | None = None
+        usage: dict[str, int] = {}
 
         async with self.client.messages.stream(**kwargs) as stream:
+            rate_limits = rate_limit_headers(stream.response.headers)
             async for event in stream:
-                if event.type == "content_block_start":
+                if event.type == "message_start":
+                    usage = self._usage_dict(event.message.usage)
+
+                elif event.type == "message_delta":
+                    # Output tokens are cumulative; other counts may be absent
+                    for key, value in self._usage_dict(event.usage).items():
+                        if value:
+                            usage[key] = value
+
+                elif event.type == "content_block_start":
                     block = event.content_block
                     if block.type == "text":
                         pass  # Text will come in deltas
@@ -105,7 +185,7 @@ class ClaudeProvider(ModelProvider):
                         current_tool_call = {
                             "id": block.id,
                             "name": block.name,
-                            "arguments_json": "",
+                            "arguments": JSONAssembler(),
                         }
                         yield StreamChunk(
                             type="tool_use_start",
@@ -122,21 +202,28 @@ class ClaudeProvider(ModelProvider):
                         yield StreamChunk(type="text", content=delta.text)
                     elif delta.type == "input_json_delta":
                         if current_tool_call:
-                            current_tool_call["arguments_json"] += delta.partial_json
-                            yield StreamChunk(
-                                type="tool_use_delta",
-                                content=delta.partial_json,
-                            )
+                            assembler = current_tool_call["arguments"]
+                            assembler.append(delta.partial_json)
+                            chunk = StreamChunk(type="tool_use_delta", content=delta.partial_json)
+                            partial = assembler.preview()
+                            if isinstance(partial, dict):
+                                chunk.tool_call = ToolCall(
+                                    id=current_tool_call["id"],
+                                    name=current_tool_call["name"],
+                                    arguments=partial,
+                                )
+                            yield chunk
 
                 elif event.type == "content_block_stop":
                     if current_tool_call:
                         # Parse the complete arguments
+                        assembler = current_tool_call["arguments"]
+                        invalid = False
                         try:
-                            arguments = json.loads(
-                                current_tool_call["arguments_json"]
-                            )
+                            arguments = assembler.parse() if assembler else {}
                         except json.JSONDecodeError:
                             arguments = {}
+                            invalid = True
 
                         yield StreamChunk(
                             type="tool_use_end",
@@ -144,6 +231,22 @@ class ClaudeProvider(ModelProvider):
                                 id=current_tool_call["id"],
                                 name=current_tool_call["name"],
                                 arguments=arguments,
+                                invalid_arguments=invalid,
                             ),
                         )
                         current_tool_call = None
+
+        if usage:
+            yield StreamChunk(type="usage", usage=usage, rate_limits=rate_limits)
+
+    @staticmethod
+    def _usage_dict(usage: Any) -> dict[str, int]:
+        """Convert an Anthropic usage object to a plain dict."""
+        return {
+            "input_tokens": getattr(usage, "input_tokens", None) or 0,
+            "output_tokens": getattr(usage, "output_tokens", None) or 0,
+            "cache_read_input_tokens": getattr(usage, "cache_read_input_tokens", None) or 0,
+            "cache_creation_input_tokens": (
+                getattr(usage, "cache_creation_input_tokens", None) or 0
+            ),
+        }
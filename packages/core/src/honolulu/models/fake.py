@@ -0,0 +1,263 @@
+"""Offline model provider replaying scripted responses, for load and regression tests."""
+
+import asyncio
+import json
+import random
+import uuid
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, AsyncGenerator
+
+import yaml
+
+from honolulu.models.base import ModelProvider, ModelResponse, StreamChunk, ToolCall
+from honolulu.models.ratelimit import current_session
+from honolulu.tokens import estimate_request_tokens, estimate_text_tokens
+
+
+class FakeProviderError(Exception):
+    """Injected provider error, shaped like an SDK API error (``status_code``, ``response``)."""
+
+    def __init__(self, status_code: int = 500, message: str = "Injected fake provider error"):
+        super().__init__(message)
+        self.status_code = status_code
+        headers = {"retry-after": "1"} if status_code == 429 else {}
+        self.response = SimpleNamespace(headers=headers)
+
+
+def load_script(path: str | Path) -> list[dict]:
+    """Load scripted responses from a JSON or YAML file.
+
+    The file holds a list of responses (or ``{"responses": [...]}``), each
+    in the shape of a serialized ``ModelResponse``: ``content``,
+    ``tool_calls`` (``name``, ``arguments``, optional ``id``), ``stop_reason``
+    and ``usage``. An entry may also set ``error`` (a status code, or
+    ``{"status": ..., "message": ...}``) to fail that request, and ``ttft``
+    to override the time to first token.
+    """
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+    data = json.loads(text) if path.suffix == ".json" else yaml.safe_load(text)
+    if isinstance(data, dict):
+        data = data.get("responses", [])
+    if not isinstance(data, list):
+        raise ValueError(f"Fake provider script must be a list of responses: {path}")
+    return data
+
+
+class FakeProvider(ModelProvider):
+    """Model provider that never touches the network.
+
+    Replays a script of responses in order (cycling when ``loop`` is set),
+    or echoes the last user message without one. Each session (see
+    ``current_session``) replays the script from its own position, so a
+    shared instance stays deterministic under concurrent sessions; health
+    probes get a reply of their own and leave the script alone. Streams
+    are paced by a time to first token and a delay between chunks, each
+    varied by ``jitter`` (a fraction, 0.2 = +/-20%). ``error_rate`` fails
+    that share of requests with ``error_status``, e.g. 429 to exercise rate
+    limiting.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        model: str = "fake",
+        base_url: str | None = None,
+        client: Any = None,
+        script: str | list[dict] | None = None,
+        ttft: float = 0.0,
+        chunk_delay: float = 0.0,
+        chunk_size: int = 16,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        loop: bool = True,
+        seed: int | None = None,
+        max_retries: int | None = None,
+    ):
+        # api_key, base_url, client and max_retries are accepted for registry compatibility
+        self.client = None
+        self.model = model
+        self.script = load_script(script) if isinstance(script, (str, Path)) else script or []
+        self.ttft = ttft
+        self.chunk_delay = chunk_delay
+        self.chunk_size = max(1, chunk_size)
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.loop = loop
+        self._random = random.Random(seed)
+        # Session -> index of its next scripted response
+        self._positions: dict[str, int] = {}
+
+        # Stats
+        self.requests = 0
+        self.errors = 0
+        self.probes = 0
+
+    def _next_entry(self, messages: list[dict]) -> dict:
+        """Take the next scripted response, or make an echo reply."""
+        if not self.script:
+            return {"content": f"Fake response to: {_last_user_text(messages)}"}
+        session = current_session.get() or ""
+        position = self._positions.get(session, 0)
+        if position >= len(self.script):
+            if not self.loop:
+                raise FakeProviderError(500, "Fake provider script is exhausted")
+            position = 0
+        self._positions[session] = position + 1
+        return self.script[position]
+
+    def _delay(self, seconds: float) -> float:
+        if seconds <= 0 or not self.jitter:
+            return max(0.0, seconds)
+        return max(0.0, seconds * (1 + self._random.uniform(-self.jitter, self.jitter)))
+
+    def _start(self, messages: list[dict]) -> dict:
+        """Count a request and pick its response, raising an injected error if due."""
+        self.requests += 1
+        entry = self._next_entry(messages)
+
+        error = entry.get("error")
+        if error is None and self.error_rate and self._random.random() < self.error_rate:
+            error = self.error_status
+        if error is not None:
+            self.errors += 1
+            if isinstance(error, dict):
+                raise FakeProviderError(error.get("status", 500), error.get("message", "Injected"))
+            raise FakeProviderError(int(error))
+        return entry
+
+    def _response(
+        self,
+        entry: dict,
+        messages: list[dict],
+        tools: list[dict] | None,
+        system: str | None,
+    ) -> ModelResponse:
+        tool_calls = [
+            ToolCall(
+                id=tc.get("id") or f"toolu_fake_{uuid.uuid4().hex[:12]}",
+                name=tc["name"],
+                arguments=tc.get("arguments", {}),
+            )
+            for tc in entry.get("tool_calls", [])
+        ]
+        content = entry.get("content")
+        usage = entry.get("usage") or {
+            "input_tokens": estimate_request_tokens(messages, tools, system),
+            "output_tokens": estimate_text_tokens(content or "")
+            + sum(estimate_text_tokens(json.dumps(tc.arguments)) for tc in tool_calls),
+        }
+        return ModelResponse(
+            content=content,
+            tool_calls=tool_calls,
+            stop_reason=entry.get("stop_reason") or ("tool_use" if tool_calls else "end_turn"),
+            usage=dict(usage),
+        )
+
+    async def call(
+        self,
+        messages: list[dict],
+        tools: list[dict] | None = None,
+        system: str | None = None,
+        max_tokens: int = 4096,
+    ) -> ModelResponse:
+        """Return the next scripted response after the simulated latency."""
+        entry = self._start(messages)
+        response = self._response(entry, messages, tools, system)
+
+        # A non-streaming call takes as long as the whole stream would
+        chunks = len(_split(response.content or "", self.chunk_size)) + len(response.tool_calls)
+        delay = self._delay(entry.get("ttft", self.ttft))
+        delay += sum(self._delay(self.chunk_delay) for _ in range(max(0, chunks - 1)))
+        await asyncio.sleep(delay)
+        return response
+
+    async def probe(self) -> ModelResponse:
+        """Answer a health probe without advancing any session's script.
+
+        Injected errors (``error_rate``) still apply, so a fake that is down
+        stays down for its probes.
+        """
+        self.probes += 1
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.errors += 1
+            raise FakeProviderError(self.error_status)
+        messages = [{"role": "user", "content": "ping"}]
+        return self._response({"content": "pong"}, messages, None, None)
+
+    async def stream(
+        self,
+        messages: list[dict],
+        tools: list[dict] | None = None,
+        system: str | None = None,
+        max_tokens: int = 4096,
+    ) -> AsyncGenerator[StreamChunk, None]:
+        """Stream the next scripted response in chunks, paced like a real model."""
+        entry = self._start(messages)
+        response = self._response(entry, messages, tools, system)
+
+        await asyncio.sleep(self._delay(entry.get("ttft", self.ttft)))
+        first = True
+        for chunk in self._chunks(response):
+            if not first:
+                await asyncio.sleep(self._delay(self.chunk_delay))
+            first = False
+            yield chunk
+
+        yield StreamChunk(type="usage", usage=response.usage)
+
+    def _chunks(self, response: ModelResponse) -> list[StreamChunk]:
+        chunks = [
+            StreamChunk(type="text", content=piece)
+            for piece in _split(response.content or "", self.chunk_size)
+        ]
+        for tc in response.tool_calls:
+            arguments = json.dumps(tc.arguments, ensure_ascii=False)
+            chunks.append(
+                StreamChunk(
+                    type="tool_use_start",
+                    tool_call=ToolCall(id=tc.id, name=tc.name, arguments={}),
+                )
+            )
+            chunks.extend(
+                StreamChunk(type="tool_use_delta", content=piece)
+                for piece in _split(arguments, self.chunk_size)
+            )
+            chunks.append(StreamChunk(type="tool_use_end", tool_call=tc))
+        return chunks
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "probes": self.probes,
+            "script_positions": dict(self._positions),
+            "script_length": len(self.script),
+        }
+
+
+def _split(text: str, size: int) -> list[str]:
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def _last_user_text(messages: list[dict]) -> str:
+    """Text of the last user message, for echo replies."""
+    for message in reversed(messages):
+        if message.get("role") != "user":
+            continue
+        content = message.get("content")
+        if isinstance(content, str):
+            return content
+        texts = [
+            b.get("text", "")
+            for b in content or []
+            if isinstance(b, dict) and b.get("type") == "text"
+        ]
+        if texts:
+            return " ".join(texts)
+    return ""
@@ -0,0 +1,159 @@
+"""Per-provider circuit breakers and background health probes."""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from enum import Enum
+from typing import Awaitable, Callable
+
+
+class CircuitState(Enum):
+    """Circuit breaker states."""
+
+    CLOSED = "closed"  # Healthy, requests flow
+    OPEN = "open"  # Failing, requests are skipped
+    HALF_OPEN = "half-open"  # Recovering, a single trial request is allowed
+
+
+@dataclass
+class CircuitBreaker:
+    """Circuit breaker for one provider.
+
+    Opens after ``failure_threshold`` consecutive failures. Once open for
+    ``recovery_timeout`` seconds it goes half-open and admits one trial
+    request: success closes the circuit, failure opens it again.
+    """
+
+    failure_threshold: int = 5
+    recovery_timeout: float = 30.0
+
+    state: CircuitState = CircuitState.CLOSED
+    failures: int = 0  # Consecutive failures
+    opened_at: float = 0.0
+    trips: int = 0  # Times the circuit opened
+    _trial_in_flight: bool = False
+
+    def available(self) -> bool:
+        """Check if a request could be sent now, without claiming the trial."""
+        if self.state == CircuitState.CLOSED:
+            return True
+        if self.state == CircuitState.OPEN:
+            return time.monotonic() - self.opened_at >= self.recovery_timeout
+        return not self._trial_in_flight
+
+    def acquire(self) -> bool:
+        """Claim the right to send a request; half-open admits one at a time."""
+        if not self.available():
+            return False
+        if self.state == CircuitState.OPEN:
+            self.state = CircuitState.HALF_OPEN
+        if self.state == CircuitState.HALF_OPEN:
+            self._trial_in_flight = True
+        return True
+
+    def release(self) -> None:
+        """Give back a claimed trial whose request ended without a verdict."""
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> bool:
+        """Record a failed request. Returns True if this opened the circuit."""
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == CircuitState.HALF_OPEN or (
+            self.state == CircuitState.CLOSED and self.failures >= self.failure_threshold
+        ):
+            self.state = CircuitState.OPEN
+            self.opened_at = time.monotonic()
+            self.trips += 1
+            return True
+        return False
+
+    def to_dict(self) -> dict:
+        return {
+            "state": self.state.value,
+            "consecutive_failures": self.failures,
+            "trips": self.trips,
+        }
+
+
+class HealthMonitor:
+    """Circuit breakers for all providers of a router.
+
+    With a ``probe`` callback, an open circuit is probed in the background
+    once its recovery timeout has passed, so a provider that came back is
+    closed again without a user request paying for the trial.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        probe: Callable[[str], Awaitable[None]] | None = None,
+    ):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._probe = probe
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._probes: dict[str, asyncio.Task] = {}
+
+    def breaker(self, name: str) -> CircuitBreaker:
+        """Get the breaker of a provider, creating it on first use."""
+        breaker = self._breakers.get(name)
+        if breaker is None:
+            breaker = self._breakers[name] = CircuitBreaker(
+                failure_threshold=self.failure_threshold,
+                recovery_timeout=self.recovery_timeout,
+            )
+        return breaker
+
+    def available(self, name: str) -> bool:
+        return self.breaker(name).available()
+
+    def acquire(self, name: str) -> bool:
+        return self.breaker(name).acquire()
+
+    def release(self, name: str) -> None:
+        self.breaker(name).release()
+
+    def record_success(self, name: str) -> None:
+        self.breaker(name).record_success()
+
+    def record_failure(self, name: str) -> None:
+        if self.breaker(name).record_failure() and self._probe is not None:
+            task = self._probes.get(name)
+            if task is None or task.done():
+                self._probes[name] = asyncio.create_task(self._probe_until_closed(name))
+
+    async def _probe_until_closed(self, name: str) -> None:
+        """Probe an open circuit after each recovery timeout until it closes."""
+        breaker = self.breaker(name)
+        while breaker.state != CircuitState.CLOSED:
+            await asyncio.sleep(breaker.recovery_timeout)
+            if not breaker.acquire():
+                continue  # A user request is already trying it
+            try:
+                await self._probe(name)
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except Exception:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+    async def close(self) -> None:
+        """Stop background probes."""
+        tasks = list(self._probes.values())
+        self._probes.clear()
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def to_dict(self) -> dict:
+        return {name: breaker.to_dict() for name, breaker in self._breakers.items()}
@@ -0,0 +1,204 @@
+"""Per-provider latency and error statistics for routing."""
+
+import math
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+# What a latency score measures: time to the first streamed chunk, for
+# streamed requests, or the whole request, for non-streaming calls
+METRIC_TTFT = "ttft"
+METRIC_DURATION = "duration"
+METRICS = (METRIC_TTFT, METRIC_DURATION)
+
+
+def _percentile(samples: deque[float], fraction: float) -> float | None:
+    """Nearest-rank percentile of a small sample window."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1)]
+
+
+@dataclass
+class LatencyStats:
+    """Latency and error statistics of one provider.
+
+    Keeps an exponentially weighted moving average (EWMA) of time-to-first-
+    token and total duration, a window of recent samples for tail latency,
+    and an EWMA error rate.
+    """
+
+    alpha: float = 0.2
+    window: int = 64
+
+    ttft: float | None = None  # EWMA seconds to the first streamed chunk
+    duration: float | None = None  # EWMA seconds for the whole request
+    error_rate: float = 0.0
+    requests: int = 0
+    errors: int = 0
+    last_request: float | None = None  # time.monotonic() of the last recorded request
+
+    _ttft_samples: deque[float] = field(default_factory=deque, repr=False)
+    _duration_samples: deque[float] = field(default_factory=deque, repr=False)
+
+    def record_success(self, duration: float, ttft: float | None = None) -> None:
+        """Record a completed request.
+
+        Streamed requests pass their time-to-first-token; their duration
+        depends on the output length, so only calls record one.
+        """
+        self.requests += 1
+        self.last_request = time.monotonic()
+        if ttft is not None:
+            self.ttft = self._ewma(self.ttft, ttft)
+            self._add_sample(self._ttft_samples, ttft)
+        else:
+            self.duration = self._ewma(self.duration, duration)
+            self._add_sample(self._duration_samples, duration)
+        self.error_rate = (1 - self.alpha) * self.error_rate
+
+    def record_error(self) -> None:
+        """Record a failed request."""
+        self.requests += 1
+        self.errors += 1
+        self.last_request = time.monotonic()
+        self.error_rate = (1 - self.alpha) * self.error_rate + self.alpha
+
+    @property
+    def ttft_p95(self) -> float | None:
+        return _percentile(self._ttft_samples, 0.95)
+
+    @property
+    def duration_p95(self) -> float | None:
+        return _percentile(self._duration_samples, 0.95)
+
+    def score(self, metric: str = METRIC_TTFT, tail_weight: float = 0.5) -> float:
+        """Expected latency in seconds of one kind of request, lower is better.
+
+        The average of the metric is blended with its tail and inflated by
+        the error rate. Providers without samples of the metric score 0 so
+        they get tried, unless they have only ever failed.
+        """
+        if metric == METRIC_TTFT:
+            average, tail = self.ttft, self.ttft_p95
+        else:
+            average, tail = self.duration, self.duration_p95
+        if average is None or tail is None:
+            return math.inf if self.errors == self.requests > 0 else 0.0
+
+        latency = average + tail_weight * max(0.0, tail - average)
+        return latency * (1 + 4 * self.error_rate)
+
+    def to_dict(self) -> dict:
+        return {
+            "ttft": self.ttft,
+            "ttft_p95": self.ttft_p95,
+            "duration": self.duration,
+            "duration_p95": self.duration_p95,
+            "error_rate": round(self.error_rate, 4),
+            "requests": self.requests,
+            "errors": self.errors,
+        }
+
+    def _ewma(self, current: float | None, sample: float) -> float:
+        if current is None:
+            return sample
+        return (1 - self.alpha) * current + self.alpha * sample
+
+    def _add_sample(self, samples: deque[float], sample: float) -> None:
+        samples.append(sample)
+        if len(samples) > self.window:
+            samples.popleft()
+
+
+class LatencyTracker:
+    """Latency statistics for all providers of a router.
+
+    Providers are ordered per metric: healthy ones (error rate below
+    ``unhealthy_error_rate``) first, then the fastest, then by priority.
+    ``version`` increases only when one of these orders changes, so rankings
+    built from them stay cached until then. With ``explore_rate``, that share
+    of requests is offered to the provider tried least recently, so one that
+    was slow once is sampled again.
+    """
+
+    def __init__(
+        self,
+        alpha: float = 0.2,
+        window: int = 64,
+        tail_weight: float = 0.5,
+        unhealthy_error_rate: float = 0.5,
+        explore_rate: float = 0.0,
+        seed: int | None = None,
+    ):
+        self.alpha = alpha
+        self.window = window
+        self.tail_weight = tail_weight
+        self.unhealthy_error_rate = unhealthy_error_rate
+        self.explore_rate = explore_rate
+        self.version = 0
+        self.explorations = 0
+        self._stats: dict[str, LatencyStats] = {}
+        self._priorities: dict[str, int] = {}
+        self._orders: dict[str, list[str]] = {metric: [] for metric in METRICS}
+        self._random = random.Random(seed)
+
+    def add(self, name: str, priority: int = 0) -> None:
+        """Track a provider, breaking ties in its favor over lower priorities."""
+        self._priorities[name] = priority
+        self._stats.setdefault(name, LatencyStats(alpha=self.alpha, window=self.window))
+        self._update_orders()
+
+    def remove(self, name: str) -> None:
+        self._priorities.pop(name, None)
+        if self._stats.pop(name, None) is not None:
+            self._update_orders()
+
+    def get(self, name: str) -> LatencyStats:
+        """Get the statistics of a provider, tracking it on first use."""
+        if name not in self._stats:
+            self.add(name)
+        return self._stats[name]
+
+    def score(self, name: str, metric: str = METRIC_TTFT) -> float:
+        return self.get(name).score(metric, self.tail_weight)
+
+    def order(self, metric: str = METRIC_TTFT) -> list[str]:
+        """Provider names, best first for requests measured by metric."""
+        return self._orders[metric]
+
+    def record_success(self, name: str, duration: float, ttft: float | None = None) -> None:
+        self.get(name).record_success(duration, ttft)
+        self._update_orders()
+
+    def record_error(self, name: str) -> None:
+        self.get(name).record_error()
+        self._update_orders()
+
+    def explore(self, names: list[str]) -> str | None:
+        """Sometimes pick the least recently tried of names, else None."""
+        if not names or self._random.random() >= self.explore_rate:
+            return None
+        self.explorations += 1
+        return min(names, key=lambda name: self.get(name).last_request or -math.inf)
+
+    def _key(self, name: str, metric: str) -> tuple[bool, float, int]:
+        stats = self._stats[name]
+        unhealthy = stats.error_rate >= self.unhealthy_error_rate
+        return unhealthy, stats.score(metric, self.tail_weight), -self._priorities.get(name, 0)
+
+    def _update_orders(self) -> None:
+        """Re-sort the providers, moving the version only if an order changed."""
+        changed = False
+        for metric in METRICS:
+            order = sorted(self._stats, key=lambda name: self._key(name, metric))
+            if order != self._orders[metric]:
+                self._orders[metric] = order
+                changed = True
+        if changed:
+            self.version += 1
+
+    def to_dict(self) -> dict:
+        return {name: stats.to_dict() for name, stats in self._stats.items()}
@@ -0,0 +1,282 @@
+"""Usage and cost ledger of model requests across sessions."""
+
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator
+
+from honolulu.models.base import ModelProvider, ModelResponse, StreamChunk
+from honolulu.models.ratelimit import current_session
+
+# Turn of the current session that model requests belong to
+current_turn: ContextVar[int] = ContextVar("current_turn", default=0)
+
+# Anthropic bills cache reads at 10% and cache writes at 125% of the input price
+CACHE_READ_MULTIPLIER = 0.1
+CACHE_WRITE_MULTIPLIER = 1.25
+
+
+@dataclass
+class ModelPrice:
+    """Price of a provider per 1k tokens."""
+
+    input_per_1k: float = 0.0
+    output_per_1k: float = 0.0
+
+    def cost(self, usage: dict[str, int]) -> float:
+        """Cost of one request's reported usage."""
+        input_cost = (
+            usage.get("input_tokens", 0)
+            + usage.get("cache_read_input_tokens", 0) * CACHE_READ_MULTIPLIER
+            + usage.get("cache_creation_input_tokens", 0) * CACHE_WRITE_MULTIPLIER
+        ) * self.input_per_1k
+        return (input_cost + usage.get("output_tokens", 0) * self.output_per_1k) / 1000
+
+
+@dataclass
+class LedgerEntry:
+    """One model request."""
+
+    provider: str
+    session: str
+    turn: int
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cost: float = 0.0
+    latency: float | None = None  # Seconds from sending the request to its usage
+    timestamp: float = field(default_factory=time.time)
+
+    def to_dict(self) -> dict:
+        return {
+            "provider": self.provider,
+            "session": self.session,
+            "turn": self.turn,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cache_read_input_tokens": self.cache_read_input_tokens,
+            "cache_creation_input_tokens": self.cache_creation_input_tokens,
+            "cost": round(self.cost, 6),
+            "latency": self.latency,
+            "timestamp": self.timestamp,
+        }
+
+
+@dataclass
+class UsageSummary:
+    """Totals over a set of ledger entries."""
+
+    requests: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cost: float = 0.0
+    latency: float = 0.0  # Summed over requests with a known latency
+    timed_requests: int = 0
+
+    def add(self, entry: LedgerEntry) -> None:
+        self.requests += 1
+        self.input_tokens += entry.input_tokens
+        self.output_tokens += entry.output_tokens
+        self.cache_read_input_tokens += entry.cache_read_input_tokens
+        self.cache_creation_input_tokens += entry.cache_creation_input_tokens
+        self.cost += entry.cost
+        if entry.latency is not None:
+            self.latency += entry.latency
+            self.timed_requests += 1
+
+    @property
+    def average_latency(self) -> float | None:
+        return self.latency / self.timed_requests if self.timed_requests else None
+
+    @property
+    def average_input_tokens(self) -> float:
+        """Average input per request, cached tokens included."""
+        if not self.requests:
+            return 0.0
+        total = self.input_tokens + self.cache_read_input_tokens + self.cache_creation_input_tokens
+        return total / self.requests
+
+    @property
+    def average_output_tokens(self) -> float:
+        return self.output_tokens / self.requests if self.requests else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "requests": self.requests,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cache_read_input_tokens": self.cache_read_input_tokens,
+            "cache_creation_input_tokens": self.cache_creation_input_tokens,
+            "cost": round(self.cost, 6),
+            "average_latency": self.average_latency,
+        }
+
+
+class UsageLedger:
+    """Records tokens, cost and latency of every model request.
+
+    Totals are kept per provider, per session and per turn of a session;
+    the most recent ``max_entries`` individual requests are kept for
+    filtered queries. ``version`` increases with every record, so routing
+    decisions derived from the ledger can be cached until it moves.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self._entries: deque[LedgerEntry] = deque(maxlen=max_entries)
+        self._prices: dict[str, ModelPrice] = {}
+        self.total = UsageSummary()
+        self._by_provider: dict[str, UsageSummary] = {}
+        self._by_session: dict[str, UsageSummary] = {}
+        self._by_turn: dict[str, dict[int, UsageSummary]] = {}
+        self.version = 0
+
+    def set_price(self, provider: str, input_per_1k: float, output_per_1k: float) -> None:
+        """Set the price used to cost a provider's requests."""
+        self._prices[provider] = ModelPrice(input_per_1k, output_per_1k)
+
+    def price(self, provider: str) -> ModelPrice:
+        return self._prices.get(provider) or ModelPrice()
+
+    def record(
+        self,
+        provider: str,
+        usage: dict[str, int],
+        latency: float | None = None,
+        turn: int | None = None,
+        session: str | None = None,
+    ) -> LedgerEntry:
+        """Record one request. The session and turn default to the current ones."""
+        if session is None:
+            session = current_session.get() or ""
+        if turn is None:
+            turn = current_turn.get()
+        entry = LedgerEntry(
+            provider=provider,
+            session=session,
+            turn=turn,
+            input_tokens=usage.get("input_tokens", 0),
+            output_tokens=usage.get("output_tokens", 0),
+            cache_read_input_tokens=usage.get("cache_read_input_tokens", 0),
+            cache_creation_input_tokens=usage.get("cache_creation_input_tokens", 0),
+            cost=self.price(provider).cost(usage),
+            latency=latency,
+        )
+
+        self._entries.append(entry)
+        self.total.add(entry)
+        self._by_provider.setdefault(provider, UsageSummary()).add(entry)
+        self._by_session.setdefault(session, UsageSummary()).add(entry)
+        self._by_turn.setdefault(session, {}).setdefault(turn, UsageSummary()).add(entry)
+        self.version += 1
+        return entry
+
+    def summary(
+        self,
+        session: str | None = None,
+        provider: str | None = None,
+        since: float | None = None,
+    ) -> UsageSummary:
+        """Totals matching the filters.
+
+        Single session or provider totals are kept up to date; combined
+        filters and ``since`` (a Unix timestamp) scan the retained entries.
+        """
+        if since is None:
+            if session is None and provider is None:
+                return self.total
+            if provider is None:
+                return self._by_session.get(session) or UsageSummary()
+            if session is None:
+                return self._by_provider.get(provider) or UsageSummary()
+
+        result = UsageSummary()
+        for entry in self._entries:
+            if (
+                (session is None or entry.session == session)
+                and (provider is None or entry.provider == provider)
+                and (since is None or entry.timestamp >= since)
+            ):
+                result.add(entry)
+        return result
+
+    def by_provider(self) -> dict[str, UsageSummary]:
+        return dict(self._by_provider)
+
+    def by_session(self) -> dict[str, UsageSummary]:
+        return dict(self._by_session)
+
+    def turns(self, session: str) -> dict[int, UsageSummary]:
+        """Totals of each turn of a session."""
+        return dict(self._by_turn.get(session, {}))
+
+    def entries(self, session: str | None = None, limit: int = 100) -> list[LedgerEntry]:
+        """The most recent requests, newest last."""
+        matching = [e for e in self._entries if session is None or e.session == session]
+        return matching[-limit:] if limit > 0 else []
+
+    def expected_cost(self, provider: str, usage: UsageSummary | None = None) -> float:
+        """Cost of an average request at a provider's price.
+
+        The average request is taken from ``usage`` (all recorded traffic by
+        default), so providers are compared on the workload actually seen,
+        e.g. output-heavy sessions favor cheap output tokens. Without any
+        traffic an even 1k input / 1k output request is assumed.
+        """
+        usage = usage or self.total
+        price = self.price(provider)
+        if not usage.requests:
+            return price.input_per_1k + price.output_per_1k
+        return (
+            usage.average_input_tokens * price.input_per_1k
+            + usage.average_output_tokens * price.output_per_1k
+        ) / 1000
+
+
+class MeteredProvider(ModelProvider):
+    """Wraps a provider to record every request it sends in a ledger.
+
+    Routers record their providers' requests themselves; this covers a
+    provider used on its own. Responses replayed from a cache are not
+    recorded, they never reached the provider.
+    """
+
+    def __init__(self, provider: ModelProvider, ledger: UsageLedger):
+        self.provider = provider
+        self.ledger = ledger
+        self.name = provider.name
+
+    def __getattr__(self, name: str) -> Any:
+        # Everything else (model, client, ...) comes from the wrapped provider
+        if name == "provider":
+            raise AttributeError(name)
+        return getattr(self.provider, name)
+
+    async def call(
+        self,
+        messages: list[dict],
+        tools: list[dict] | None = None,
+        system: str | None = None,
+        max_tokens: int = 4096,
+    ) -> ModelResponse:
+        start = time.monotonic()
+        response = await self.provider.call(messages, tools, system, max_tokens)
+        if response.usage and not response.cached:
+            self.ledger.record(self.name, response.usage, latency=time.monotonic() - start)
+        return response
+
+    async def stream(
+        self,
+        messages: list[dict],
+        tools: list[dict] | None = None,
+        system: str | None = None,
+        max_tokens: int = 4096,
+    ) -> AsyncGenerator[StreamChunk, None]:
+        start = time.monotonic()
+        async for chunk in self.provider.stream(messages, tools, system, max_tokens):
+            if chunk.type == "usage" and chunk.usage and not chunk.cached:
+                self.ledger.record(self.name, chunk.usage, latency=time.monotonic() - start)
+            yield chunk
@@ -1,9 +1,96 @@
 """OpenAI-compatible model provider."""
 
 import json
-from typing import Any, AsyncGenerator
+import weakref
+from typing import Any, AsyncGenerator, Callable
 
 from honolulu.models.base import ModelProvider, ModelResponse, StreamChunk, ToolCall
+from honolulu.models.ratelimit import rate_limit_headers
+from honolulu.models.streaming import JSONAssembler
+
+
+class _WeakCache:
+    """Values derived from objects, kept exactly as long as each object lives.
+
+    Entries are keyed by identity through weak references, so the cache
+    keeps nothing alive: an entry goes away with its object, e.g. when a
+    session's history is cleared or the session deleted. Objects that cannot
+    be weakly referenced (plain dicts and lists) are not cached.
+    """
+
+    def __init__(self, on_drop: Callable[[Any], None] | None = None):
+        self._entries: dict[int, tuple[weakref.ref, Any]] = {}
+        self._on_drop = on_drop
+
+    def get(self, obj: Any) -> Any | None:
+        entry = self._entries.get(id(obj))
+        if entry is None or entry[0]() is not obj:
+            return None
+        return entry[1]
+
+    def put(self, obj: Any, value: Any) -> bool:
+        """Cache a value for ``obj``. Returns False if ``obj`` cannot be cached."""
+        key = id(obj)
+        try:
+            ref = weakref.ref(obj, lambda ref: self._drop(key, ref))
+        except TypeError:
+            return False
+        old = self._entries.get(key)
+        self._entries[key] = (ref, value)
+        if old is not None and self._on_drop is not None:
+            self._on_drop(old[1])
+        return True
+
+    def _drop(self, key: int, ref: weakref.ref) -> None:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is ref:
+            del self._entries[key]
+            if self._on_drop is not None:
+                self._on_drop(entry[1])
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _DataURLs:
+    """Data URLs of base64 images, built once per image string.
+
+    Every cached message carrying the same base64 string (e.g. one upload
+    from the attachment store) shares one data URL. An entry is dropped when
+    the last message using it is released.
+    """
+
+    def __init__(self):
+        # id(base64) -> [base64, data URL, users]
+        self._urls: dict[int, list] = {}
+
+    def acquire(self, media_type: str, data: str) -> str:
+        entry = self._urls.get(id(data))
+        if entry is None:
+            entry = self._urls[id(data)] = [data, f"data:{media_type};base64,{data}", 0]
+        entry[2] += 1
+        return entry[1]
+
+    def release(self, data: str) -> None:
+        entry = self._urls.get(id(data))
+        if entry is not None:
+            entry[2] -= 1
+            if entry[2] <= 0:
+                del self._urls[id(data)]
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+
+def _tool_result_text(content: Any) -> str:
+    """Flatten tool result content (a string or content blocks) to text."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(
+            b.get("text", "") for b in content if isinstance(b, dict) and b.get("type") == "text"
+        )
+    return str(content)
 
 
 class OpenAIProvider(ModelProvider):
@@ -16,6 +103,8 @@ class OpenAIProvider(ModelProvider):
         api_key: str,
         model: str = "gpt-4o",
         base_url: str | None = None,
+        client: Any | None = None,
+        max_retries: int | None = None,
     ):
         try:
             from openai import AsyncOpenAI
@@ -24,54 +113,141 @@ class OpenAIProvider(ModelProvider):
                 "openai package not installed. Install with: pip install honolulu[routing]"
             )
 
-        self.client = AsyncOpenAI(
+        # An existing client can be passed in to share its connection pool.
+        # max_retries=None keeps the SDK's own retries; routers pass 0 and
+        # retry themselves.
+        retries = {} if max_retries is None else {"max_retries": max_retries}
+        self.client = client or AsyncOpenAI(
             api_key=api_key,
             base_url=base_url,
+            **retries,
         )
         self.model = model
 
+        # Conversions reused across calls for as long as their sources live
+        self._data_urls = _DataURLs()
+        self._message_cache = _WeakCache(on_drop=self._release_images)
+        self._tools_cache = _WeakCache()
+
     def _convert_tools(self, tools: list[dict] | None) -> list[dict] | None:
-        """Convert Anthropic tool format to OpenAI format."""
+        """Convert Anthropic tool format to OpenAI format.
+
+        Tool definition lists are shared and never modified (see
+        ToolManager), so the conversion is cached per definitions list.
+        """
         if not tools:
             return None
 
-        openai_tools = []
-        for tool in tools:
-            openai_tools.append({
-                "type": "function",
-                "function": {
-                    "name": tool["name"],
-                    "description": tool.get("description", ""),
-                    "parameters": tool.get("input_schema", {"type": "object", "properties": {}}),
-                },
-            })
+        openai_tools = self._tools_cache.get(tools)
+        if openai_tools is None:
+            openai_tools = [
+                {
+                    "type": "function",
+                    "function": {
+                        "name": tool["name"],
+                        "description": tool.get("description", ""),
+                        "parameters": tool.get(
+                            "input_schema", {"type": "object", "properties": {}}
+                        ),
+                    },
+                }
+                for tool in tools
+            ]
+            self._tools_cache.put(tools, openai_tools)
         return openai_tools
 
     def _convert_messages(self, messages: list[dict], system: str | None) -> list[dict]:
-        """Convert Anthropic message format to OpenAI format."""
-        openai_messages = []
+        """Convert Anthropic message format to OpenAI format.
+
+        The agent's API messages (``APIMessage``) are replaced, never
+        modified, once sent, so each is converted once and the conversion of
+        an unchanged history prefix is reused while the message lives.
+        """
+        openai_messages: list[dict] = []
 
         if system:
             openai_messages.append({"role": "system", "content": system})
 
+        cache = self._message_cache
         for msg in messages:
-            role = msg["role"]
-            content = msg["content"]
-
-            if isinstance(content, str):
-                openai_messages.append({"role": role, "content": content})
-            elif isinstance(content, list):
-                # Handle tool results
-                for block in content:
-                    if block.get("type") == "tool_result":
-                        openai_messages.append({
-                            "role": "tool",
-                            "tool_call_id": block["tool_use_id"],
-                            "content": str(block.get("content", "")),
-                        })
-                    elif block.get("type") == "text":
-                        openai_messages.append({"role": role, "content": block["text"]})
+            cached = cache.get(msg)
+            if cached is None:
+                images: list[str] = []
+                cached = (self._convert_message(msg, images), images)
+                if not cache.put(msg, cached):
+                    self._release_images(cached)
+            openai_messages.extend(cached[0])
+
+        return openai_messages
+
+    def _release_images(self, cached: tuple[list[dict], list[str]]) -> None:
+        """Release the image data URLs of a converted message."""
+        for data in cached[1]:
+            self._data_urls.release(data)
+
+    def _convert_message(self, msg: dict, images: list[str]) -> list[dict]:
+        """Convert one Anthropic message into one or more OpenAI messages.
+
+        Base64 image strings whose data URLs were used are added to ``images``.
+        """
+        role = msg["role"]
+        content = msg["content"]
+
+        if isinstance(content, str):
+            return [{"role": role, "content": content}]
+
+        if role == "assistant":
+            text = "".join(b.get("text", "") for b in content if b.get("type") == "text")
+            tool_calls = [
+                {
+                    "id": b["id"],
+                    "type": "function",
+                    "function": {
+                        "name": b["name"],
+                        "arguments": json.dumps(b.get("input", {}), ensure_ascii=False),
+                    },
+                }
+                for b in content
+                if b.get("type") == "tool_use"
+            ]
+            converted: dict[str, Any] = {"role": "assistant", "content": text}
+            if tool_calls:
+                # Content is null on a message that only calls tools
+                converted["content"] = text or None
+                converted["tool_calls"] = tool_calls
+            return [converted]
+
+        # Tool results become tool messages, which must directly follow the
+        # assistant message that made the calls; other blocks form one message
+        openai_messages = []
+        parts: list[dict] = []
+        for block in content:
+            block_type = block.get("type")
+            if block_type == "tool_result":
+                openai_messages.append({
+                    "role": "tool",
+                    "tool_call_id": block["tool_use_id"],
+                    "content": _tool_result_text(block.get("content", "")),
+                })
+            elif block_type == "text":
+                parts.append({"type": "text", "text": block["text"]})
+            elif block_type == "image":
+                source = block.get("source", {})
+                if source.get("type") == "base64":
+                    data = source.get("data", "")
+                    url = self._data_urls.acquire(source.get("media_type", "image/png"), data)
+                    images.append(data)
+                else:
+                    url = source.get("url")
+                if url:
+                    parts.append({"type": "image_url", "image_url": {"url": url}})
 
+        if parts:
+            if all(part["type"] == "text" for part in parts):
+                text = "\n".join(part["text"] for part in parts)
+                openai_messages.append({"role": role, "content": text})
+            else:
+                openai_messages.append({"role": role, "content": parts})
         return openai_messages
 
     async def call(
@@ -94,7 +270,8 @@ class OpenAIProvider(ModelProvider):
         if openai_tools:
             kwargs["tools"] = openai_tools
 
-        response = await self.client.chat.completions.create(**kwargs)
+        raw = await self.client.chat.completions.with_raw_response.create(**kwargs)
+        response = raw.parse()
 
         choice = response.choices[0]
         content = choice.message.content
@@ -102,14 +279,17 @@ class OpenAIProvider(ModelProvider):
 
         if choice.message.tool_calls:
             for tc in choice.message.tool_calls:
+                invalid = False
                 try:
                     arguments = json.loads(tc.function.arguments)
                 except json.JSONDecodeError:
                     arguments = {}
+                    invalid = True
                 tool_calls.append(ToolCall(
                     id=tc.id,
                     name=tc.function.name,
                     arguments=arguments,
+                    invalid_arguments=invalid,
                 ))
 
         return ModelResponse(
@@ -120,6 +300,7 @@ class OpenAIProvider(ModelProvider):
                 "input_tokens": response.usage.prompt_tokens if response.usage else 0,
                 "output_tokens": response.usage.completion_tokens if response.usage else 0,
             },
+            rate_limits=rate_limit_headers(raw.headers),
         )
 
     async def stream(
@@ -138,6 +319,8 @@ class OpenAIProvider(ModelProvider):
             "messages": openai_messages,
             "max_tokens": max_tokens,
             "stream": True,
+            # Ask for a final chunk carrying token usage
+            "stream_options": {"include_usage": True},
         }
 
         if openai_tools:
@@ -146,53 +329,85 @@ class OpenAIProvider(ModelProvider):
         current_tool_call: dict[str, Any] | None = None
 
         stream = await self.client.chat.completions.create(**kwargs)
-        async for chunk in stream:
-            if not chunk.choices:
-                continue
-
-            delta = chunk.choices[0].delta
-            if not delta:
-                continue
-
-            if delta.content:
-                yield StreamChunk(type="text", content=delta.content)
-
-            if delta.tool_calls:
-                for tc in delta.tool_calls:
-                    if tc.function and tc.function.name:
-                        # New tool call starting
-                        current_tool_call = {
-                            "id": tc.id or "",
-                            "name": tc.function.name,
-                            "arguments_json": tc.function.arguments or "",
-                        }
-                        yield StreamChunk(
-                            type="tool_use_start",
-                            tool_call=ToolCall(
-                                id=tc.id or "",
-                                name=tc.function.name,
-                                arguments={},
-                            ),
-                        )
-                    elif tc.function and tc.function.arguments and current_tool_call:
-                        current_tool_call["arguments_json"] += tc.function.arguments
-                        yield StreamChunk(
-                            type="tool_use_delta",
-                            content=tc.function.arguments,
-                        )
-
-            if chunk.choices[0].finish_reason and current_tool_call:
-                try:
-                    arguments = json.loads(current_tool_call["arguments_json"])
-                except json.JSONDecodeError:
-                    arguments = {}
+        rate_limits = rate_limit_headers(stream.response.headers)
+        # Close the HTTP response even if the consumer stops or is cancelled
+        async with stream:
+            async for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    yield StreamChunk(
+                        type="usage",
+                        usage={
+                            "input_tokens": chunk.usage.prompt_tokens or 0,
+                            "output_tokens": chunk.usage.completion_tokens or 0,
+                        },
+                        rate_limits=rate_limits,
+                    )
+
+                if not chunk.choices:
+                    continue
+
+                delta = chunk.choices[0].delta
+                if not delta:
+                    continue
+
+                if delta.content:
+                    yield StreamChunk(type="text", content=delta.content)
 
-                yield StreamChunk(
-                    type="tool_use_end",
-                    tool_call=ToolCall(
-                        id=current_tool_call["id"],
-                        name=current_tool_call["name"],
-                        arguments=arguments,
-                    ),
-                )
-                current_tool_call = None
+                if delta.tool_calls:
+                    for tc in delta.tool_calls:
+                        if tc.function and tc.function.name:
+                            # New tool call starting, the previous one is complete
+                            if current_tool_call:
+                                yield self._finish_tool_call(current_tool_call)
+                            current_tool_call = {
+                                "id": tc.id or "",
+                                "name": tc.function.name,
+                                "arguments": JSONAssembler(),
+                            }
+                            current_tool_call["arguments"].append(tc.function.arguments or "")
+                            yield StreamChunk(
+                                type="tool_use_start",
+                                tool_call=ToolCall(
+                                    id=tc.id or "",
+                                    name=tc.function.name,
+                                    arguments={},
+                                ),
+                            )
+                        elif tc.function and tc.function.arguments and current_tool_call:
+                            assembler = current_tool_call["arguments"]
+                            assembler.append(tc.function.arguments)
+                            delta_chunk = StreamChunk(
+                                type="tool_use_delta",
+                                content=tc.function.arguments,
+                            )
+                            partial = assembler.preview()
+                            if isinstance(partial, dict):
+                                delta_chunk.tool_call = ToolCall(
+                                    id=current_tool_call["id"],
+                                    name=current_tool_call["name"],
+                                    arguments=partial,
+                                )
+                            yield delta_chunk
+
+                if chunk.choices[0].finish_reason and current_tool_call:
+                    yield self._finish_tool_call(current_tool_call)
+                    current_tool_call = None
+
+    def _finish_tool_call(self, tool_call: dict[str, Any]) -> StreamChunk:
+        """Build the tool_use_end chunk for a fully streamed tool call."""
+        invalid = False
+        try:
+            arguments = tool_call["arguments"].parse()
+        except json.JSONDecodeError:
+            arguments = {}
+            invalid = True
+
+        return StreamChunk(
+            type="tool_use_end",
+            tool_call=ToolCall(
+                id=tool_call["id"],
+                name=tool_call["name"],
+                arguments=arguments,
+                invalid_arguments=invalid,
+            ),
+        )
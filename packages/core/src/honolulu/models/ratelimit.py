@@ -0,0 +1,337 @@
+"""Client-side rate limiting of provider requests."""
+
+import asyncio
+import re
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Mapping
+
+# Session the current request belongs to; queued requests are served
+# round-robin across sessions so one busy session cannot starve the others
+current_session: ContextVar[str | None] = ContextVar("current_session", default=None)
+
+# Response headers worth keeping from a provider response
+_HEADER_PREFIXES = ("anthropic-ratelimit-", "x-ratelimit-")
+_RETRY_HEADERS = ("retry-after", "retry-after-ms")
+
+# Durations like "1s", "6m0s" or "20ms" (OpenAI reset headers)
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+# Backoff for 429s that come without a Retry-After header
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+
+def rate_limit_headers(headers: Mapping[str, str] | None) -> dict[str, str] | None:
+    """Pick the rate-limit related headers out of a response's headers."""
+    if not headers:
+        return None
+    picked = {
+        name.lower(): value
+        for name, value in headers.items()
+        if name.lower().startswith(_HEADER_PREFIXES) or name.lower() in _RETRY_HEADERS
+    }
+    return picked or None
+
+
+def _parse_seconds(value: str | None) -> float | None:
+    """Parse a reset value: seconds, a duration like "6m0s", or a timestamp."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    parts = _DURATION_PART.findall(value)
+    if parts and "".join(n + u for n, u in parts) == value:
+        return sum(float(n) * _UNIT_SECONDS[u] for n, u in parts)
+
+    try:
+        reset_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return max(0.0, reset_at.timestamp() - time.time())
+
+
+def _parse_int(value: str | None) -> int | None:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+@dataclass
+class RateLimitInfo:
+    """Limits reported by a provider's response headers."""
+
+    request_limit: int | None = None
+    requests_remaining: int | None = None
+    requests_reset: float | None = None  # Seconds until the request budget resets
+    token_limit: int | None = None
+    tokens_remaining: int | None = None
+    tokens_reset: float | None = None
+    retry_after: float | None = None  # Seconds to wait before retrying
+
+    @classmethod
+    def from_headers(cls, headers: Mapping[str, str] | None) -> "RateLimitInfo":
+        """Parse Anthropic (anthropic-ratelimit-*) or OpenAI (x-ratelimit-*) headers."""
+        h = {name.lower(): value for name, value in (headers or {}).items()}
+
+        retry_after = _parse_seconds(h.get("retry-after"))
+        if "retry-after-ms" in h:
+            retry_ms = _parse_seconds(h["retry-after-ms"])
+            if retry_ms is not None:
+                retry_after = retry_ms / 1000
+
+        if any(name.startswith("anthropic-ratelimit-") for name in h):
+            # Prefer the combined token limit, else the input token limit
+            prefix = "anthropic-ratelimit-"
+            tokens = "tokens" if f"{prefix}tokens-limit" in h else "input-tokens"
+            return cls(
+                request_limit=_parse_int(h.get(f"{prefix}requests-limit")),
+                requests_remaining=_parse_int(h.get(f"{prefix}requests-remaining")),
+                requests_reset=_parse_seconds(h.get(f"{prefix}requests-reset")),
+                token_limit=_parse_int(h.get(f"{prefix}{tokens}-limit")),
+                tokens_remaining=_parse_int(h.get(f"{prefix}{tokens}-remaining")),
+                tokens_reset=_parse_seconds(h.get(f"{prefix}{tokens}-reset")),
+                retry_after=retry_after,
+            )
+
+        return cls(
+            request_limit=_parse_int(h.get("x-ratelimit-limit-requests")),
+            requests_remaining=_parse_int(h.get("x-ratelimit-remaining-requests")),
+            requests_reset=_parse_seconds(h.get("x-ratelimit-reset-requests")),
+            token_limit=_parse_int(h.get("x-ratelimit-limit-tokens")),
+            tokens_remaining=_parse_int(h.get("x-ratelimit-remaining-tokens")),
+            tokens_reset=_parse_seconds(h.get("x-ratelimit-reset-tokens")),
+            retry_after=retry_after,
+        )
+
+
+def rate_limit_error(error: Exception) -> RateLimitInfo | None:
+    """Rate limit info of a 429 error from either SDK, or None for other errors."""
+    if getattr(error, "status_code", None) != 429:
+        return None
+    response = getattr(error, "response", None)
+    return RateLimitInfo.from_headers(getattr(response, "headers", None))
+
+
+class TokenBucket:
+    """Token bucket refilling ``capacity`` units per ``period`` seconds.
+
+    The level may go negative when more was spent than estimated, which
+    delays later requests until the debt is refilled.
+    """
+
+    def __init__(self, capacity: float, period: float = 60.0):
+        self.period = period
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.level = float(capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until ``amount`` can be spent (capped at the capacity)."""
+        self._refill()
+        deficit = min(amount, self.capacity) - self.level
+        return deficit / self.rate if deficit > 0 else 0.0
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.level -= amount
+
+    def sync(self, limit: int | None, remaining: int | None) -> None:
+        """Adopt the limit and remaining budget reported by the provider.
+
+        Requests still in flight are not yet counted by the provider, so the
+        lower of the local and the reported level is kept.
+        """
+        self._refill()
+        if limit:
+            self.capacity = limit
+            self.rate = limit / self.period
+        if remaining is not None:
+            self.level = min(self.level, float(remaining))
+
+
+@dataclass
+class _Waiter:
+    tokens: int
+    future: asyncio.Future
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budget of one provider.
+
+    Configured limits are used from the start; limits reported in response
+    headers replace them as they arrive, so an unconfigured provider is
+    throttled once it has told us its limits. Requests that do not fit are
+    queued and admitted round-robin across sessions.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int | None = None,
+        tokens_per_minute: int | None = None,
+    ):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._blocked_until = 0.0  # Retry-After / exhausted budget
+        self._backoff_level = 0  # Consecutive 429s
+        self._queues: OrderedDict[str, deque[_Waiter]] = OrderedDict()
+        self._timer: asyncio.TimerHandle | None = None
+
+        # Stats
+        self.queued = 0  # Requests that had to wait
+        self.wait_time = 0.0  # Total seconds spent waiting
+        self.rate_limited = 0  # 429 responses
+
+    @property
+    def limits_tokens(self) -> bool:
+        return self.tokens is not None
+
+    @property
+    def blocked(self) -> bool:
+        """Check if requests are held after a 429 or an exhausted budget."""
+        return time.monotonic() < self._blocked_until
+
+    async def acquire(self, tokens: int = 0, session: str | None = None) -> None:
+        """Wait until a request of ``tokens`` estimated tokens may be sent."""
+        if not self._queues and self._wait_for(tokens) == 0:
+            self._consume(tokens)
+            return
+
+        key = session if session is not None else current_session.get() or ""
+        waiter = _Waiter(tokens, asyncio.get_running_loop().create_future())
+        self._queues.setdefault(key, deque()).append(waiter)
+        self.queued += 1
+        start = time.monotonic()
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.refund(tokens)  # Admitted, then cancelled before sending
+            self._dispatch()
+            raise
+        finally:
+            self.wait_time += time.monotonic() - start
+
+    def refund(self, tokens: int) -> None:
+        """Give back the budget of a request that was never sent."""
+        if self.requests is not None:
+            self.requests.level = min(self.requests.capacity, self.requests.level + 1)
+        if self.tokens is not None:
+            self.tokens.level = min(self.tokens.capacity, self.tokens.level + tokens)
+
+    def reconcile(self, estimated: int, usage: dict[str, int] | None) -> None:
+        """Charge the difference between a request's estimated and actual tokens."""
+        if self.tokens is None or not usage:
+            return
+        actual = usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+        self.tokens.consume(actual - estimated)
+
+    def update(self, headers: Mapping[str, str] | None) -> None:
+        """Learn limits and remaining budget from a successful response's headers."""
+        self._backoff_level = 0
+        if not headers:
+            return
+        info = RateLimitInfo.from_headers(headers)
+
+        if info.request_limit:
+            if self.requests is None:
+                self.requests = TokenBucket(info.request_limit)
+            self.requests.sync(info.request_limit, info.requests_remaining)
+        if info.token_limit:
+            if self.tokens is None:
+                self.tokens = TokenBucket(info.token_limit)
+            self.tokens.sync(info.token_limit, info.tokens_remaining)
+
+        # An exhausted budget stays closed until the provider says it resets
+        for remaining, reset in (
+            (info.requests_remaining, info.requests_reset),
+            (info.tokens_remaining, info.tokens_reset),
+        ):
+            if remaining == 0 and reset:
+                self._block(reset)
+        self._dispatch()
+
+    def backoff(self, info: RateLimitInfo) -> float:
+        """Hold all requests after a 429. Returns the delay in seconds.
+
+        Honors Retry-After, or backs off exponentially without it.
+        """
+        self.rate_limited += 1
+        if info.retry_after is not None:
+            delay = info.retry_after
+        else:
+            delay = min(BACKOFF_MAX, BACKOFF_BASE * 2**self._backoff_level)
+        self._backoff_level += 1
+        self._block(delay)
+        return delay
+
+    def _block(self, seconds: float) -> None:
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def _wait_for(self, tokens: int) -> float:
+        """Seconds until a request of ``tokens`` tokens fits the budget."""
+        wait = max(0.0, self._blocked_until - time.monotonic())
+        if self.requests is not None:
+            wait = max(wait, self.requests.time_until(1))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.time_until(tokens))
+        return wait
+
+    def _consume(self, tokens: int) -> None:
+        if self.requests is not None:
+            self.requests.consume(1)
+        if self.tokens is not None:
+            self.tokens.consume(tokens)
+
+    def _dispatch(self) -> None:
+        """Admit queued requests, one session at a time in rotation."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._queues:
+            key, queue = next(iter(self._queues.items()))
+            waiter = queue[0]
+            if waiter.future.done():  # Cancelled while queued
+                queue.popleft()
+                if not queue:
+                    del self._queues[key]
+                continue
+
+            wait = self._wait_for(waiter.tokens)
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+
+            self._consume(waiter.tokens)
+            queue.popleft()
+            waiter.future.set_result(None)
+            # Move the session to the back of the rotation
+            del self._queues[key]
+            if queue:
+                self._queues[key] = queue
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "requests_per_minute": self.requests.capacity if self.requests else None,
+            "tokens_per_minute": self.tokens.capacity if self.tokens else None,
+            "waiting": sum(len(queue) for queue in self._queues.values()),
+            "queued": self.queued,
+            "wait_time": round(self.wait_time, 3),
+            "rate_limited": self.rate_limited,
+        }
@@ -0,0 +1,122 @@
+"""Shared, connection-pooled model provider instances."""
+
+import json
+import weakref
+from collections.abc import Iterable
+from typing import Any
+
+from honolulu.models.base import ModelProvider
+from honolulu.models.claude import ClaudeProvider
+from honolulu.models.fake import FakeProvider
+from honolulu.models.openai_provider import OpenAIProvider
+
+# Provider classes by config type
+PROVIDER_TYPES: dict[str, type[ModelProvider]] = {
+    "anthropic": ClaudeProvider,
+    "openai": OpenAIProvider,
+    "fake": FakeProvider,  # Offline, scripted responses for load and regression tests
+}
+
+
+class ProviderRegistry:
+    """Hands out shared provider instances instead of one per session.
+
+    Providers are keyed by (type, base_url, api_key, model) plus any extra
+    options, and the underlying SDK clients (each with its own HTTP
+    connection pool) by (type, base_url, api_key, max_retries), so sessions
+    and config reloads with the same settings reuse warm connections. Call
+    ``prune`` after a reload to release what the new config no longer uses,
+    and ``close`` on shutdown to release the pools.
+    """
+
+    def __init__(self):
+        self._providers: dict[tuple, ModelProvider] = {}
+        self._clients: dict[tuple, Any] = {}
+        # Clients no longer handed out, with the providers still using them:
+        # id(client) -> (client, providers)
+        self._retired: dict[int, tuple[Any, weakref.WeakSet]] = {}
+
+    def get(
+        self,
+        provider_type: str,
+        model: str,
+        api_key: str | None = None,
+        base_url: str | None = None,
+        **options: Any,
+    ) -> ModelProvider:
+        """Get the shared provider for these settings, creating it on first use."""
+        provider_class = PROVIDER_TYPES.get(provider_type)
+        if provider_class is None:
+            raise ValueError(f"Unknown provider type: {provider_type}")
+
+        # Options may hold unhashable values (e.g. an inline fake script)
+        canonical_options = json.dumps(options, sort_keys=True, default=repr)
+        key = (provider_type, base_url, api_key, model, canonical_options)
+        provider = self._providers.get(key)
+        if provider is not None:
+            return provider
+
+        # The retry policy lives on the client, so it is part of its identity
+        client_key = (provider_type, base_url, api_key, options.get("max_retries"))
+        provider = provider_class(
+            api_key=api_key,
+            model=model,
+            base_url=base_url,
+            client=self._clients.get(client_key),
+            **options,
+        )
+        if provider.client is not None:
+            self._clients.setdefault(client_key, provider.client)
+        self._providers[key] = provider
+        return provider
+
+    def __len__(self) -> int:
+        return len(self._providers)
+
+    async def prune(self, keep: Iterable[ModelProvider] | None = None) -> None:
+        """Forget the providers not in keep, and close clients nothing uses.
+
+        Sessions created before a reload may still hold forgotten providers,
+        so their clients are only closed once those providers are garbage
+        collected, by this or a later call. Without keep, only that check
+        runs.
+        """
+        if keep is not None:
+            kept = {id(provider) for provider in keep}
+            stale = [key for key, p in self._providers.items() if id(p) not in kept]
+            for key in stale:
+                provider = self._providers.pop(key)
+                if provider.client is not None:
+                    retired = self._retired.setdefault(
+                        id(provider.client), (provider.client, weakref.WeakSet())
+                    )
+                    retired[1].add(provider)
+
+            in_use = {id(p.client) for p in self._providers.values()}
+            for client_key, client in list(self._clients.items()):
+                if id(client) not in in_use:
+                    del self._clients[client_key]
+            for client_id in in_use:
+                self._retired.pop(client_id, None)
+
+        unused = [client_id for client_id, (_, users) in self._retired.items() if not users]
+        for client_id in unused:
+            client, _ = self._retired.pop(client_id)
+            await self._close_client(client)
+
+    async def close(self) -> None:
+        """Close all pooled clients and forget the providers."""
+        clients = [*self._clients.values(), *(c for c, _ in self._retired.values())]
+        self._clients.clear()
+        self._retired.clear()
+        self._providers.clear()
+
+        for client in clients:
+            await self._close_client(client)
+
+    @staticmethod
+    async def _close_client(client: Any) -> None:
+        try:
+            await client.close()
+        except Exception:
+            pass
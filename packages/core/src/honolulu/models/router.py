@@ -1,10 +1,51 @@
 """Multi-model router for Honolulu."""
 
+import asyncio
+import json
+import time
 from dataclasses import dataclass, field
 from enum import Enum
 from typing import Any, AsyncGenerator
 
-from honolulu.models.base import ModelProvider, ModelResponse, StreamChunk
+from honolulu.models.base import ModelProvider, ModelResponse, StreamChunk, ToolCall
+from honolulu.models.cache import CachedProvider
+from honolulu.models.classifier import (
+    TaskComplexity,
+    classify,
+    extract_features,
+    is_tool_results,
+)
+from honolulu.models.health import HealthMonitor
+from honolulu.models.latency import METRIC_DURATION, METRIC_TTFT, LatencyTracker
+from honolulu.models.ledger import UsageLedger
+from honolulu.models.ratelimit import RateLimiter, current_session, rate_limit_error
+from honolulu.tokens import estimate_request_tokens
+
+# Cascade escalation signals; the first three make the router retry the
+# request on the next provider, the last one escalates the next request
+SIGNAL_INVALID_TOOL_JSON = "invalid_tool_json"
+SIGNAL_UNKNOWN_TOOL = "unknown_tool"
+SIGNAL_EMPTY_RESPONSE = "empty_response"
+SIGNAL_REPEATED_TOOL_CALL = "repeated_tool_call"
+RETRY_SIGNALS = frozenset({SIGNAL_INVALID_TOOL_JSON, SIGNAL_UNKNOWN_TOOL, SIGNAL_EMPTY_RESPONSE})
+
+# Retries of a rate-limited (429) request on the same provider, when the
+# provider asks for a wait no longer than RATE_LIMIT_MAX_WAIT seconds
+RATE_LIMIT_RETRIES = 2
+RATE_LIMIT_MAX_WAIT = 30.0
+
+
+def _add_usage(total: dict[str, int], usage: dict[str, int]) -> dict[str, int]:
+    """Sum of two token usage dicts."""
+    result = dict(total)
+    for key, value in usage.items():
+        result[key] = result.get(key, 0) + value
+    return result
+
+
+def _arguments_key(arguments: Any) -> str:
+    """Canonical form of tool arguments, for spotting repeated calls."""
+    return json.dumps(arguments, sort_keys=True, default=str)
 
 
 class RoutingStrategy(Enum):
@@ -14,7 +55,9 @@ class RoutingStrategy(Enum):
     QUALITY_FIRST = "quality-first"        # Prefer highest quality
     ROUND_ROBIN = "round-robin"            # Rotate between models
     CAPABILITY_MATCH = "capability-match"  # Match to task requirements
-    SMART = "smart"                        # AI-based selection
+    SMART = "smart"                        # Match the model to the turn's complexity
+    LATENCY_AWARE = "latency-aware"        # Prefer the fastest healthy provider
+    CASCADE = "cascade"                    # Start cheap, escalate on failure signals
 
 
 @dataclass
@@ -27,15 +70,73 @@ class ProviderConfig:
     cost_per_1k_input: float = 0.0
     cost_per_1k_output: float = 0.0
     capabilities: list[str] = field(default_factory=list)
+    rate_limiter: RateLimiter = field(default_factory=RateLimiter)
+
+
+@dataclass
+class HedgeStats:
+    """Outcomes of hedged requests for one provider."""
+
+    races: int = 0  # Hedged requests this provider took part in
+    wins: int = 0
+    hedges_started: int = 0  # Times it was started as the backup request
+    wasted_tokens: int = 0  # Estimated input tokens of its cancelled requests
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.races if self.races else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "races": self.races,
+            "wins": self.wins,
+            "win_rate": round(self.win_rate, 4),
+            "hedges_started": self.hedges_started,
+            "wasted_tokens": self.wasted_tokens,
+        }
+
+
+@dataclass
+class CascadeStats:
+    """Escalations of cascade routing, for tuning its signals."""
+
+    turns: int = 0
+    escalated_turns: int = 0
+    signals: dict[str, int] = field(default_factory=dict)  # Signal -> times seen
+    escalations: dict[str, int] = field(default_factory=dict)  # "from->to" -> count
+    retries: int = 0  # Requests repeated on a stronger provider
+    exhausted: int = 0  # Signals seen on the strongest provider
+
+    def to_dict(self) -> dict:
+        return {
+            "turns": self.turns,
+            "escalated_turns": self.escalated_turns,
+            "signals": dict(self.signals),
+            "escalations": dict(self.escalations),
+            "retries": self.retries,
+            "exhausted": self.exhausted,
+        }
 
 
 class ModelRouter:
     """Routes requests to appropriate model providers."""
 
+    name = "router"
+
     def __init__(
         self,
         strategy: RoutingStrategy = RoutingStrategy.QUALITY_FIRST,
         fallback_enabled: bool = True,
+        unhealthy_error_rate: float = 0.5,
+        latency_tail_weight: float = 0.5,
+        latency_explore_rate: float = 0.05,
+        hedge_delay: float | None = None,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        health_probe: bool = True,
+        ledger: UsageLedger | None = None,
+        cascade_repeat_threshold: int = 2,
+        session_affinity: bool = False,
     ):
         self._providers: dict[str, ProviderConfig] = {}
         self._strategy = strategy
@@ -43,6 +144,55 @@ class ModelRouter:
         self._round_robin_index = 0
         self._default_provider: str | None = None
 
+        # Latency-aware routing: streams are ranked by time-to-first-token and
+        # calls by duration, providers above this error rate go last, and
+        # latency_explore_rate of the requests go to the provider tried least
+        # recently to keep its numbers current
+        self._latency = LatencyTracker(
+            tail_weight=latency_tail_weight,
+            unhealthy_error_rate=unhealthy_error_rate,
+            explore_rate=latency_explore_rate,
+        )
+
+        # Hedging: start a backup provider if the first has not answered
+        # within hedge_delay seconds (None = off)
+        self._hedge_delay = hedge_delay
+        self._hedging: dict[str, HedgeStats] = {}
+
+        # Circuit breakers: providers failing failure_threshold times in a row
+        # are skipped until a trial request (or background probe) succeeds
+        self._health = HealthMonitor(
+            failure_threshold=failure_threshold,
+            recovery_timeout=recovery_timeout,
+            probe=self._probe if health_probe else None,
+        )
+
+        # Usage ledger: gets provider prices, and its observed traffic drives
+        # cost-optimized ordering
+        self._ledger = ledger
+
+        # Cascade routing: each session's step on the cheapest-first ladder,
+        # reset when a new turn starts. A tool call made this many times with
+        # the same arguments in one turn escalates.
+        self._cascade_levels: dict[str, int] = {}
+        self._cascade_repeat_threshold = cascade_repeat_threshold
+        self._cascade = CascadeStats()
+
+        # Session affinity: session -> pinned provider. A session keeps its
+        # provider (and that provider's prompt cache) until the provider's
+        # circuit opens or it is rate limited; strategies then balance new
+        # and moved sessions rather than the requests within one.
+        self._session_affinity = session_affinity
+        self._affinity: dict[str, str] = {}
+        self._affinity_moves = 0
+
+        # Smart routing: turns routed per complexity class
+        self._complexity_counts: dict[str, int] = {}
+
+        # Provider orderings (per latency metric), rebuilt only when providers
+        # or the stats they are sorted by change: metric -> (version, order)
+        self._rankings: dict[str, tuple[int, list[ProviderConfig]]] = {}
+
     def register(
         self,
         name: str,
@@ -52,8 +202,14 @@ class ModelRouter:
         cost_per_1k_output: float = 0.0,
         capabilities: list[str] | None = None,
         is_default: bool = False,
+        requests_per_minute: int | None = None,
+        tokens_per_minute: int | None = None,
     ) -> None:
-        """Register a model provider."""
+        """Register a model provider.
+
+        Request and token budgets are optional; without them the provider is
+        throttled once its responses report rate-limit headers.
+        """
         self._providers[name] = ProviderConfig(
             name=name,
             provider=provider,
@@ -61,28 +217,124 @@ class ModelRouter:
             cost_per_1k_input=cost_per_1k_input,
             cost_per_1k_output=cost_per_1k_output,
             capabilities=capabilities or [],
+            rate_limiter=RateLimiter(requests_per_minute, tokens_per_minute),
         )
+        if self._ledger is not None:
+            self._ledger.set_price(name, cost_per_1k_input, cost_per_1k_output)
+        self._latency.add(name, priority)
+        self._rankings.clear()
 
         if is_default or self._default_provider is None:
             self._default_provider = name
 
-    def _select_provider(self, task_hint: str | None = None) -> ProviderConfig:
-        """Select a provider based on strategy."""
-        if not self._providers:
-            raise ValueError("No providers registered")
+    def _ranked(self, metric: str = METRIC_TTFT) -> list[ProviderConfig]:
+        """Providers in the strategy's preference order (also the fallback order).
 
-        providers = list(self._providers.values())
+        Latency-aware routing ranks streams and calls by their own latency
+        metric; other strategies ignore it.
+        """
+        if self._strategy == RoutingStrategy.LATENCY_AWARE:
+            version = self._latency.version
+        else:
+            metric = ""
+            if self._strategy == RoutingStrategy.COST_OPTIMIZED and self._ledger is not None:
+                version = self._ledger.version
+            else:
+                version = 0
 
-        if self._strategy == RoutingStrategy.COST_OPTIMIZED:
-            # Sort by cost (input + output)
-            providers.sort(key=lambda p: p.cost_per_1k_input + p.cost_per_1k_output)
-            return providers[0]
+        cached = self._rankings.get(metric)
+        if cached is not None and cached[0] == version:
+            return cached[1]
 
+        if self._strategy == RoutingStrategy.LATENCY_AWARE:
+            providers = [self._providers[name] for name in self._latency.order(metric)]
+        else:
+            providers = list(self._providers.values())
+        if self._strategy == RoutingStrategy.COST_OPTIMIZED:
+            providers.sort(key=self._cost_key)
+        elif self._strategy == RoutingStrategy.CASCADE:
+            # Cheapest first, the strongest of equally priced ones first
+            providers.sort(key=lambda p: (self._cost_key(p), -p.priority))
         elif self._strategy == RoutingStrategy.QUALITY_FIRST:
             # Sort by priority (higher = better)
             providers.sort(key=lambda p: p.priority, reverse=True)
+        self._rankings[metric] = (version, providers)
+        return providers
+
+    def _cost_key(self, provider: ProviderConfig) -> float:
+        """Sort key for cost-optimized routing.
+
+        With a ledger, the expected cost of an average request of the traffic
+        seen so far; otherwise the sum of the input and output prices.
+        """
+        if self._ledger is not None:
+            return self._ledger.expected_cost(provider.name)
+        return provider.cost_per_1k_input + provider.cost_per_1k_output
+
+    def _select_provider(
+        self,
+        task_hint: str | None = None,
+        messages: list[dict] | None = None,
+        cascade_level: int = 0,
+        metric: str = METRIC_TTFT,
+    ) -> ProviderConfig:
+        """Select a provider based on strategy and session affinity.
+
+        Smart and cascade routing choose per turn by design, so they are not
+        pinned. Requests outside a session are never pinned either.
+        """
+        if not self._providers:
+            raise ValueError("No providers registered")
+
+        session = self._session()
+        if (
+            not self._session_affinity
+            or session is None
+            or self._strategy in (RoutingStrategy.SMART, RoutingStrategy.CASCADE)
+        ):
+            return self._strategy_select(task_hint, messages, cascade_level, metric)
+
+        pinned = self._providers.get(self._affinity.get(session, ""))
+        if pinned is not None and self._pinnable(pinned):
+            return pinned
+
+        selected = self._strategy_select(task_hint, messages, metric=metric)
+        if not self._pinnable(selected):
+            selected = next((p for p in self._ranked(metric) if self._pinnable(p)), selected)
+        if pinned is not None and selected is not pinned:
+            self._affinity_moves += 1
+        self._affinity[session] = selected.name
+        return selected
+
+    def _pinnable(self, config: ProviderConfig) -> bool:
+        """Check if a session may stay on (or move to) a provider."""
+        return self._health.available(config.name) and not config.rate_limiter.blocked
+
+    def forget_session(self, session: str) -> None:
+        """Drop the routing state kept for a session."""
+        self._affinity.pop(session, None)
+        self._cascade_levels.pop(session, None)
+
+    def _strategy_select(
+        self,
+        task_hint: str | None = None,
+        messages: list[dict] | None = None,
+        cascade_level: int = 0,
+        metric: str = METRIC_TTFT,
+    ) -> ProviderConfig:
+        """Select a provider based on strategy alone (and the request's cascade step)."""
+        providers = self._ranked(metric)
+
+        if self._strategy in (RoutingStrategy.COST_OPTIMIZED, RoutingStrategy.QUALITY_FIRST):
             return providers[0]
 
+        elif self._strategy == RoutingStrategy.LATENCY_AWARE:
+            # Now and then try another provider, or a slow sample would keep
+            # it ranked last for good
+            others = [p.name for p in providers[1:] if self._health.available(p.name)]
+            explored = self._latency.explore(others)
+            return self._providers[explored] if explored is not None else providers[0]
+
         elif self._strategy == RoutingStrategy.ROUND_ROBIN:
             # Rotate through providers
             provider = providers[self._round_robin_index % len(providers)]
@@ -100,12 +352,42 @@ class ModelRouter:
                 return self._providers[self._default_provider]
             return providers[0]
 
-        else:  # SMART or default
+        elif self._strategy == RoutingStrategy.SMART:
+            return self._smart_select(task_hint, messages, metric)
+
+        elif self._strategy == RoutingStrategy.CASCADE:
+            return providers[min(cascade_level, len(providers) - 1)]
+
+        else:
             # Use default provider
             if self._default_provider:
                 return self._providers[self._default_provider]
             return providers[0]
 
+    def _smart_select(
+        self, task_hint: str | None, messages: list[dict] | None, metric: str = METRIC_TTFT
+    ) -> ProviderConfig:
+        """Pick a provider by how demanding the turn looks, without a model call.
+
+        Simple turns go to the cheapest (then fastest) provider, complex ones
+        to the highest priority provider, and the rest to the default.
+        """
+        complexity = classify(extract_features(messages or [], task_hint))
+        self._complexity_counts[complexity.value] = (
+            self._complexity_counts.get(complexity.value, 0) + 1
+        )
+
+        providers = self._ranked()
+        if complexity == TaskComplexity.SIMPLE:
+            return min(
+                providers, key=lambda p: (self._cost_key(p), self._latency.score(p.name, metric))
+            )
+        if complexity == TaskComplexity.COMPLEX:
+            return max(providers, key=lambda p: p.priority)
+        if self._default_provider:
+            return self._providers[self._default_provider]
+        return providers[0]
+
     async def call(
         self,
         messages: list[dict],
@@ -114,41 +396,131 @@ class ModelRouter:
         max_tokens: int = 4096,
         task_hint: str | None = None,
     ) -> ModelResponse:
-        """Route and make a model call with fallback."""
-        selected = self._select_provider(task_hint)
-        providers_tried = [selected.name]
+        """Route and make a model call with fallback.
 
-        try:
-            return await selected.provider.call(
-                messages=messages,
-                tools=tools,
-                system=system,
-                max_tokens=max_tokens,
-            )
-        except Exception as e:
-            if not self._fallback_enabled:
-                raise
+        Providers whose circuit is open are skipped without a request, or
+        fail it when fallback is disabled. With cascade routing, a response
+        showing a failure signal is retried on the next stronger provider.
+        """
+        request = {"messages": messages, "tools": tools, "system": system, "max_tokens": max_tokens}
+        if self._strategy != RoutingStrategy.CASCADE:
+            return await self._route_call(request, task_hint)
 
-            # Try other providers
-            for name, config in self._providers.items():
-                if name in providers_tried:
-                    continue
+        level = self._cascade_start(messages)
+        # Usage of responses discarded for a retry, still paid for
+        discarded: dict[str, int] = {}
+        while True:
+            response = await self._route_call(request, task_hint, level)
+            empty = not response.content and not response.tool_calls
+            retry_level = self._cascade_check(request, response.tool_calls, empty, level, True)
+            if retry_level is None:
+                if discarded:
+                    response.usage = _add_usage(discarded, response.usage)
+                return response
+            discarded = _add_usage(discarded, response.usage)
+            level = retry_level
+
+    async def _route_call(
+        self, request: dict, task_hint: str | None, cascade_level: int = 0
+    ) -> ModelResponse:
+        """Call the selected provider, falling back to the others on failure."""
+        providers_tried: list[str] = []
+        error: Exception | None = None
+
+        candidates = self._candidates(
+            task_hint, request["messages"], cascade_level, METRIC_DURATION
+        )
+        for config in candidates:
+            if config.name in providers_tried or not self._health.acquire(config.name):
+                continue
+
+            providers_tried.append(config.name)
+            try:
+                backup = self._hedge_backup(config, providers_tried, METRIC_DURATION)
+                if backup is not None:
+                    providers_tried.append(backup.name)
+                    return await self._hedged_call(config, backup, request)
+                return await self._call_provider(config, request)
+            except Exception as e:
+                if not self._fallback_enabled:
+                    raise
+                error = e
+
+        if error is None:
+            names = [c.name for c in candidates]
+            raise RuntimeError(f"No provider available: circuit open for {names}")
+        # All providers failed
+        raise RuntimeError(
+            f"All providers failed. Tried: {providers_tried}. Last error: {error}"
+        )
 
-                providers_tried.append(name)
-                try:
-                    return await config.provider.call(
-                        messages=messages,
-                        tools=tools,
-                        system=system,
-                        max_tokens=max_tokens,
-                    )
-                except Exception:
+    async def _call_provider(self, config: ProviderConfig, request: dict) -> ModelResponse:
+        """Make a call to one provider within its rate limits, recording its latency."""
+        limiter = config.rate_limiter
+        tokens = self._request_tokens(limiter, request)
+        attempt = 0
+        while True:
+            await limiter.acquire(tokens)
+            start = time.monotonic()
+            try:
+                response = await config.provider.call(**request)
+            except Exception as e:
+                if self._retry_rate_limited(config, e, attempt):
+                    attempt += 1
                     continue
+                self._record_failure(config, e)
+                raise
+            except BaseException:
+                self._health.release(config.name)
+                raise
+            break
 
-            # All providers failed
-            raise RuntimeError(
-                f"All providers failed. Tried: {providers_tried}. Last error: {e}"
-            )
+        response.provider = config.name
+        if response.cached:
+            # Never reached the provider: says nothing about its speed or health
+            self._health.release(config.name)
+            limiter.refund(tokens)
+            return response
+
+        self._record_usage(config, response.usage, time.monotonic() - start)
+        self._latency.record_success(config.name, time.monotonic() - start)
+        self._health.record_success(config.name)
+        limiter.update(response.rate_limits)
+        limiter.reconcile(tokens, response.usage)
+        return response
+
+    @staticmethod
+    def _request_tokens(limiter: RateLimiter, request: dict) -> int:
+        """Estimated input tokens of a request, if its provider has a token budget."""
+        if not limiter.limits_tokens:
+            return 0
+        return estimate_request_tokens(request["messages"], request["tools"], request["system"])
+
+    def _retry_rate_limited(self, config: ProviderConfig, error: Exception, attempt: int) -> bool:
+        """Back off after a 429 and decide whether to retry the same provider."""
+        info = rate_limit_error(error)
+        if info is None:
+            return False
+        delay = config.rate_limiter.backoff(info)
+        return attempt < RATE_LIMIT_RETRIES and delay <= RATE_LIMIT_MAX_WAIT
+
+    def _record_usage(
+        self,
+        config: ProviderConfig,
+        usage: dict[str, int] | None,
+        latency: float,
+    ) -> None:
+        """Record a request in the ledger, for the current session and turn."""
+        if self._ledger is not None and usage:
+            self._ledger.record(config.name, usage, latency=latency)
+
+    def _record_failure(self, config: ProviderConfig, error: Exception) -> None:
+        """Record a failed request. Rate limiting does not count against health."""
+        self._latency.record_error(config.name)
+        if rate_limit_error(error) is None:
+            self._health.record_failure(config.name)
+        else:
+            self._health.release(config.name)
 
     async def stream(
         self,
@@ -158,16 +530,429 @@ class ModelRouter:
         max_tokens: int = 4096,
         task_hint: str | None = None,
     ) -> AsyncGenerator[StreamChunk, None]:
-        """Route and stream from a model."""
-        selected = self._select_provider(task_hint)
-
-        async for chunk in selected.provider.stream(
-            messages=messages,
-            tools=tools,
-            system=system,
-            max_tokens=max_tokens,
-        ):
-            yield chunk
+        """Route and stream from a model.
+
+        Providers whose circuit is open are skipped, and a provider that fails
+        before its first chunk falls back to the next one (unless fallback is
+        disabled). Once a chunk has been yielded, errors are raised to the
+        caller.
+
+        With cascade routing, a stream that ends without any output is
+        retried on the next stronger provider; other failure signals can only
+        be seen once output was streamed, so they escalate the next request.
+        """
+        request = {"messages": messages, "tools": tools, "system": system, "max_tokens": max_tokens}
+        if self._strategy != RoutingStrategy.CASCADE:
+            async for chunk in self._route_stream(request, task_hint):
+                yield chunk
+            return
+
+        level = self._cascade_start(messages)
+        while True:
+            tool_calls: list[ToolCall] = []
+            output = False
+            async for chunk in self._route_stream(request, task_hint, level):
+                if chunk.type == "tool_use_end" and chunk.tool_call:
+                    tool_calls.append(chunk.tool_call)
+                output = output or chunk.type != "usage"
+                yield chunk
+            # Only an empty stream can still be retried; its usage chunk was
+            # already passed on
+            retry_level = self._cascade_check(request, tool_calls, not output, level, not output)
+            if retry_level is None:
+                return
+            level = retry_level
+
+    async def _route_stream(
+        self, request: dict, task_hint: str | None, cascade_level: int = 0
+    ) -> AsyncGenerator[StreamChunk, None]:
+        """Stream from the selected provider, falling back before the first chunk."""
+        providers_tried: list[str] = []
+        error: Exception | None = None
+
+        candidates = self._candidates(task_hint, request["messages"], cascade_level, METRIC_TTFT)
+        for config in candidates:
+            if config.name in providers_tried or not self._health.acquire(config.name):
+                continue
+
+            providers_tried.append(config.name)
+            backup = self._hedge_backup(config, providers_tried, METRIC_TTFT)
+            if backup is not None:
+                providers_tried.append(backup.name)
+                chunks = self._hedged_stream(config, backup, request)
+            else:
+                chunks = self._stream_provider(config, request)
+
+            started = False
+            try:
+                async for chunk in chunks:
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                if started or not self._fallback_enabled:
+                    raise
+                error = e
+            finally:
+                await chunks.aclose()
+
+        if error is None:
+            names = [c.name for c in candidates]
+            raise RuntimeError(f"No provider available: circuit open for {names}")
+        raise RuntimeError(
+            f"All providers failed. Tried: {providers_tried}. Last error: {error}"
+        )
+
+    async def _stream_provider(
+        self, config: ProviderConfig, request: dict
+    ) -> AsyncGenerator[StreamChunk, None]:
+        """Stream from one provider, recording time-to-first-token and duration.
+
+        Waits for the provider's rate limits, and retries a rate-limited
+        request that failed before its first chunk. Streams abandoned by the
+        consumer are not recorded either way.
+        """
+        limiter = config.rate_limiter
+        tokens = self._request_tokens(limiter, request)
+        attempt = 0
+        while True:
+            await limiter.acquire(tokens)
+            start = time.monotonic()
+            ttft: float | None = None
+            cached = False
+            try:
+                async for chunk in config.provider.stream(**request):
+                    if ttft is None:
+                        ttft = time.monotonic() - start
+                        cached = chunk.cached
+                    if chunk.type == "usage" and not cached:
+                        limiter.update(chunk.rate_limits)
+                        limiter.reconcile(tokens, chunk.usage)
+                        self._record_usage(config, chunk.usage, time.monotonic() - start)
+                    chunk.provider = config.name
+                    yield chunk
+            except Exception as e:
+                if ttft is None and self._retry_rate_limited(config, e, attempt):
+                    attempt += 1
+                    continue
+                self._record_failure(config, e)
+                raise
+            except BaseException:
+                self._health.release(config.name)
+                raise
+            break
+
+        if cached:
+            self._health.release(config.name)
+            limiter.refund(tokens)
+            return
+        self._latency.record_success(config.name, time.monotonic() - start, ttft)
+        self._health.record_success(config.name)
+
+    @staticmethod
+    def _session() -> str | None:
+        """The session of the current request, None outside of one."""
+        return current_session.get() or None
+
+    def _cascade_start(self, messages: list[dict]) -> int:
+        """The cascade step a request starts at.
+
+        A new turn starts at the cheapest provider. A turn starts with a user
+        message that is not just tool results; later requests of the turn end
+        with tool results and keep the session's level. Without a session
+        there is no turn to follow, so every request starts cheapest.
+        """
+        session = self._session()
+        if not messages or messages[-1].get("role") != "user" or is_tool_results(messages[-1]):
+            return self._cascade_levels.get(session, 0) if session is not None else 0
+        if session is not None:
+            self._cascade_levels[session] = 0
+        self._cascade.turns += 1
+        return 0
+
+    def _cascade_check(
+        self,
+        request: dict,
+        tool_calls: list[ToolCall],
+        empty: bool,
+        level: int,
+        retryable: bool,
+    ) -> int | None:
+        """Escalate on failure signals in a response made at cascade step level.
+
+        The session (if any) moves up a step for its next requests. Returns
+        the step to retry the request at, or None if it is not retried.
+        """
+        signals = self._escalation_signals(request, tool_calls, empty)
+        if not signals:
+            return None
+        for signal in signals:
+            self._cascade.signals[signal] = self._cascade.signals.get(signal, 0) + 1
+
+        ladder = self._ranked()
+        if level + 1 >= len(ladder):
+            self._cascade.exhausted += 1
+            return None
+
+        session = self._session()
+        if session is not None:
+            self._cascade_levels[session] = level + 1
+        step = f"{ladder[level].name}->{ladder[level + 1].name}"
+        self._cascade.escalations[step] = self._cascade.escalations.get(step, 0) + 1
+        if level == 0:
+            self._cascade.escalated_turns += 1
+
+        if not retryable or signals.isdisjoint(RETRY_SIGNALS):
+            return None
+        self._cascade.retries += 1
+        return level + 1
+
+    def _escalation_signals(
+        self, request: dict, tool_calls: list[ToolCall], empty: bool
+    ) -> set[str]:
+        """Failure signals in a response to request."""
+        signals: set[str] = set()
+        if empty:
+            signals.add(SIGNAL_EMPTY_RESPONSE)
+        if not tool_calls:
+            return signals
+
+        known = {tool["name"] for tool in request["tools"] or []}
+        if any(tc.invalid_arguments for tc in tool_calls):
+            signals.add(SIGNAL_INVALID_TOOL_JSON)
+        if any(tc.name not in known for tc in tool_calls):
+            signals.add(SIGNAL_UNKNOWN_TOOL)
+
+        # Count earlier identical calls in this turn
+        seen: dict[tuple[str, str], int] = {}
+        for message in reversed(request["messages"]):
+            if message.get("role") == "user" and not is_tool_results(message):
+                break  # Start of the turn
+            content = message.get("content")
+            if message.get("role") == "assistant" and isinstance(content, list):
+                for block in content:
+                    if block.get("type") == "tool_use":
+                        key = (block.get("name", ""), _arguments_key(block.get("input")))
+                        seen[key] = seen.get(key, 0) + 1
+        for tc in tool_calls:
+            key = (tc.name, _arguments_key(tc.arguments))
+            if seen.get(key, 0) + 1 >= self._cascade_repeat_threshold:
+                signals.add(SIGNAL_REPEATED_TOOL_CALL)
+                break
+        return signals
+
+    def _candidates(
+        self,
+        task_hint: str | None = None,
+        messages: list[dict] | None = None,
+        cascade_level: int = 0,
+        metric: str = METRIC_TTFT,
+    ) -> list[ProviderConfig]:
+        """The selected provider followed by the others in fallback order.
+
+        Without fallback only the selected provider is tried, so a request
+        fails rather than moving on when its circuit is open.
+        """
+        selected = self._select_provider(task_hint, messages, cascade_level, metric)
+        if not self._fallback_enabled:
+            return [selected]
+        return [selected, *(p for p in self._ranked(metric) if p is not selected)]
+
+    def _hedge_backup(
+        self, selected: ProviderConfig, exclude: list[str], metric: str = METRIC_TTFT
+    ) -> ProviderConfig | None:
+        """The provider to hedge a request to selected with, if hedging is on.
+
+        The backup's circuit is acquired here and released by the race if
+        the backup is never started.
+        """
+        if self._hedge_delay is None:
+            return None
+        for config in self._ranked(metric):
+            if (
+                config is not selected
+                and config.name not in exclude
+                and self._health.acquire(config.name)
+            ):
+                return config
+        return None
+
+    async def _hedged_call(
+        self, primary: ProviderConfig, backup: ProviderConfig, request: dict
+    ) -> ModelResponse:
+        """Call primary; if it is slow or fails, race backup and keep the first answer."""
+        tasks = {asyncio.create_task(self._call_provider(primary, request)): primary}
+        hedged = False
+        error: Exception | None = None
+        try:
+            while tasks:
+                done, _ = await asyncio.wait(
+                    tasks,
+                    timeout=None if hedged else self._hedge_delay,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if not done or (not hedged and all(t.exception() for t in done)):
+                    # Primary is slow or already failed: start the backup
+                    hedged = True
+                    self._hedge_stats(backup).hedges_started += 1
+                    tasks[asyncio.create_task(self._call_provider(backup, request))] = backup
+
+                for task in done:
+                    config = tasks.pop(task)
+                    if task.exception() is None:
+                        if hedged:
+                            self._hedge_stats(config).wins += 1
+                        return task.result()
+                    error = task.exception()
+
+            raise error
+        finally:
+            await self._finish_race(tasks, hedged, primary, backup, request)
+
+    async def _hedged_stream(
+        self, primary: ProviderConfig, backup: ProviderConfig, request: dict
+    ) -> AsyncGenerator[StreamChunk, None]:
+        """Stream from primary; if its first chunk is late, race backup.
+
+        Whichever stream produces a chunk first is kept, the other is cancelled.
+        """
+        # First-chunk task -> (provider, its stream)
+        pending: dict[asyncio.Task, tuple[ProviderConfig, AsyncGenerator]] = {}
+
+        def start(config: ProviderConfig) -> None:
+            chunks = self._stream_provider(config, request)
+            pending[asyncio.create_task(anext(chunks))] = (config, chunks)
+
+        start(primary)
+        hedged = False
+        winner: tuple[AsyncGenerator, StreamChunk | None] | None = None
+        error: Exception | None = None
+        try:
+            while pending and winner is None:
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=None if hedged else self._hedge_delay,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    config, chunks = pending.pop(task)
+                    try:
+                        first = task.result()
+                    except StopAsyncIteration:
+                        first = None
+                    except Exception as e:
+                        error = e
+                        continue
+                    winner = (chunks, first)
+                    if hedged:
+                        self._hedge_stats(config).wins += 1
+                    break
+
+                if winner is None and not hedged:
+                    # Primary is slow or already failed: start the backup
+                    hedged = True
+                    self._hedge_stats(backup).hedges_started += 1
+                    start(backup)
+        finally:
+            await self._finish_race(
+                {task: config for task, (config, _) in pending.items()},
+                hedged,
+                primary,
+                backup,
+                request,
+            )
+            for _, chunks in pending.values():
+                await chunks.aclose()
+
+        if winner is None:
+            raise error
+
+        chunks, first = winner
+        try:
+            if first is not None:
+                yield first
+                async for chunk in chunks:
+                    yield chunk
+        finally:
+            await chunks.aclose()
+
+    async def _finish_race(
+        self,
+        losers: dict[asyncio.Task, ProviderConfig],
+        hedged: bool,
+        primary: ProviderConfig,
+        backup: ProviderConfig,
+        request: dict,
+    ) -> None:
+        """Cancel the requests that lost a hedge race and record the outcome."""
+        for task in losers:
+            task.cancel()
+        if losers:
+            await asyncio.gather(*losers, return_exceptions=True)
+
+        if not hedged:
+            self._health.release(backup.name)
+            return
+        self._hedge_stats(primary).races += 1
+        self._hedge_stats(backup).races += 1
+        if losers:
+            wasted = estimate_request_tokens(
+                request["messages"], request["tools"], request["system"]
+            )
+            for config in losers.values():
+                self._hedge_stats(config).wasted_tokens += wasted
+
+    def _hedge_stats(self, config: ProviderConfig) -> HedgeStats:
+        stats = self._hedging.get(config.name)
+        if stats is None:
+            stats = self._hedging[config.name] = HedgeStats()
+        return stats
+
+    async def _probe(self, name: str) -> None:
+        """Background health probe: the smallest possible request."""
+        config = self._providers.get(name)
+        if config is not None:
+            # Bypass any response cache, a cached reply proves nothing
+            provider = config.provider
+            if isinstance(provider, CachedProvider):
+                provider = provider.provider
+            start = time.monotonic()
+            response = await provider.probe()
+            if self._ledger is not None and response.usage:
+                # Probes are paid for too, but belong to no session
+                latency = time.monotonic() - start
+                self._ledger.record(name, response.usage, latency=latency, turn=0, session="")
+
+    async def close(self) -> None:
+        """Stop background health probes."""
+        await self._health.close()
+
+    def stats(self) -> dict[str, Any]:
+        """Routing statistics per provider."""
+        return {
+            "strategy": self._strategy.value,
+            "order": [p.name for p in self._ranked()],
+            "latency": self._latency.to_dict(),
+            "latency_explorations": self._latency.explorations,
+            "hedging": {name: stats.to_dict() for name, stats in self._hedging.items()},
+            "health": self._health.to_dict(),
+            "complexity": dict(self._complexity_counts),
+            "cascade": self._cascade.to_dict(),
+            "affinity": self._affinity_stats(),
+            "rate_limits": {
+                name: config.rate_limiter.to_dict() for name, config in self._providers.items()
+            },
+        }
+
+    def _affinity_stats(self) -> dict[str, Any]:
+        pinned: dict[str, int] = {}
+        for name in self._affinity.values():
+            pinned[name] = pinned.get(name, 0) + 1
+        return {
+            "enabled": self._session_affinity,
+            "sessions": pinned,
+            "moves": self._affinity_moves,
+        }
 
     @property
     def providers(self) -> list[str]:
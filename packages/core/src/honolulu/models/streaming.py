@@ -0,0 +1,170 @@
+"""Incremental assembly of streamed text and tool arguments."""
+
+import json
+import re
+from typing import Any
+
+# Characters that change the lexer state inside / outside a JSON string
+_STRING_SPECIAL = re.compile(r'["\\]')
+_STRUCTURAL = re.compile(r'[\[\]{}",]')
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+# First preview point of streamed arguments; later previews wait for the
+# document to double, so previewing stays linear overall
+MIN_PREVIEW_CHARS = 64
+
+
+class TextAssembler:
+    """Accumulates streamed text fragments with O(1) appends.
+
+    Fragments are kept in a list and joined only when the text is read, so a
+    long answer costs linear time instead of one string copy per chunk.
+    """
+
+    def __init__(self) -> None:
+        self._parts: list[str] = []
+        self._length = 0
+
+    def append(self, fragment: str) -> None:
+        """Add a streamed fragment."""
+        if fragment:
+            self._parts.append(fragment)
+            self._length += len(fragment)
+
+    def text(self) -> str:
+        """Get the text assembled so far."""
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def clear(self) -> None:
+        self._parts = []
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __bool__(self) -> bool:
+        return self._length > 0
+
+
+class JSONAssembler(TextAssembler):
+    """Assembles a streamed JSON document, such as tool call arguments.
+
+    Each fragment is lexed once as it arrives (string/escape state, open
+    containers and the last position where the document can be cut), so
+    the partial document can be parsed at any time by closing what is still
+    open, without rescanning it. This lets a tool call's arguments be
+    previewed and validated before the block is complete.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        self._closed = False
+        # (length, open containers) of the last point the text can be cut at
+        self._cut: tuple[int, tuple[str, ...]] | None = None
+        self._next_preview = MIN_PREVIEW_CHARS
+
+    def append(self, fragment: str) -> None:
+        """Add a streamed fragment and advance the lexer over it."""
+        base = self._length
+        super().append(fragment)
+
+        pos = 0
+        end = len(fragment)
+        if self._escape and end:
+            self._escape = False
+            pos = 1
+
+        while pos < end:
+            if self._in_string:
+                match = _STRING_SPECIAL.search(fragment, pos)
+                if match is None:
+                    break
+                if match.group() == "\\":
+                    if match.end() < end:
+                        pos = match.end() + 1
+                    else:
+                        self._escape = True
+                        pos = end
+                    continue
+                self._in_string = False
+                pos = match.end()
+                continue
+
+            match = _STRUCTURAL.search(fragment, pos)
+            if match is None:
+                break
+            char = match.group()
+            index = base + match.start()
+            if char == '"':
+                self._in_string = True
+            elif char in _CLOSERS:
+                self._stack.append(_CLOSERS[char])
+                self._cut = (index + 1, tuple(self._stack))
+            elif char in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if not self._stack:
+                    self._closed = True
+                self._cut = (index + 1, tuple(self._stack))
+            else:  # ","
+                self._cut = (index, tuple(self._stack))
+            pos = match.end()
+
+    @property
+    def complete(self) -> bool:
+        """Check if the top-level value has been closed."""
+        return self._closed and not self._stack and not self._in_string
+
+    def parse(self) -> Any:
+        """Parse the assembled document, raising json.JSONDecodeError if invalid."""
+        return json.loads(self.text())
+
+    def parse_partial(self) -> Any | None:
+        """Parse the document so far, closing open strings and containers.
+
+        Returns None if nothing parseable has arrived yet.
+        """
+        text = self.text()
+        if not text.strip():
+            return None
+
+        closers = "".join(reversed(self._stack))
+        if self._in_string:
+            candidate = (text[:-1] if self._escape else text) + '"' + closers
+        else:
+            candidate = text + closers
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            pass
+
+        # Drop the trailing incomplete key or value
+        if self._cut is not None:
+            length, stack = self._cut
+            try:
+                return json.loads(text[:length] + "".join(reversed(stack)))
+            except json.JSONDecodeError:
+                pass
+        return None
+
+    def preview(self) -> Any | None:
+        """Parse the partial document if it grew enough since the last preview."""
+        if self._length < self._next_preview:
+            return None
+        self._next_preview = 2 * self._length
+        return self.parse_partial()
+
+    def clear(self) -> None:
+        super().clear()
+        self._next_preview = MIN_PREVIEW_CHARS
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._closed = False
+        self._cut = None
@@ -10,16 +10,42 @@ from pathlib import Path
 from typing import Any, Callable
 
 import base64
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, UploadFile, File
+from fastapi import (
+    FastAPI,
+    WebSocket,
+    WebSocketDisconnect,
+    HTTPException,
+    UploadFile,
+    File,
+    Response,
+)
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
 import yaml
 from honolulu.agent import Agent, AgentEvent
+from honolulu.context import ContextWindow, get_context_window
+from honolulu.tokens import UsageTracker, estimate_request_tokens
 from honolulu.config import Config, get_default_config, ProviderConfig as ConfigProviderConfig
-from honolulu.models import ClaudeProvider, OpenAIProvider, ModelRouter, RoutingStrategy
-from honolulu.tools import ToolManager, get_builtin_tools, MCPServerConfig, get_mcp_manager
+from honolulu.models import ModelProvider, ModelRouter, ProviderRegistry, RoutingStrategy
+from honolulu.models.cache import (
+    CachedProvider,
+    DiskCacheBackend,
+    MemoryCacheBackend,
+    ResponseCache,
+)
+from honolulu.models.ledger import MeteredProvider, UsageLedger
+from honolulu.tools import (
+    ToolManager,
+    get_builtin_tools,
+    MCPServerConfig,
+    get_mcp_manager,
+    ResultStore,
+    ReadResultTool,
+)
 from honolulu.permissions import PermissionController
+from honolulu.server.attachments import AttachmentStore, StoredAttachment
+from honolulu.server.stream import EventSender
 from honolulu.agents import create_orchestrator
 
 
@@ -42,6 +68,7 @@ class Session:
     status: str = "active"
     pending_confirmations: dict[str, asyncio.Future] = field(default_factory=dict)
     sub_agent_callback: Callable[[SubAgentEvent], None] | None = None
+    run_task: asyncio.Task | None = None  # In-flight agent run, if any
 
 
 class ChatRequest(BaseModel):
@@ -67,11 +94,25 @@ class SessionInfo(BaseModel):
     status: str
 
 
+class TokenEstimateRequest(BaseModel):
+    """Request to estimate the input tokens of a model request."""
+
+    messages: list[dict]
+    system: str | None = None
+    tools: list[dict] | None = None
+
+
 # Global state
 sessions: dict[str, Session] = {}
 config: Config = get_default_config()
 mcp_tools: list = []  # MCP tools discovered at startup
+tool_catalog: ToolManager | None = None  # Shared built-in + MCP tools, forked per session
 model_router: ModelRouter | None = None  # Multi-model router if enabled
+provider_registry = ProviderRegistry()  # Shared provider clients, reused across sessions
+retired_usage = UsageTracker()  # Token usage of deleted sessions
+usage_ledger = UsageLedger()  # Tokens, cost and latency of every model request
+attachment_store = AttachmentStore()  # Uploaded files, shared by all sessions
+response_cache: ResponseCache | None = None  # Exact-match model response cache if enabled
 
 
 async def reload_config() -> dict[str, Any]:
@@ -80,7 +121,7 @@ async def reload_config() -> dict[str, Any]:
     Returns:
         Dict with reload status and any warnings
     """
-    global config, model_router
+    global config, model_router, tool_catalog
 
     config_path = Path("config/default.yaml")
     warnings = []
@@ -98,33 +139,31 @@ async def reload_config() -> dict[str, Any]:
         new_router = None
         if new_config.routing.enabled and new_config.routing.providers:
             try:
-                strategy = RoutingStrategy(new_config.routing.strategy)
-                new_router = ModelRouter(
-                    strategy=strategy,
-                    fallback_enabled=new_config.routing.fallback_enabled,
-                )
-
-                for p in new_config.routing.providers:
-                    provider = _create_provider(p)
-                    new_router.register(
-                        name=p.name,
-                        provider=provider,
-                        priority=p.priority,
-                        cost_per_1k_input=p.cost_per_1k_input,
-                        cost_per_1k_output=p.cost_per_1k_output,
-                        capabilities=p.capabilities,
-                        is_default=p.is_default,
-                    )
-                    print(f"[Hot Reload] Registered provider: {p.name} ({p.type}/{p.model})")
-
-                print(f"[Hot Reload] Model router enabled with {len(new_config.routing.providers)} providers")
+                new_router = _create_router(new_config, log_prefix="[Hot Reload] ")
             except Exception as e:
                 warnings.append(f"Failed to initialize model router: {e}")
                 new_router = None
 
         # Update global state
+        old_router = model_router
         config = new_config
         model_router = new_router
+        # New sessions get tools for the new config; existing ones keep their fork
+        tool_catalog = _build_tool_catalog()
+        if old_router is not None:
+            await old_router.close()
+
+        # Release providers (and connection pools) the new config no longer uses
+        try:
+            if new_router is not None:
+                providers = [_create_provider(p) for p in new_config.routing.providers]
+            else:
+                providers = [_create_main_provider(new_config)]
+            await provider_registry.prune(
+                p.provider if isinstance(p, CachedProvider) else p for p in providers
+            )
+        except Exception as e:
+            warnings.append(f"Failed to release unused providers: {e}")
 
         # Note: MCP servers cannot be hot-reloaded due to process management
         # They require a full server restart
@@ -146,28 +185,113 @@ async def reload_config() -> dict[str, Any]:
         }
 
 
-def _create_provider(provider_config):
-    """Create a model provider from config."""
+def _create_provider(provider_config) -> ModelProvider:
+    """Get the shared model provider for a routing provider config."""
+    options: dict[str, Any] = dict(provider_config.options)
     if provider_config.type == "anthropic":
-        return ClaudeProvider(
-            api_key=provider_config.api_key,
-            model=provider_config.model,
-            base_url=provider_config.base_url,
-        )
-    elif provider_config.type == "openai":
-        return OpenAIProvider(
-            api_key=provider_config.api_key,
-            model=provider_config.model,
-            base_url=provider_config.base_url,
-        )
+        options["prompt_caching"] = provider_config.prompt_caching
+    # The router retries rate-limited requests within the provider's limits;
+    # SDK retries on top would multiply them and bypass the limiter
+    options["max_retries"] = 0
+
+    return _get_provider(
+        provider_config.type,
+        model=provider_config.model,
+        api_key=provider_config.api_key,
+        base_url=provider_config.base_url,
+        options=options,
+    )
+
+
+def _create_main_provider(cfg: Config) -> ModelProvider:
+    """Get the shared provider of the main model, used when routing is off."""
+    # The main model is Anthropic, unless the offline fake provider is selected
+    options: dict[str, Any] = dict(cfg.model.options)
+    if cfg.model.provider == "fake":
+        provider_type = "fake"
     else:
-        raise ValueError(f"Unknown provider type: {provider_config.type}")
+        provider_type = "anthropic"
+        options["prompt_caching"] = cfg.model.prompt_caching
+    return _get_provider(
+        provider_type,
+        model=cfg.model.name,
+        api_key=cfg.model.api_key,
+        base_url=cfg.model.base_url,
+        options=options,
+    )
+
+
+def _create_response_cache(cfg: Config) -> ResponseCache | None:
+    """Create the response cache if enabled."""
+    if not cfg.cache.enabled:
+        return None
+    if cfg.cache.backend == "disk":
+        backend = DiskCacheBackend(cfg.cache.directory, max_entries=cfg.cache.max_entries)
+    else:
+        backend = MemoryCacheBackend(max_entries=cfg.cache.max_entries)
+    return ResponseCache(backend, ttl=cfg.cache.ttl_seconds)
+
+
+def _get_provider(
+    provider_type: str,
+    model: str,
+    api_key: str | None,
+    base_url: str | None,
+    options: dict[str, Any],
+) -> ModelProvider:
+    """Get a shared provider, behind the response cache if it is enabled."""
+    provider = provider_registry.get(
+        provider_type, model=model, api_key=api_key, base_url=base_url, **options
+    )
+    if response_cache is None:
+        return provider
+
+    # Providers differing in endpoint or options must not share cache entries
+    identity = json.dumps([provider_type, base_url, model, options], sort_keys=True, default=repr)
+    return CachedProvider(provider, response_cache, identity=identity)
+
+
+def _create_router(cfg: Config, log_prefix: str = "") -> ModelRouter:
+    """Create the model router and register the configured providers."""
+    hedge_delay_ms = cfg.routing.hedge_delay_ms
+    router = ModelRouter(
+        strategy=RoutingStrategy(cfg.routing.strategy),
+        fallback_enabled=cfg.routing.fallback_enabled,
+        hedge_delay=hedge_delay_ms / 1000 if hedge_delay_ms is not None else None,
+        failure_threshold=cfg.routing.failure_threshold,
+        recovery_timeout=cfg.routing.recovery_timeout,
+        health_probe=cfg.routing.health_probe,
+        ledger=usage_ledger,
+        cascade_repeat_threshold=cfg.routing.cascade_repeat_threshold,
+        session_affinity=cfg.routing.session_affinity,
+    )
+
+    for p in cfg.routing.providers:
+        provider = _create_provider(p)
+        router.register(
+            name=p.name,
+            provider=provider,
+            priority=p.priority,
+            cost_per_1k_input=p.cost_per_1k_input,
+            cost_per_1k_output=p.cost_per_1k_output,
+            capabilities=p.capabilities,
+            is_default=p.is_default,
+            requests_per_minute=p.requests_per_minute,
+            tokens_per_minute=p.tokens_per_minute,
+        )
+        print(f"{log_prefix}Registered provider: {p.name} ({p.type}/{p.model})")
+
+    print(
+        f"{log_prefix}Model router enabled with {len(cfg.routing.providers)} providers, "
+        f"strategy: {cfg.routing.strategy}"
+    )
+    return router
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler."""
-    global config, mcp_tools, model_router
+    global config, mcp_tools, model_router, tool_catalog, attachment_store, response_cache
 
     # Load config if file exists
     config_path = Path("config/default.yaml")
@@ -176,29 +300,17 @@ async def lifespan(app: FastAPI):
 
     config.expand_env_vars()
 
+    attachment_store = AttachmentStore(max_bytes=config.attachments.store_max_mb * 1024 * 1024)
+    try:
+        response_cache = _create_response_cache(config)
+    except OSError as e:
+        print(f"Warning: Failed to initialize response cache: {e}")
+        response_cache = None
+
     # Initialize model router if enabled
     if config.routing.enabled and config.routing.providers:
         try:
-            strategy = RoutingStrategy(config.routing.strategy)
-            model_router = ModelRouter(
-                strategy=strategy,
-                fallback_enabled=config.routing.fallback_enabled,
-            )
-
-            for p in config.routing.providers:
-                provider = _create_provider(p)
-                model_router.register(
-                    name=p.name,
-                    provider=provider,
-                    priority=p.priority,
-                    cost_per_1k_input=p.cost_per_1k_input,
-                    cost_per_1k_output=p.cost_per_1k_output,
-                    capabilities=p.capabilities,
-                    is_default=p.is_default,
-                )
-                print(f"Registered provider: {p.name} ({p.type}/{p.model})")
-
-            print(f"Model router enabled with {len(config.routing.providers)} providers, strategy: {config.routing.strategy}")
+            model_router = _create_router(config)
         except Exception as e:
             print(f"Warning: Failed to initialize model router: {e}")
             model_router = None
@@ -222,6 +334,8 @@ async def lifespan(app: FastAPI):
         except Exception as e:
             print(f"Warning: Failed to initialize MCP servers: {e}")
 
+    tool_catalog = _build_tool_catalog()
+
     yield
 
     # Cleanup MCP connections
@@ -232,7 +346,18 @@ async def lifespan(app: FastAPI):
         pass
 
     # Cleanup sessions
+    for session in sessions.values():
+        await cancel_run(session)
+        if session.agent.result_store:
+            session.agent.result_store.clear()
     sessions.clear()
+    attachment_store.clear()
+
+    if model_router is not None:
+        await model_router.close()
+
+    # Close pooled provider connections
+    await provider_registry.close()
 
 
 app = FastAPI(
@@ -251,33 +376,76 @@ app.add_middleware(
 )
 
 
+def _create_context_window() -> ContextWindow:
+    """Create a context window sized for the configured model(s)."""
+    if model_router is not None and config.routing.providers:
+        # Any provider may serve a turn, so fit the smallest window
+        context_tokens = min(get_context_window(p.model) for p in config.routing.providers)
+    else:
+        context_tokens = get_context_window(config.model.name)
+
+    return ContextWindow(
+        context_tokens=config.model.context_window or context_tokens,
+        max_output_tokens=config.model.max_tokens,
+        keep_image_turns=config.attachments.keep_image_turns,
+    )
+
+
+def _create_result_store() -> ResultStore | None:
+    """Create a per-session store for oversized tool outputs, if enabled."""
+    if config.tools.result_offload_threshold <= 0:
+        return None
+    return ResultStore(
+        threshold=config.tools.result_offload_threshold,
+        directory=config.tools.result_store_dir,
+    )
+
+
+def _build_tool_catalog() -> ToolManager:
+    """Create the tool catalog shared by all sessions."""
+    catalog = ToolManager()
+    catalog.register_all(get_builtin_tools())
+
+    # Register MCP tools if available
+    if mcp_tools:
+        catalog.register_all(mcp_tools)
+
+    # One read_result tool for all sessions, it reads the calling session's store
+    if config.tools.result_offload_threshold > 0:
+        catalog.register(ReadResultTool())
+
+    return catalog
+
+
+def _get_tool_catalog() -> ToolManager:
+    """Get the shared tool catalog, building it on first use."""
+    global tool_catalog
+    if tool_catalog is None:
+        tool_catalog = _build_tool_catalog()
+    return tool_catalog
+
+
 def create_agent(
     sub_agent_callback: Callable[[SubAgentEvent], None] | None = None,
     multi_agent_mode: bool = False,
+    session_id: str | None = None,
 ) -> Agent:
     """Create a new agent instance.
 
     Args:
         sub_agent_callback: Callback for sub-agent events (only used in multi-agent mode)
         multi_agent_mode: Enable multi-agent orchestration mode
+        session_id: Session the agent's model requests are attributed to
     """
     # Use router if available, otherwise create single provider
     if model_router is not None:
         model = model_router
     else:
-        model = ClaudeProvider(
-            api_key=config.model.api_key,
-            model=config.model.name,
-            base_url=config.model.base_url,
-        )
+        # Without a router to record them, meter the provider's requests here
+        model = MeteredProvider(_create_main_provider(config), usage_ledger)
 
-    # Create tool manager with built-in tools
-    tool_manager = ToolManager()
-    tool_manager.register_all(get_builtin_tools())
-
-    # Register MCP tools if available
-    if mcp_tools:
-        tool_manager.register_all(mcp_tools)
+    # Per-session view of the shared tool catalog
+    tool_manager = _get_tool_catalog().fork()
 
     # In multi-agent mode, create orchestrator with delegation tools
     if multi_agent_mode:
@@ -295,10 +463,29 @@ def create_agent(
             model=model,
             tool_manager=tool_manager,
             system_prompt=orchestrator.SYSTEM_PROMPT,
+            parallel_tools=config.tools.parallel,
+            max_concurrent_tools=config.tools.max_concurrency,
+            pipeline_tools=config.tools.pipeline,
+            max_tokens=config.model.max_tokens,
+            context_window=_create_context_window(),
+            result_store=_create_result_store(),
+            attachment_resolver=attachment_store.resolve,
+            session_id=session_id,
         )
 
     # Create standard agent
-    return Agent(model=model, tool_manager=tool_manager)
+    return Agent(
+        model=model,
+        tool_manager=tool_manager,
+        parallel_tools=config.tools.parallel,
+        max_concurrent_tools=config.tools.max_concurrency,
+        pipeline_tools=config.tools.pipeline,
+        max_tokens=config.model.max_tokens,
+        context_window=_create_context_window(),
+        result_store=_create_result_store(),
+        attachment_resolver=attachment_store.resolve,
+        session_id=session_id,
+    )
 
 
 def create_session(
@@ -317,6 +504,7 @@ def create_session(
     agent = create_agent(
         sub_agent_callback=sub_agent_callback,
         multi_agent_mode=multi_agent_mode,
+        session_id=session_id,
     )
 
     session = Session(
@@ -362,15 +550,103 @@ async def delete_session(session_id: str):
     if session_id not in sessions:
         raise HTTPException(status_code=404, detail="Session not found")
 
-    del sessions[session_id]
+    session = sessions.pop(session_id)
+    await cancel_run(session)
+    retired_usage.merge(session.agent.usage)
+    if model_router is not None:
+        model_router.forget_session(session_id)
+    if session.agent.result_store:
+        session.agent.result_store.clear()
     return {"ok": True}
 
 
+@app.get("/api/sessions/{session_id}/tokens")
+async def get_session_tokens(session_id: str):
+    """Get token usage of a session, in total and per provider."""
+    if session_id not in sessions:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    return sessions[session_id].agent.usage.to_dict()
+
+
+@app.get("/api/tokens")
+async def get_tokens():
+    """Get token usage across all sessions, for budgeting and capacity planning."""
+    overall = UsageTracker()
+    overall.merge(retired_usage)
+    for session in sessions.values():
+        overall.merge(session.agent.usage)
+
+    return {
+        "total": overall.total.to_dict(),
+        "by_provider": {name: u.to_dict() for name, u in overall.by_provider.items()},
+        "sessions": {sid: s.agent.usage.total.to_dict() for sid, s in sessions.items()},
+    }
+
+
+@app.post("/api/tokens/estimate")
+async def estimate_tokens(request: TokenEstimateRequest):
+    """Estimate the input tokens of a request locally, without calling a model."""
+    return {
+        "input_tokens": estimate_request_tokens(request.messages, request.tools, request.system),
+    }
+
+
+@app.get("/api/usage")
+async def get_usage(
+    session_id: str | None = None,
+    provider: str | None = None,
+    since: float | None = None,
+):
+    """Get tokens, cost and latency of model requests, optionally filtered.
+
+    With a session_id, also returns its per-turn totals and recent requests.
+    """
+    result: dict[str, Any] = {
+        "total": usage_ledger.summary(session_id, provider, since).to_dict(),
+    }
+    if session_id is None:
+        result["by_provider"] = {
+            name: s.to_dict() for name, s in usage_ledger.by_provider().items()
+        }
+        result["by_session"] = {
+            sid: s.to_dict() for sid, s in usage_ledger.by_session().items()
+        }
+    else:
+        result["turns"] = {turn: s.to_dict() for turn, s in usage_ledger.turns(session_id).items()}
+        result["requests"] = [e.to_dict() for e in usage_ledger.entries(session_id)]
+    return result
+
+
+@app.get("/api/cache")
+async def get_cache_stats():
+    """Get response cache statistics (entries, hits, misses, coalesced requests)."""
+    if response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **response_cache.to_dict()}
+
+
+@app.delete("/api/cache")
+async def clear_cache():
+    """Drop all cached responses."""
+    if response_cache is None:
+        raise HTTPException(status_code=404, detail="Response cache is not enabled")
+    await response_cache.clear()
+    return {"success": True}
+
+
+@app.get("/api/routing/stats")
+async def get_routing_stats():
+    """Get per-provider routing statistics (latency, hedging, health, rate limits)."""
+    if model_router is None:
+        return {"enabled": False}
+    return {"enabled": True, **model_router.stats()}
+
+
 @app.get("/api/tools")
 async def list_tools():
     """List available tools."""
-    agent = create_agent()
-    return agent.tool_manager.get_tool_definitions()
+    return _get_tool_catalog().get_tool_definitions()
 
 
 @app.get("/api/config")
@@ -404,7 +680,7 @@ class ProviderConfigRequest(BaseModel):
     """Provider configuration request."""
     id: str
     name: str
-    type: str  # "anthropic" | "openai"
+    type: str  # "anthropic" | "openai" | "fake"
     api_key: str
     base_url: str | None = None
     model: str
@@ -619,6 +895,15 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
     session = sessions[session_id]
     permission_controller = PermissionController(config.permissions)
 
+    # All outgoing messages go through the sender so they stay in order
+    sender = EventSender(
+        websocket,
+        flush_interval=config.server.stream_flush_ms / 1000,
+        max_frame_bytes=config.server.stream_max_frame_bytes,
+        max_pending=config.server.stream_max_pending_frames,
+    )
+    sender.start()
+
     async def confirmation_callback(
         tool_call_id: str,
         tool_name: str,
@@ -630,7 +915,7 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
             tool_name, tool_args
         )
         if not allowed:
-            await websocket.send_json(
+            sender.send(
                 {
                     "type": "permission_denied",
                     "tool_call_id": tool_call_id,
@@ -654,6 +939,28 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
 
     session.agent.confirm_callback = confirmation_callback
 
+    # Messages waiting for the current run to finish
+    message_queue: asyncio.Queue[tuple[str, list[dict] | None]] = asyncio.Queue()
+
+    async def run_agent(user_message: str, attachments: list[dict] | None) -> None:
+        """Run the agent for one message, streaming events to the client."""
+        try:
+            # Use streaming method for real-time text output
+            async for event in session.agent.run_streaming(user_message, attachments):
+                # Backpressure: wait for a client that fell far behind
+                await sender.put(agent_event_message(event))
+        except Exception as e:
+            sender.send({"type": "error", "message": str(e)})
+
+    async def agent_worker() -> None:
+        """Run queued messages one at a time, so the receive loop stays free."""
+        while True:
+            user_message, attachments = await message_queue.get()
+            session.run_task = asyncio.create_task(run_agent(user_message, attachments))
+            await asyncio.wait({session.run_task})
+
+    worker = asyncio.create_task(agent_worker())
+
     try:
         while True:
             # Receive message from client
@@ -663,10 +970,7 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                 # User sent a message, run the agent with streaming
                 user_message = data["content"]
                 attachments = data.get("attachments")  # Optional attachments
-
-                # Use streaming method for real-time text output
-                async for event in session.agent.run_streaming(user_message, attachments):
-                    await send_agent_event(websocket, event)
+                message_queue.put_nowait((user_message, attachments))
 
             elif data["type"] == "confirm_response":
                 # User responded to a confirmation request
@@ -676,7 +980,9 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                 if tool_call_id in session.pending_confirmations:
                     future = session.pending_confirmations[tool_call_id]
 
-                    if action == "allow":
+                    if future.done():
+                        pass  # Run was cancelled or timed out meanwhile
+                    elif action == "allow":
                         future.set_result(True)
                     elif action == "allow_all":
                         # Allow this and future calls to this tool
@@ -688,18 +994,43 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                         future.set_result(False)
 
             elif data["type"] == "cancel":
-                # User wants to cancel the current operation
-                # For now, just acknowledge
-                await websocket.send_json({"type": "cancelled"})
+                # User wants to cancel the current operation: drop queued
+                # messages and stop the model stream and running tools
+                while not message_queue.empty():
+                    message_queue.get_nowait()
+                await cancel_run(session)
+                sender.send({"type": "cancelled"})
 
     except WebSocketDisconnect:
         pass
     except Exception as e:
-        await websocket.send_json({"type": "error", "message": str(e)})
+        sender.send({"type": "error", "message": str(e)})
+        await sender.flush()
+    finally:
+        # Nobody is listening anymore, stop spending tokens and CPU
+        worker.cancel()
+        await cancel_run(session)
+        await sender.close()
 
 
-async def send_agent_event(websocket: WebSocket, event: AgentEvent):
-    """Send an agent event to the WebSocket client."""
+async def cancel_run(session: Session) -> bool:
+    """Cancel a session's in-flight agent run and wait for it to unwind.
+
+    Cancellation propagates through the agent loop into the provider stream,
+    running tools and their child processes; the agent leaves its history
+    consistent. Returns False if nothing was running.
+    """
+    task = session.run_task
+    if task is None or task.done():
+        return False
+
+    task.cancel()
+    await asyncio.wait({task})
+    return True
+
+
+def agent_event_message(event: AgentEvent) -> dict[str, Any]:
+    """Convert an agent event to a WebSocket message."""
     message: dict[str, Any] = {"type": event.type}
 
     if event.content is not None:
@@ -717,7 +1048,7 @@ async def send_agent_event(websocket: WebSocket, event: AgentEvent):
     if event.requires_confirmation:
         message["requires_confirmation"] = True
 
-    await websocket.send_json(message)
+    return message
 
 
 async def send_sub_agent_event(websocket: WebSocket, event: SubAgentEvent):
@@ -760,9 +1091,13 @@ MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 async def upload_file(file: UploadFile = File(...)):
     """Upload a file (image or PDF) for multimodal chat.
 
+    The file is stored server-side under its sha256; send the returned id
+    as a WebSocket message attachment.
+
     Returns:
-        For images: {id, filename, content_type, base64, type: "image"}
-        For PDFs: {id, filename, content_type, text, page_count, type: "document"}
+        For images: {id, filename, content_type, width, height, estimated_tokens,
+            type: "image"} (size fields only when Pillow is installed)
+        For PDFs: {id, filename, content_type, page_count, type: "document"}
     """
     if not file.content_type:
         raise HTTPException(status_code=400, detail="Missing content type")
@@ -784,18 +1119,50 @@ async def upload_file(file: UploadFile = File(...)):
             detail=f"File too large. Maximum size: {MAX_FILE_SIZE // 1024 // 1024}MB"
         )
 
-    file_id = str(uuid.uuid4())
+    # Identical uploads share one stored copy
+    attachment_id = AttachmentStore.digest(content)
+    existing = attachment_store.get(attachment_id)
+    if existing is not None:
+        return existing.to_dict()
 
     if file.content_type in SUPPORTED_IMAGE_TYPES:
-        # Return base64-encoded image
-        b64_content = base64.b64encode(content).decode("utf-8")
-        return {
-            "id": file_id,
-            "filename": file.filename,
-            "content_type": file.content_type,
-            "base64": b64_content,
-            "type": "image",
-        }
+        content_type = file.content_type
+        width = height = estimated_tokens = None
+
+        # Downsize to what the model actually uses, off the event loop
+        if config.attachments.max_image_edge > 0:
+            try:
+                from honolulu.tools.image_processor import preprocess_image
+
+                image = await preprocess_image(
+                    content,
+                    content_type,
+                    max_edge=config.attachments.max_image_edge,
+                    quality=config.attachments.image_quality,
+                )
+                content, content_type = image.data, image.content_type
+                width, height = image.width, image.height
+                estimated_tokens = image.estimated_tokens
+            except ImportError:
+                pass  # Pillow not installed, send the image as uploaded
+            except Exception as e:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Failed to process image: {str(e)}"
+                )
+
+        # Keep the image server-side, the client only gets a handle
+        attachment = StoredAttachment(
+            id=attachment_id,
+            type="image",
+            filename=file.filename,
+            content_type=content_type,
+            base64=base64.b64encode(content).decode("utf-8"),
+            width=width,
+            height=height,
+            estimated_tokens=estimated_tokens,
+        )
+        return attachment_store.put(attachment).to_dict()
     else:
         # PDF - extract text
         try:
@@ -804,14 +1171,15 @@ async def upload_file(file: UploadFile = File(...)):
             text = extract_pdf_text(content)
             info = get_pdf_info(content)
 
-            return {
-                "id": file_id,
-                "filename": file.filename,
-                "content_type": file.content_type,
-                "text": text,
-                "page_count": info["page_count"],
-                "type": "document",
-            }
+            attachment = StoredAttachment(
+                id=attachment_id,
+                type="document",
+                filename=file.filename,
+                content_type=file.content_type,
+                text=text,
+                page_count=info["page_count"],
+            )
+            return attachment_store.put(attachment).to_dict()
         except ImportError:
             raise HTTPException(
                 status_code=500,
@@ -824,6 +1192,21 @@ async def upload_file(file: UploadFile = File(...)):
             )
 
 
+@app.get("/api/attachments/{attachment_id}")
+async def get_attachment(attachment_id: str):
+    """Get the content of an uploaded attachment (image bytes or document text)."""
+    attachment = attachment_store.get(attachment_id)
+    if attachment is None:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+
+    if attachment.type == "image":
+        return Response(
+            content=base64.b64decode(attachment.base64),
+            media_type=attachment.content_type,
+        )
+    return {**attachment.to_dict(), "text": attachment.text}
+
+
 def main():
     """Run the server."""
     import uvicorn
@@ -0,0 +1,112 @@
+"""Content-addressed storage for uploaded attachments."""
+
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+
+
+@dataclass
+class StoredAttachment:
+    """An uploaded file, stored once under its sha256."""
+
+    id: str
+    type: str  # "image" or "document"
+    filename: str
+    content_type: str
+    # Base64-encoded once at upload; every message that references the image
+    # shares this one string instead of carrying its own copy
+    base64: str = ""
+    text: str | None = None  # Extracted text, for documents
+    page_count: int | None = None
+    width: int | None = None
+    height: int | None = None
+    estimated_tokens: int | None = None  # Input tokens the image will cost
+
+    @property
+    def size(self) -> int:
+        return len(self.base64) + len(self.text or "")
+
+    def to_dict(self) -> dict:
+        """Upload response / WebSocket handle (never includes the bytes)."""
+        info = {
+            "id": self.id,
+            "type": self.type,
+            "filename": self.filename,
+            "content_type": self.content_type,
+        }
+        for key in ("page_count", "width", "height", "estimated_tokens"):
+            value = getattr(self, key)
+            if value is not None:
+                info[key] = value
+        return info
+
+
+class AttachmentStore:
+    """Keeps uploaded attachments server-side, deduplicated by sha256.
+
+    Clients only pass attachment ids over the WebSocket; the agent resolves
+    them to inline content when a message is converted for the API.
+    Least recently used entries are evicted once ``max_bytes`` is exceeded.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items: OrderedDict[str, StoredAttachment] = OrderedDict()
+        self._bytes = 0
+
+    @staticmethod
+    def digest(content: bytes) -> str:
+        """Get the id an attachment with this content is stored under."""
+        return hashlib.sha256(content).hexdigest()
+
+    def get(self, attachment_id: str) -> StoredAttachment | None:
+        """Get an attachment by id."""
+        item = self._items.get(attachment_id)
+        if item is not None:
+            self._items.move_to_end(attachment_id)
+        return item
+
+    def put(self, attachment: StoredAttachment) -> StoredAttachment:
+        """Store an attachment, returning the existing entry for duplicates."""
+        existing = self.get(attachment.id)
+        if existing is not None:
+            return existing
+
+        self._items[attachment.id] = attachment
+        self._bytes += attachment.size
+        while self._bytes > self.max_bytes and len(self._items) > 1:
+            _, evicted = self._items.popitem(last=False)
+            self._bytes -= evicted.size
+        return attachment
+
+    def resolve(self, attachment: dict) -> dict | None:
+        """Expand an attachment handle into the inline form the agent sends.
+
+        Attachments that already carry their content (older clients) are
+        returned unchanged. Returns None for unknown ids.
+        """
+        if attachment.get("base64") or attachment.get("text"):
+            return attachment
+
+        item = self.get(attachment.get("id", ""))
+        if item is None:
+            return None
+
+        if item.type == "image":
+            return {
+                "type": "image",
+                "filename": item.filename,
+                "content_type": item.content_type,
+                "base64": item.base64,
+            }
+        return {
+            "type": "document",
+            "filename": item.filename,
+            "content_type": item.content_type,
+            "text": item.text or "",
+        }
+
+    def clear(self) -> None:
+        """Remove all attachments."""
+        self._items.clear()
+        self._bytes = 0
@@ -0,0 +1,148 @@
+"""Coalescing, backpressure-aware event delivery to WebSocket clients."""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any
+
+from fastapi import WebSocket
+
+
+class _PendingDelta:
+    """text_delta fragments merged into one frame that is not yet sent."""
+
+    __slots__ = ("parts", "size", "created")
+
+    def __init__(self, text: str):
+        self.parts = [text]
+        self.size = len(text.encode("utf-8"))
+        self.created = time.monotonic()
+
+    def add(self, text: str) -> None:
+        self.parts.append(text)
+        self.size += len(text.encode("utf-8"))
+
+    def to_message(self) -> dict[str, Any]:
+        return {"type": "text_delta", "content": "".join(self.parts)}
+
+
+class EventSender:
+    """Sends messages to a WebSocket client from a background writer task.
+
+    Consecutive ``text_delta`` messages are merged while they wait in the
+    queue: a fast client gets a frame every ``flush_interval`` seconds or
+    every ``max_frame_bytes``, whichever comes first, while a slow client
+    that falls behind gets fewer, larger frames (up to
+    ``max_backlog_frame_bytes``). Message order is always preserved.
+
+    ``send`` never blocks; ``put`` waits while ``max_pending`` frames are
+    queued, so a client that stops reading pauses the agent run instead of
+    growing the queue without bound.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        flush_interval: float = 0.03,
+        max_frame_bytes: int = 4096,
+        max_backlog_frame_bytes: int = 65536,
+        max_pending: int = 256,
+    ):
+        self._websocket = websocket
+        self.flush_interval = flush_interval
+        self.max_frame_bytes = max_frame_bytes
+        self.max_backlog_frame_bytes = max_backlog_frame_bytes
+        self.max_pending = max_pending
+
+        self._queue: deque[dict[str, Any] | _PendingDelta] = deque()
+        self._wakeup = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._space = asyncio.Event()  # Set while fewer than max_pending frames are queued
+        self._space.set()
+        self._writer: asyncio.Task | None = None
+        self._closed = False
+
+    def start(self) -> None:
+        """Start the background writer."""
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._run())
+
+    def send(self, message: dict[str, Any]) -> None:
+        """Queue a message for delivery."""
+        if self._closed:
+            return
+
+        if message.get("type") == "text_delta" and isinstance(message.get("content"), str):
+            tail = self._queue[-1] if self._queue else None
+            if isinstance(tail, _PendingDelta) and tail.size < self._frame_limit():
+                tail.add(message["content"])
+            else:
+                self._queue.append(_PendingDelta(message["content"]))
+        else:
+            self._queue.append(message)
+
+        if len(self._queue) >= self.max_pending:
+            self._space.clear()
+        self._drained.clear()
+        self._wakeup.set()
+
+    async def put(self, message: dict[str, Any]) -> None:
+        """Queue a message, then wait until the queue is below max_pending frames."""
+        self.send(message)
+        await self._space.wait()
+
+    async def flush(self) -> None:
+        """Wait until every queued message has been written."""
+        if not self._closed:
+            await self._drained.wait()
+
+    async def close(self) -> None:
+        """Stop the writer, dropping anything still queued."""
+        self._closed = True
+        self._queue.clear()
+        self._drained.set()
+        self._space.set()
+        if self._writer:
+            self._writer.cancel()
+            await asyncio.wait({self._writer})
+
+    def _frame_limit(self) -> int:
+        """Merge limit for the tail frame; grows as the client falls behind."""
+        backlog = len(self._queue)
+        return min(self.max_frame_bytes * max(1, backlog), self.max_backlog_frame_bytes)
+
+    async def _run(self) -> None:
+        try:
+            while True:
+                if not self._queue:
+                    self._drained.set()
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                head = self._queue[0]
+                if isinstance(head, _PendingDelta) and len(self._queue) == 1:
+                    # Give more deltas a short window to join this frame
+                    remaining = head.created + self.flush_interval - time.monotonic()
+                    if remaining > 0 and head.size < self.max_frame_bytes:
+                        self._wakeup.clear()
+                        try:
+                            await asyncio.wait_for(self._wakeup.wait(), timeout=remaining)
+                        except asyncio.TimeoutError:
+                            pass
+                        continue
+
+                self._queue.popleft()
+                if len(self._queue) < self.max_pending:
+                    self._space.set()
+                message = head.to_message() if isinstance(head, _PendingDelta) else head
+                await self._websocket.send_json(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Client went away; the receive loop will notice and clean up
+            self._closed = True
+            self._queue.clear()
+            self._drained.set()
+            self._space.set()
@@ -0,0 +1,157 @@
+"""Token estimation and usage accounting for model requests."""
+
+import json
+from dataclasses import dataclass, field
+from typing import Any
+
+# Rough cost of one image block (Claude caps images at ~1600 tokens)
+IMAGE_TOKENS = 1600
+
+# Per-message framing overhead (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_text_tokens(text: str) -> int:
+    """Estimate the token count of a string.
+
+    ASCII text averages ~4 characters per token, while CJK and other
+    non-ASCII characters are close to one token each. The non-ASCII count is
+    derived from the UTF-8 length so no Python-level character loop is needed.
+    """
+    if not text:
+        return 0
+
+    length = len(text)
+    if text.isascii():
+        return (length + 3) // 4
+
+    # CJK characters take 3 bytes in UTF-8, so each adds ~2 extra bytes
+    non_ascii = min(length, (len(text.encode("utf-8")) - length) // 2)
+    return (length - non_ascii + 3) // 4 + non_ascii
+
+
+def estimate_block_tokens(block: Any) -> int:
+    """Estimate the token count of one content block."""
+    if isinstance(block, str):
+        return estimate_text_tokens(block)
+
+    block_type = block.get("type")
+    if block_type == "text":
+        return estimate_text_tokens(block.get("text", ""))
+    if block_type == "image":
+        return IMAGE_TOKENS
+    if block_type == "tool_use":
+        arguments = json.dumps(block.get("input", {}), ensure_ascii=False)
+        return estimate_text_tokens(block.get("name", "")) + estimate_text_tokens(arguments)
+    if block_type == "tool_result":
+        return estimate_content_tokens(block.get("content", ""))
+
+    return estimate_text_tokens(json.dumps(block, ensure_ascii=False))
+
+
+def estimate_content_tokens(content: Any) -> int:
+    """Estimate the token count of message content (string or block list)."""
+    if isinstance(content, list):
+        return sum(estimate_block_tokens(block) for block in content)
+    return estimate_text_tokens(str(content) if content is not None else "")
+
+
+def estimate_message_tokens(message: dict) -> int:
+    """Estimate the token count of one API-format message."""
+    return MESSAGE_OVERHEAD_TOKENS + estimate_content_tokens(message.get("content"))
+
+
+def estimate_tools_tokens(tools: list[dict] | None) -> int:
+    """Estimate the token count of a list of tool definitions."""
+    if not tools:
+        return 0
+    return estimate_text_tokens(json.dumps(tools, ensure_ascii=False))
+
+
+def estimate_request_tokens(
+    messages: list[dict],
+    tools: list[dict] | None = None,
+    system: str | None = None,
+) -> int:
+    """Estimate the input token count of a whole model request."""
+    return (
+        sum(estimate_message_tokens(m) for m in messages)
+        + estimate_tools_tokens(tools)
+        + estimate_text_tokens(system or "")
+    )
+
+
+@dataclass
+class TokenUsage:
+    """Token counts accumulated over one or more model requests."""
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    requests: int = 0
+
+    def add(self, usage: dict[str, int]) -> None:
+        """Add the usage reported for one request."""
+        self.input_tokens += usage.get("input_tokens", 0)
+        self.output_tokens += usage.get("output_tokens", 0)
+        self.cache_read_input_tokens += usage.get("cache_read_input_tokens", 0)
+        self.cache_creation_input_tokens += usage.get("cache_creation_input_tokens", 0)
+        self.requests += 1
+
+    def merge(self, other: "TokenUsage") -> None:
+        """Add another accumulated usage into this one."""
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.cache_read_input_tokens += other.cache_read_input_tokens
+        self.cache_creation_input_tokens += other.cache_creation_input_tokens
+        self.requests += other.requests
+
+    @property
+    def total_tokens(self) -> int:
+        return (
+            self.input_tokens
+            + self.output_tokens
+            + self.cache_read_input_tokens
+            + self.cache_creation_input_tokens
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cache_read_input_tokens": self.cache_read_input_tokens,
+            "cache_creation_input_tokens": self.cache_creation_input_tokens,
+            "total_tokens": self.total_tokens,
+            "requests": self.requests,
+        }
+
+
+@dataclass
+class UsageTracker:
+    """Per-session token accounting, in total and per provider."""
+
+    total: TokenUsage = field(default_factory=TokenUsage)
+    by_provider: dict[str, TokenUsage] = field(default_factory=dict)
+    # Local estimate of the most recent request's input, taken before sending
+    last_request_estimate: int = 0
+
+    def record(self, provider: str, usage: dict[str, int]) -> None:
+        """Record the exact usage a provider reported for one request."""
+        if not usage:
+            return
+        self.total.add(usage)
+        self.by_provider.setdefault(provider, TokenUsage()).add(usage)
+
+    def merge(self, other: "UsageTracker") -> None:
+        """Fold another tracker's totals into this one."""
+        self.total.merge(other.total)
+        for provider, usage in other.by_provider.items():
+            self.by_provider.setdefault(provider, TokenUsage()).merge(usage)
+
+    def to_dict(self) -> dict:
+        return {
+            "total": self.total.to_dict(),
+            "by_provider": {name: u.to_dict() for name, u in self.by_provider.items()},
+            "last_request_estimate": self.last_request_estimate,
+        }
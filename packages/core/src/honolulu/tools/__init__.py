@@ -5,6 +5,7 @@ from honolulu.tools.file_ops import get_file_tools
 from honolulu.tools.bash import get_bash_tools
 from honolulu.tools.web import get_web_tools
 from honolulu.tools.mcp import MCPManager, MCPServerConfig, MCPTool, get_mcp_manager
+from honolulu.tools.result_store import ResultStore, ReadResultTool
 
 
 def get_builtin_tools() -> list[Tool]:
@@ -24,4 +25,6 @@ __all__ = [
     "MCPServerConfig",
     "MCPTool",
     "get_mcp_manager",
+    "ResultStore",
+    "ReadResultTool",
 ]
@@ -43,21 +43,66 @@ class Tool(ABC):
         }
 
 
+class ToolDefinitions(list):
+    """A tool definitions list that can be weakly referenced.
+
+    Providers cache their conversion of a definitions list for as long as
+    the list lives.
+    """
+
+    __slots__ = ("__weakref__",)
+
+
 @dataclass
 class ToolManager:
-    """Manages tool registration and execution."""
+    """Manages tool registration and execution.
+
+    Tool definitions are built once and cached until a tool is registered or
+    unregistered. ``fork`` returns a copy-on-write view, so one catalog of
+    tools (and its cached definitions) can be shared by every session.
+    """
 
     tools: dict[str, Tool] = field(default_factory=dict)
+    _definitions: list[dict] | None = field(default=None, init=False, repr=False)
+    # True while the tools dict is shared with a fork
+    _shared: bool = field(default=False, init=False, repr=False)
 
     def register(self, tool: Tool) -> None:
         """Register a tool."""
+        self._own_tools()
+        replaced = tool.name in self.tools
         self.tools[tool.name] = tool
 
+        if self._definitions is not None and not replaced:
+            self._definitions = ToolDefinitions([*self._definitions, tool.to_anthropic_tool()])
+        else:
+            self._definitions = None
+
     def register_all(self, tools: list[Tool]) -> None:
         """Register multiple tools."""
         for tool in tools:
             self.register(tool)
 
+    def unregister(self, name: str) -> Tool | None:
+        """Remove a tool by name, returning it if it was registered."""
+        if name not in self.tools:
+            return None
+        self._own_tools()
+        self._definitions = None
+        return self.tools.pop(name)
+
+    def fork(self) -> "ToolManager":
+        """Create a copy-on-write view of this manager.
+
+        The fork shares the tool instances and cached definitions until
+        either side registers or unregisters a tool. Definitions are built
+        before forking, so every fork shares the same list.
+        """
+        fork = ToolManager(tools=self.tools)
+        fork._definitions = self.get_tool_definitions()
+        fork._shared = self._shared = True
+        return fork
+
     def get(self, name: str) -> Tool | None:
         """Get a tool by name."""
         return self.tools.get(name)
@@ -67,8 +112,21 @@ class ToolManager:
         return list(self.tools.values())
 
     def get_tool_definitions(self) -> list[dict]:
-        """Get all tool definitions in Anthropic format."""
-        return [tool.to_anthropic_tool() for tool in self.tools.values()]
+        """Get all tool definitions in Anthropic format.
+
+        The returned list is cached and shared; callers must not modify it.
+        """
+        if self._definitions is None:
+            self._definitions = ToolDefinitions(
+                tool.to_anthropic_tool() for tool in self.tools.values()
+            )
+        return self._definitions
+
+    def _own_tools(self) -> None:
+        """Copy the tools dict before the first change to a shared one."""
+        if self._shared:
+            self.tools = dict(self.tools)
+            self._shared = False
 
     async def execute(self, name: str, params: dict) -> ToolResult:
         """Execute a tool by name."""
@@ -93,3 +151,12 @@ class ToolManager:
         """Check if a tool requires user confirmation."""
         tool = self.get(name)
         return tool.requires_confirmation if tool else False
+
+    def can_run_concurrently(self, name: str) -> bool:
+        """Check if a tool may run alongside other calls from the same turn.
+
+        Only tools that never ask for confirmation (the read-only built-ins)
+        qualify; anything with side effects keeps sequential ordering.
+        """
+        tool = self.get(name)
+        return tool is not None and not tool.requires_confirmation
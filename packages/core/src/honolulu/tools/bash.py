@@ -1,7 +1,9 @@
 """Bash execution tool."""
 
 import asyncio
+import os
 import shlex
+import signal
 from typing import Any
 
 from honolulu.tools.base import Tool, ToolResult
@@ -46,6 +48,8 @@ class BashExecTool(Tool):
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
                 cwd=cwd,
+                # Own process group, so children can be killed with the shell
+                start_new_session=True,
             )
 
             try:
@@ -53,8 +57,12 @@ class BashExecTool(Tool):
                     process.communicate(),
                     timeout=timeout,
                 )
+            except asyncio.CancelledError:
+                # Run was cancelled, don't leave the command running
+                await self._terminate(process)
+                raise
             except asyncio.TimeoutError:
-                process.kill()
+                await self._terminate(process)
                 return ToolResult(
                     success=False,
                     output=None,
@@ -91,6 +99,18 @@ class BashExecTool(Tool):
                 error=str(e),
             )
 
+    @staticmethod
+    async def _terminate(process: asyncio.subprocess.Process) -> None:
+        """Kill a command together with any child processes it started."""
+        try:
+            if hasattr(os, "killpg"):
+                os.killpg(process.pid, signal.SIGKILL)
+            else:
+                process.kill()
+        except (ProcessLookupError, PermissionError):
+            pass
+        await process.wait()
+
 
 def get_bash_tools() -> list[Tool]:
     """Get all bash tools."""
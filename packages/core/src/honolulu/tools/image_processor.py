@@ -0,0 +1,138 @@
+"""Image preprocessing for uploads using Pillow."""
+
+import asyncio
+import io
+import math
+from dataclasses import dataclass
+
+# Claude downscales anything with a longer edge or more pixels than this, so
+# larger uploads only cost bandwidth and latency
+MAX_IMAGE_EDGE = 1568
+MAX_IMAGE_PIXELS = 1_150_000
+
+# Claude bills roughly width * height / 750 tokens per image
+PIXELS_PER_TOKEN = 750
+
+# Formats that are already compressed well enough to keep as uploaded
+EFFICIENT_TYPES = {"image/jpeg", "image/webp"}
+
+# EXIF orientation tag; values 5-8 are rotated by 90 degrees when displayed
+EXIF_ORIENTATION = 0x0112
+
+
+@dataclass
+class ProcessedImage:
+    """An image ready to be sent to the model."""
+
+    data: bytes
+    content_type: str
+    width: int
+    height: int
+    original_size: int
+
+    @property
+    def estimated_tokens(self) -> int:
+        return estimate_image_tokens(self.width, self.height)
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """Estimate the input tokens an image of the given size costs."""
+    return max(1, math.ceil(width * height / PIXELS_PER_TOKEN))
+
+
+def fit_dimensions(
+    width: int,
+    height: int,
+    max_edge: int = MAX_IMAGE_EDGE,
+    max_pixels: int = MAX_IMAGE_PIXELS,
+) -> tuple[int, int]:
+    """Scale dimensions down (never up) to the model's effective resolution."""
+    scale = min(1.0, max_edge / max(width, height), math.sqrt(max_pixels / (width * height)))
+    # Round down, with a little slack for float error on exact edge limits
+    return max(1, int(width * scale + 1e-6)), max(1, int(height * scale + 1e-6))
+
+
+def process_image(
+    file_bytes: bytes,
+    content_type: str,
+    max_edge: int = MAX_IMAGE_EDGE,
+    quality: int = 85,
+) -> ProcessedImage:
+    """Downsize an image to the model's effective resolution and re-encode it.
+
+    Opaque images are encoded as JPEG and images with transparency as WebP.
+    The original is kept when it is already small enough and at least as
+    compact as the re-encoded version. Animated images are never re-encoded.
+
+    Args:
+        file_bytes: Raw bytes of the uploaded image
+        content_type: MIME type of the upload
+        max_edge: Maximum length of the longer edge, in pixels
+        quality: JPEG/WebP encoder quality
+
+    Returns:
+        The processed image with its dimensions
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise ImportError(
+            "Pillow is required for image preprocessing. Install it with: pip install pillow"
+        )
+
+    image = Image.open(io.BytesIO(file_bytes))
+    # Dimensions as displayed, after EXIF rotation
+    displayed = image.size
+    if image.getexif().get(EXIF_ORIENTATION, 1) in (5, 6, 7, 8):
+        displayed = (image.height, image.width)
+    original = ProcessedImage(
+        data=file_bytes,
+        content_type=content_type,
+        width=displayed[0],
+        height=displayed[1],
+        original_size=len(file_bytes),
+    )
+
+    if getattr(image, "is_animated", False):
+        return original
+
+    size = fit_dimensions(*displayed, max_edge)
+    resized = size != displayed
+    if not resized and content_type in EFFICIENT_TYPES:
+        return original
+
+    # Apply EXIF rotation before pixels are resampled or metadata is dropped
+    image = ImageOps.exif_transpose(image)
+    if resized:
+        image = image.resize(size, Image.Resampling.LANCZOS)
+
+    has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+    output = io.BytesIO()
+    if has_alpha:
+        image.convert("RGBA").save(output, format="WEBP", quality=quality)
+        encoded_type = "image/webp"
+    else:
+        image.convert("RGB").save(output, format="JPEG", quality=quality, optimize=True)
+        encoded_type = "image/jpeg"
+
+    data = output.getvalue()
+    if not resized and len(data) >= len(file_bytes):
+        return original
+
+    return ProcessedImage(
+        data=data,
+        content_type=encoded_type,
+        width=image.width,
+        height=image.height,
+        original_size=len(file_bytes),
+    )
+
+
+async def preprocess_image(
+    file_bytes: bytes,
+    content_type: str,
+    max_edge: int = MAX_IMAGE_EDGE,
+    quality: int = 85,
+) -> ProcessedImage:
+    """Run process_image in a worker thread, off the event loop."""
+    return await asyncio.to_thread(process_image, file_bytes, content_type, max_edge, quality)
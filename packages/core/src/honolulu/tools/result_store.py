@@ -0,0 +1,207 @@
+"""Out-of-band storage for oversized tool results."""
+
+import codecs
+import shutil
+import uuid
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any
+
+import aiofiles
+
+from honolulu.tools.base import Tool, ToolResult
+
+DEFAULT_PAGE_CHARS = 8000
+
+# Stored files remember the byte position of every CHECKPOINT_CHARS-th
+# character, so a page is read by seeking rather than reading the whole file
+CHECKPOINT_CHARS = 4096
+
+# Result store of the session whose tools are running, so one shared
+# read_result tool serves every session
+current_result_store: ContextVar["ResultStore | None"] = ContextVar(
+    "current_result_store", default=None
+)
+
+
+class ResultStore:
+    """Keeps oversized tool outputs out of the conversation history.
+
+    Outputs above ``threshold`` characters are stored under a handle, in
+    memory or (when ``directory`` is set) on disk. The history only keeps a
+    head/tail preview plus the handle, and the model pages through the full
+    output with the ``read_result`` tool.
+    """
+
+    def __init__(
+        self,
+        threshold: int = 16000,
+        preview_chars: int = 2000,
+        directory: str | Path | None = None,
+    ):
+        self.threshold = threshold
+        self.preview_chars = preview_chars
+        self._memory: dict[str, str] = {}
+        self._sizes: dict[str, int] = {}
+        self._checkpoints: dict[str, list[int]] = {}
+        # Each store gets its own subdirectory so clear() only removes its files
+        self._directory = Path(directory) / uuid.uuid4().hex if directory else None
+
+    def should_offload(self, text: str) -> bool:
+        """Check if a tool output is large enough to be stored out-of-band."""
+        return self.threshold > 0 and len(text) > self.threshold
+
+    async def put(self, text: str) -> str:
+        """Store a tool output and return its handle."""
+        handle = f"res_{uuid.uuid4().hex[:12]}"
+
+        if self._directory:
+            chunks = [
+                text[start : start + CHECKPOINT_CHARS].encode("utf-8")
+                for start in range(0, len(text), CHECKPOINT_CHARS)
+            ]
+            checkpoints = [0]
+            for chunk in chunks:
+                checkpoints.append(checkpoints[-1] + len(chunk))
+
+            self._directory.mkdir(parents=True, exist_ok=True)
+            async with aiofiles.open(self._path(handle), "wb") as f:
+                await f.write(b"".join(chunks))
+            self._checkpoints[handle] = checkpoints
+        else:
+            self._memory[handle] = text
+
+        self._sizes[handle] = len(text)
+        return handle
+
+    async def read(
+        self, handle: str, offset: int = 0, limit: int = DEFAULT_PAGE_CHARS
+    ) -> str | None:
+        """Read a character range of a stored output, or None if unknown."""
+        if handle not in self._sizes:
+            return None
+        if not self._directory:
+            return self._memory[handle][offset : offset + limit]
+        if offset >= self._sizes[handle]:
+            return ""
+
+        # Seek to the checkpoint before offset; a character is at most 4 bytes
+        index = offset // CHECKPOINT_CHARS
+        skip = offset - index * CHECKPOINT_CHARS
+        async with aiofiles.open(self._path(handle), "rb") as f:
+            await f.seek(self._checkpoints[handle][index])
+            data = await f.read(4 * (skip + limit))
+        # Incremental decoding holds back a character cut off at the end
+        text = codecs.getincrementaldecoder("utf-8")().decode(data)
+        return text[skip : skip + limit]
+
+    def size(self, handle: str) -> int | None:
+        """Get the length (in characters) of a stored output."""
+        return self._sizes.get(handle)
+
+    async def offload(self, text: str) -> str:
+        """Store a tool output and return the preview kept in history."""
+        handle = await self.put(text)
+        half = min(self.preview_chars, len(text) // 2) // 2
+        omitted = len(text) - 2 * half
+
+        return (
+            f"{text[:half]}\n"
+            f"... [{omitted} characters omitted] ...\n"
+            f"{text[-half:]}\n\n"
+            f'[Output truncated: {len(text)} characters stored as result "{handle}". '
+            f"Use the read_result tool with this handle and an offset to read more.]"
+        )
+
+    def clear(self) -> None:
+        """Remove all stored outputs."""
+        self._memory.clear()
+        self._sizes.clear()
+        self._checkpoints.clear()
+        if self._directory and self._directory.exists():
+            shutil.rmtree(self._directory, ignore_errors=True)
+
+    def _path(self, handle: str) -> Path:
+        return self._directory / f"{handle}.txt"
+
+
+class ReadResultTool(Tool):
+    """Page through a tool output held in a ResultStore.
+
+    Without a store of its own, the tool reads from the calling session's
+    store (``current_result_store``), so one instance can be registered in
+    a tool catalog shared by all sessions.
+    """
+
+    name = "read_result"
+    description = (
+        "Read part of a large tool output that was truncated in the conversation. "
+        "Pass the result handle from the truncation notice and a character offset."
+    )
+    parameters = {
+        "type": "object",
+        "properties": {
+            "handle": {
+                "type": "string",
+                "description": "The result handle, e.g. res_1a2b3c4d5e6f",
+            },
+            "offset": {
+                "type": "integer",
+                "description": "Character offset to start reading from (default: 0)",
+                "default": 0,
+            },
+            "limit": {
+                "type": "integer",
+                "description": (
+                    f"Maximum number of characters to read (default: {DEFAULT_PAGE_CHARS})"
+                ),
+                "default": DEFAULT_PAGE_CHARS,
+            },
+        },
+        "required": ["handle"],
+    }
+    requires_confirmation = False
+
+    def __init__(self, store: ResultStore | None = None):
+        self._store = store
+
+    async def execute(
+        self,
+        handle: str,
+        offset: int = 0,
+        limit: int = DEFAULT_PAGE_CHARS,
+        **kwargs: Any,
+    ) -> ToolResult:
+        store = self._store or current_result_store.get()
+        if store is None:
+            return ToolResult(
+                success=False,
+                output=None,
+                error="Result store is not enabled",
+            )
+
+        try:
+            offset = max(0, offset)
+            # Pages must stay small enough to not be offloaded again
+            limit = max(1, min(limit, store.threshold // 2 or limit))
+
+            content = await store.read(handle, offset, limit)
+            if content is None:
+                return ToolResult(
+                    success=False,
+                    output=None,
+                    error=f"Unknown result handle: {handle}",
+                )
+
+            total = store.size(handle) or 0
+            end = offset + len(content)
+            return ToolResult(
+                success=True,
+                output=f"[result {handle} chars {offset}–{end} of {total}]\n{content}",
+            )
+        except Exception as e:
+            return ToolResult(
+                success=False,
+                output=None,
+                error=str(e),
+            )
@@ -0,0 +1,132 @@
+"""Tests for the agent loop against the offline fake provider."""
+
+import asyncio
+from typing import Any
+
+import pytest
+
+from honolulu.agent import Agent
+from honolulu.models.fake import FakeProvider
+from honolulu.models.ratelimit import current_session
+from honolulu.tools import ToolManager
+from honolulu.tools.base import Tool, ToolResult
+
+SCRIPT = [
+    {
+        "tool_calls": [
+            {"id": "call_1", "name": "slow", "arguments": {"n": 1}},
+            {"id": "call_2", "name": "slow", "arguments": {"n": 2}},
+        ]
+    },
+    {"content": "all done"},
+]
+
+
+class SlowTool(Tool):
+    """Sleeps until cancelled, recording what happened."""
+
+    name = "slow"
+    description = "Wait for a long time"
+    parameters = {"type": "object", "properties": {"n": {"type": "integer"}}}
+
+    def __init__(self, delay: float = 10.0):
+        self.delay = delay
+        self.started = asyncio.Event()
+        self.cancelled = 0
+
+    async def execute(self, **params: Any) -> ToolResult:
+        self.started.set()
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return ToolResult(success=True, output=f"slept {params['n']}")
+
+
+def make_agent(tool: SlowTool, **kwargs: Any) -> Agent:
+    tools = ToolManager()
+    tools.register(tool)
+    return Agent(FakeProvider(script=SCRIPT), tools, **kwargs)
+
+
+async def consume(agent: Agent, message: str) -> list:
+    return [event async for event in agent.run_streaming(message)]
+
+
+def assert_calls_closed(agent: Agent) -> None:
+    """Every tool_use in the API history is followed by its tool_result."""
+    api = agent._convert_messages_for_api()
+    for index, message in enumerate(api):
+        if message["role"] != "assistant" or not isinstance(message["content"], list):
+            continue
+        calls = {b["id"] for b in message["content"] if b["type"] == "tool_use"}
+        if calls:
+            results = api[index + 1]["content"]
+            assert {b["tool_use_id"] for b in results if b["type"] == "tool_result"} == calls
+
+
+async def test_run_completes_tool_round_trip():
+    tool = SlowTool(delay=0)
+    agent = make_agent(tool)
+
+    events = await consume(agent, "go")
+
+    assert [e.type for e in events if e.type in ("tool_result", "done")] == [
+        "tool_result",
+        "tool_result",
+        "done",
+    ]
+    assert events[-1].content == "all done"
+    assert_calls_closed(agent)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"parallel_tools": True}, {"parallel_tools": True, "pipeline_tools": True}],
+)
+async def test_cancel_mid_tool_closes_every_call(options):
+    tool = SlowTool()
+    agent = make_agent(tool, **options)
+
+    run = asyncio.create_task(consume(agent, "go"))
+    await asyncio.wait_for(tool.started.wait(), 1)
+    run.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await run
+
+    assert tool.cancelled >= 1
+    placeholders = [m for m in agent.messages if m["role"] == "tool"]
+    assert [m["tool_call_id"] for m in placeholders] == ["call_1", "call_2"]
+    assert all("cancelled" in m["content"] for m in placeholders)
+    assert_calls_closed(agent)
+
+    # The session stays usable after the cancelled turn
+    tool.delay = 0
+    events = await consume(agent, "again")
+    assert events[-1].type == "done"
+    assert_calls_closed(agent)
+
+
+class SessionRecordingProvider(FakeProvider):
+    """Fake provider noting the session of each request."""
+
+    def __init__(self):
+        super().__init__()
+        self.sessions = []
+
+    async def stream(self, *args, **kwargs):
+        self.sessions.append(current_session.get())
+        async for chunk in super().stream(*args, **kwargs):
+            yield chunk
+
+
+async def test_run_binds_the_agent_session():
+    provider = SessionRecordingProvider()
+    agents = [Agent(provider, ToolManager(), session_id=name) for name in ("a", "b")]
+
+    for agent in agents:
+        await consume(agent, "hi")
+
+    assert provider.sessions == ["a", "b"]
+    assert Agent(provider, ToolManager()).session_id  # Generated when not given
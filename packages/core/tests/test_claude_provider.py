@@ -0,0 +1,51 @@
+"""Tests for the Anthropic provider against a stub SDK client."""
+
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("anthropic")
+
+from honolulu.models.claude import ClaudeProvider  # noqa: E402
+
+MESSAGE = SimpleNamespace(
+    content=[SimpleNamespace(type="text", text="hi")],
+    stop_reason="end_turn",
+    usage=SimpleNamespace(input_tokens=3, output_tokens=1),
+)
+
+
+class RawResponse:
+    """Raw response whose parse() is synchronous or a coroutine, as across SDK versions."""
+
+    def __init__(self, async_parse: bool):
+        self.async_parse = async_parse
+        self.headers = {"anthropic-ratelimit-requests-limit": "50"}
+
+    def parse(self):
+        if not self.async_parse:
+            return MESSAGE
+
+        async def parse():
+            return MESSAGE
+
+        return parse()
+
+
+def stub_client(async_parse: bool) -> SimpleNamespace:
+    async def create(**kwargs):
+        return RawResponse(async_parse)
+
+    raw = SimpleNamespace(create=create)
+    return SimpleNamespace(messages=SimpleNamespace(with_raw_response=raw))
+
+
+@pytest.mark.parametrize("async_parse", [False, True])
+async def test_call_parses_raw_response_of_any_sdk_version(async_parse):
+    provider = ClaudeProvider(client=stub_client(async_parse))
+
+    response = await provider.call([{"role": "user", "content": "hello"}])
+
+    assert response.content == "hi"
+    assert response.usage["input_tokens"] == 3
+    assert response.rate_limits == {"anthropic-ratelimit-requests-limit": "50"}
@@ -0,0 +1,117 @@
+"""Tests for the token-budgeted context window."""
+
+import copy
+
+from honolulu.context import IMAGE_PLACEHOLDER, OMITTED_NOTE, ContextWindow
+from honolulu.tokens import estimate_request_tokens
+
+
+def make_turn(index: int, output_chars: int = 2000) -> list[dict]:
+    """One user turn: a question, a tool call, its result and an answer."""
+    call_id = f"call_{index}"
+    return [
+        {"role": "user", "content": f"question {index}"},
+        {
+            "role": "assistant",
+            "content": [
+                {"type": "tool_use", "id": call_id, "name": "file_read", "input": {"path": "a"}}
+            ],
+        },
+        {
+            "role": "user",
+            "content": [
+                {"type": "tool_result", "tool_use_id": call_id, "content": "x" * output_chars}
+            ],
+        },
+        {"role": "assistant", "content": [{"type": "text", "text": f"answer {index}"}]},
+    ]
+
+
+def make_history(turns: int, output_chars: int = 2000) -> list[dict]:
+    return [m for i in range(turns) for m in make_turn(i, output_chars)]
+
+
+def assert_tool_pairs_intact(window: list[dict]) -> None:
+    """Every tool_result follows the assistant message that made the call."""
+    for index, message in enumerate(window):
+        content = message["content"]
+        if message["role"] != "user" or not isinstance(content, list):
+            continue
+        results = [b["tool_use_id"] for b in content if b.get("type") == "tool_result"]
+        if not results:
+            continue
+        assert index > 0
+        previous = window[index - 1]
+        calls = {b["id"] for b in previous["content"] if b.get("type") == "tool_use"}
+        assert set(results) <= calls
+
+
+def test_small_history_is_returned_unchanged():
+    window = ContextWindow(context_tokens=100_000, max_output_tokens=1000)
+    messages = make_history(3)
+
+    assert window.fit(messages) == messages
+
+
+def test_old_tool_outputs_are_elided_first():
+    window = ContextWindow(context_tokens=6000, max_output_tokens=1000, keep_recent_turns=2)
+    messages = make_history(30)
+
+    fitted = window.fit(messages)
+
+    assert len(fitted) == len(messages)
+    assert window.last_estimate <= 6000 - 1000
+    assert "elided" in fitted[2]["content"][0]["content"]
+    assert fitted[-2] is messages[-2]  # Recent turns are kept verbatim
+
+
+def test_fit_drops_whole_turns_when_eliding_is_not_enough():
+    window = ContextWindow(
+        context_tokens=6000, max_output_tokens=1000, keep_recent_turns=2, elide_min_chars=10**6
+    )
+    messages = make_history(30)
+    original = copy.deepcopy(messages)
+
+    fitted = window.fit(messages, system="system prompt")
+
+    assert messages == original  # Input is never modified
+    assert window.last_estimate <= 6000 - 1000
+    assert window.last_estimate == estimate_request_tokens(fitted, None, "system prompt")
+    assert_tool_pairs_intact(fitted)
+    # The newest turn is always kept, and the window starts at a turn
+    assert fitted[-4:][0]["content"] == "question 29"
+    assert fitted[0]["role"] == "user"
+    assert fitted[0]["content"][0]["text"] == OMITTED_NOTE
+
+
+def test_window_start_only_moves_forward():
+    window = ContextWindow(context_tokens=8000, max_output_tokens=1000, elide_min_chars=10**6)
+    messages = make_history(10)
+    starts = []
+
+    for turn in range(10, 40):
+        messages = messages + make_turn(turn)
+        fitted = window.fit(messages)
+        assert_tool_pairs_intact(fitted)
+        starts.append(window._drop_before)
+
+    assert starts == sorted(starts)
+    # The window is trimmed to a low watermark, so its start is stable for
+    # several turns instead of moving on every call
+    assert len(set(starts)) < len(starts)
+
+
+def test_old_images_are_replaced_by_placeholder():
+    window = ContextWindow(context_tokens=200_000, keep_image_turns=1)
+    image = {"type": "image", "source": {"type": "base64", "media_type": "image/png", "data": "A"}}
+    messages = [
+        {"role": "user", "content": [image, {"type": "text", "text": "first"}]},
+        {"role": "assistant", "content": [{"type": "text", "text": "ok"}]},
+        {"role": "user", "content": [image, {"type": "text", "text": "second"}]},
+    ]
+
+    fitted = window.fit(messages)
+
+    assert fitted[0]["content"][0] == {"type": "text", "text": IMAGE_PLACEHOLDER}
+    assert fitted[2]["content"][0] == image
+    assert messages[0]["content"][0] == image
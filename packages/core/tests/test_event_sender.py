@@ -0,0 +1,50 @@
+"""Tests for coalescing, bounded event delivery to WebSocket clients."""
+
+import asyncio
+
+from honolulu.server.stream import EventSender
+
+
+class StalledWebSocket:
+    """WebSocket whose client reads only while ``reading`` is set."""
+
+    def __init__(self):
+        self.reading = asyncio.Event()
+        self.sent: list[dict] = []
+
+    async def send_json(self, message: dict) -> None:
+        await self.reading.wait()
+        self.sent.append(message)
+
+
+async def test_deltas_are_merged_while_the_client_is_behind():
+    websocket = StalledWebSocket()
+    sender = EventSender(websocket, max_pending=2)
+    sender.start()
+
+    for text in ("a", "b", "c"):
+        await asyncio.wait_for(sender.put({"type": "text_delta", "content": text}), 1)
+    websocket.reading.set()
+    await sender.flush()
+
+    assert websocket.sent == [{"type": "text_delta", "content": "abc"}]
+    await sender.close()
+
+
+async def test_put_waits_while_the_queue_is_full():
+    websocket = StalledWebSocket()
+    sender = EventSender(websocket, max_pending=2)
+    sender.start()
+
+    await sender.put({"type": "tool_call", "n": 0})
+    await asyncio.sleep(0)  # The writer takes it and stalls
+    await sender.put({"type": "tool_call", "n": 1})
+    blocked = asyncio.create_task(sender.put({"type": "tool_call", "n": 2}))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    websocket.reading.set()
+    await asyncio.wait_for(blocked, 1)
+    await sender.flush()
+    assert [m["n"] for m in websocket.sent] == [0, 1, 2]
+    await sender.close()
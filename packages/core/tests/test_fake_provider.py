@@ -0,0 +1,76 @@
+"""Tests for the offline fake provider."""
+
+import asyncio
+
+import pytest
+
+from honolulu.models.fake import FakeProvider, FakeProviderError, load_script
+from honolulu.models.ratelimit import current_session
+
+SCRIPT = [{"content": "one"}, {"content": "two"}, {"content": "three"}]
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+async def replay(provider: FakeProvider, session: str, count: int) -> list[str]:
+    async def run():
+        current_session.set(session)
+        replies = []
+        for _ in range(count):
+            replies.append((await provider.call(MESSAGES)).content)
+            await asyncio.sleep(0)  # Let the other sessions interleave
+        return replies
+
+    return await asyncio.create_task(run())
+
+
+async def test_sessions_replay_the_script_independently():
+    provider = FakeProvider(script=SCRIPT)
+
+    replies = await asyncio.gather(*(replay(provider, s, 4) for s in ("a", "b", "c")))
+
+    assert replies == [["one", "two", "three", "one"]] * 3
+    assert provider.to_dict()["script_positions"] == {"a": 1, "b": 1, "c": 1}
+
+
+async def test_probe_does_not_advance_the_script():
+    provider = FakeProvider(script=SCRIPT)
+
+    await provider.probe()
+
+    assert (await provider.call(MESSAGES)).content == "one"
+    assert provider.probes == 1
+
+
+async def test_probe_fails_while_errors_are_injected():
+    provider = FakeProvider(error_rate=1.0, error_status=503)
+
+    with pytest.raises(FakeProviderError) as error:
+        await provider.probe()
+    assert error.value.status_code == 503
+
+
+async def test_exhausted_script_without_loop_fails():
+    provider = FakeProvider(script=SCRIPT[:1], loop=False)
+
+    await provider.call(MESSAGES)
+    with pytest.raises(FakeProviderError):
+        await provider.call(MESSAGES)
+
+
+async def test_stream_replays_text_and_tool_calls():
+    script = [{"content": "hello world", "tool_calls": [{"name": "t", "arguments": {"a": 1}}]}]
+    provider = FakeProvider(script=script, chunk_size=4)
+
+    chunks = [chunk async for chunk in provider.stream(MESSAGES)]
+
+    assert "".join(c.content for c in chunks if c.type == "text") == "hello world"
+    ends = [c.tool_call for c in chunks if c.type == "tool_use_end"]
+    assert ends[0].arguments == {"a": 1}
+    assert chunks[-1].type == "usage"
+
+
+def test_load_script_from_yaml(tmp_path):
+    path = tmp_path / "script.yaml"
+    path.write_text("responses:\n  - content: hi\n  - error: 429\n")
+
+    assert load_script(path) == [{"content": "hi"}, {"error": 429}]
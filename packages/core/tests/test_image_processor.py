@@ -0,0 +1,42 @@
+"""Tests for upload image preprocessing."""
+
+import io
+
+import pytest
+
+pytest.importorskip("PIL")
+
+from PIL import Image  # noqa: E402
+
+from honolulu.tools.image_processor import EXIF_ORIENTATION, process_image  # noqa: E402
+
+
+def encode(size: tuple[int, int], format: str, orientation: int | None = None) -> bytes:
+    image = Image.new("RGB", size, "red")
+    exif = Image.Exif()
+    if orientation is not None:
+        exif[EXIF_ORIENTATION] = orientation
+    output = io.BytesIO()
+    image.save(output, format=format, exif=exif)
+    return output.getvalue()
+
+
+def test_small_jpeg_is_kept_with_its_displayed_size():
+    data = encode((200, 100), "JPEG", orientation=6)  # Rotated 90 degrees
+
+    processed = process_image(data, "image/jpeg")
+
+    assert processed.data == data
+    assert (processed.width, processed.height) == (100, 200)
+
+
+def test_large_image_is_rotated_and_downsized():
+    data = encode((3000, 1000), "PNG", orientation=8)
+
+    processed = process_image(data, "image/png")
+
+    assert processed.content_type == "image/jpeg"
+    assert processed.height == 1568
+    assert processed.width < processed.height
+    with Image.open(io.BytesIO(processed.data)) as image:
+        assert image.size == (processed.width, processed.height)
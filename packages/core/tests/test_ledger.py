@@ -0,0 +1,108 @@
+"""Tests for the usage and cost ledger and what feeds it."""
+
+import asyncio
+
+from honolulu.agent import Agent
+from honolulu.models.cache import CachedProvider
+from honolulu.models.fake import FakeProvider
+from honolulu.models.ledger import MeteredProvider, UsageLedger
+from honolulu.models.router import ModelRouter
+from honolulu.tools import ToolManager
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+USAGE = {"input_tokens": 1000, "output_tokens": 100}
+
+
+def test_cost_uses_prices_and_cache_multipliers():
+    ledger = UsageLedger()
+    ledger.set_price("p", input_per_1k=1.0, output_per_1k=2.0)
+
+    entry = ledger.record(
+        "p",
+        {**USAGE, "cache_read_input_tokens": 1000, "cache_creation_input_tokens": 1000},
+        session="s",
+        turn=1,
+    )
+
+    assert entry.cost == (1000 + 100 + 1250 + 200) / 1000
+
+
+def test_totals_per_provider_session_and_turn():
+    ledger = UsageLedger()
+    ledger.record("a", USAGE, session="s1", turn=1)
+    ledger.record("b", USAGE, session="s1", turn=2)
+    ledger.record("a", USAGE, session="s2", turn=1)
+
+    assert ledger.total.requests == 3
+    assert ledger.summary(provider="a").requests == 2
+    assert ledger.summary(session="s1").input_tokens == 2000
+    assert ledger.summary(session="s1", provider="b").requests == 1
+    assert set(ledger.turns("s1")) == {1, 2}
+    assert [e.provider for e in ledger.entries("s1")] == ["a", "b"]
+
+
+def test_expected_cost_follows_observed_traffic():
+    ledger = UsageLedger()
+    ledger.set_price("cheap_output", input_per_1k=2.0, output_per_1k=1.0)
+    ledger.set_price("cheap_input", input_per_1k=1.0, output_per_1k=2.0)
+    ledger.record("cheap_input", {"input_tokens": 10, "output_tokens": 1000})
+
+    # Output-heavy traffic favors cheap output tokens
+    assert ledger.expected_cost("cheap_output") < ledger.expected_cost("cheap_input")
+
+
+async def test_agent_requests_are_recorded_by_the_router():
+    ledger = UsageLedger()
+    router = ModelRouter(health_probe=False, ledger=ledger)
+    router.register("fake", FakeProvider(script=[{"content": "hi", "usage": USAGE}]))
+    agent = Agent(router, ToolManager(), session_id="s")
+
+    for message in ("one", "two"):
+        async for _ in agent.run_streaming(message):
+            pass
+
+    assert ledger.summary(session="s").requests == 2
+    assert set(ledger.turns("s")) == {1, 2}
+    assert ledger.entries("s")[0].latency is not None
+
+
+async def test_requests_outside_an_agent_are_recorded():
+    ledger = UsageLedger()
+    router = ModelRouter(health_probe=False, ledger=ledger)
+    router.register("fake", FakeProvider(script=[{"content": "hi", "usage": USAGE}]))
+
+    # e.g. a sub-agent calling the model directly
+    await router.call(MESSAGES)
+    _ = [chunk async for chunk in router.stream(MESSAGES)]
+
+    assert ledger.summary(provider="fake").requests == 2
+
+
+async def test_health_probes_are_recorded_without_a_session():
+    ledger = UsageLedger()
+    primary = FakeProvider(script=[{"error": 500}])
+    router = ModelRouter(failure_threshold=1, recovery_timeout=0.05, ledger=ledger)
+    router.register("primary", primary)
+    router.register("backup", FakeProvider(script=[{"content": "ok", "usage": USAGE}]))
+
+    await router.call(MESSAGES)
+    await asyncio.sleep(0.15)
+    await router.close()
+
+    probes = [e for e in ledger.entries() if e.provider == "primary"]
+    assert len(probes) == primary.probes == 1
+    assert probes[0].session == ""
+    assert probes[0].input_tokens > 0
+
+
+async def test_metered_provider_skips_cache_hits():
+    ledger = UsageLedger()
+    provider = MeteredProvider(CachedProvider(FakeProvider(script=[{"content": "hi"}])), ledger)
+
+    await provider.call(MESSAGES)
+    await provider.call(MESSAGES)
+    _ = [chunk async for chunk in provider.stream(MESSAGES)]
+
+    # One call and one stream reached the provider, the repeated call was a hit
+    assert ledger.summary(provider="fake").requests == 2
+    assert provider.model == "fake"
@@ -0,0 +1,104 @@
+"""Tests for Anthropic-to-OpenAI request conversion."""
+
+import gc
+
+import pytest
+
+from honolulu.models.base import APIMessage
+from honolulu.tools.base import ToolDefinitions
+
+pytest.importorskip("openai")
+
+from honolulu.models.openai_provider import OpenAIProvider  # noqa: E402
+
+
+@pytest.fixture
+def provider() -> OpenAIProvider:
+    return OpenAIProvider(api_key="test")
+
+
+def test_converts_tool_exchange_and_images(provider):
+    messages = [
+        APIMessage(role="user", content="hi"),
+        APIMessage(
+            role="assistant",
+            content=[
+                {"type": "text", "text": "let me look"},
+                {"type": "tool_use", "id": "c1", "name": "file_read", "input": {"path": "a"}},
+            ],
+        ),
+        APIMessage(
+            role="user",
+            content=[
+                {"type": "tool_result", "tool_use_id": "c1", "content": "data"},
+                {"type": "text", "text": "and this"},
+                {
+                    "type": "image",
+                    "source": {"type": "base64", "media_type": "image/png", "data": "QUJD"},
+                },
+            ],
+        ),
+    ]
+
+    converted = provider._convert_messages(messages, "system prompt")
+
+    assert [m["role"] for m in converted] == ["system", "user", "assistant", "tool", "user"]
+    call = converted[2]["tool_calls"][0]
+    assert call["id"] == "c1"
+    assert call["function"] == {"name": "file_read", "arguments": '{"path": "a"}'}
+    assert converted[3] == {"role": "tool", "tool_call_id": "c1", "content": "data"}
+    assert converted[4]["content"][1]["image_url"]["url"] == "data:image/png;base64,QUJD"
+
+
+def test_tool_only_assistant_message_has_null_content(provider):
+    message = APIMessage(
+        role="assistant", content=[{"type": "tool_use", "id": "c", "name": "t", "input": {}}]
+    )
+    assert provider._convert_messages([message], None)[0]["content"] is None
+
+
+def test_conversion_cached_while_message_lives(provider):
+    first = APIMessage(role="user", content="hi")
+    plain = {"role": "user", "content": "not cached"}
+
+    converted = provider._convert_messages([first, plain], None)
+    again = provider._convert_messages([first, plain], None)
+
+    assert again[0] is converted[0]
+    assert again[1] is not converted[1]
+    assert len(provider._message_cache) == 1
+
+    del first
+    gc.collect()
+    assert len(provider._message_cache) == 0
+
+
+def test_image_data_url_shared_and_released(provider):
+    data = "QUJD" * 1000
+
+    def image_message() -> APIMessage:
+        source = {"type": "base64", "media_type": "image/png", "data": data}
+        return APIMessage(role="user", content=[{"type": "image", "source": source}])
+
+    first, second = image_message(), image_message()
+    converted = provider._convert_messages([first, second], None)
+
+    urls = [m["content"][0]["image_url"]["url"] for m in converted]
+    assert urls[0] is urls[1]
+    assert len(provider._data_urls) == 1
+
+    del first, second, converted, urls
+    gc.collect()
+    assert len(provider._data_urls) == 0
+
+
+def test_tool_conversion_cached_per_definitions_list(provider):
+    tools = ToolDefinitions([{"name": "t", "description": "d", "input_schema": {}}])
+
+    converted = provider._convert_tools(tools)
+
+    assert provider._convert_tools(tools) is converted
+    assert converted[0]["function"]["name"] == "t"
+    del tools
+    gc.collect()
+    assert len(provider._tools_cache) == 0
@@ -0,0 +1,51 @@
+"""Tests for client-side rate limiting."""
+
+import asyncio
+
+from honolulu.models.ratelimit import RateLimiter, RateLimitInfo
+
+
+async def test_queued_requests_are_admitted_round_robin_across_sessions():
+    limiter = RateLimiter()
+    limiter.backoff(RateLimitInfo(retry_after=0.05))
+    admitted = []
+
+    async def request(session: str, index: int) -> None:
+        await limiter.acquire(session=session)
+        admitted.append(f"{session}{index}")
+
+    await asyncio.gather(
+        *(request("a", i) for i in range(3)),
+        *(request("b", i) for i in range(2)),
+    )
+
+    assert admitted == ["a0", "b0", "a1", "b1", "a2"]
+    assert limiter.queued == 5
+
+
+async def test_request_budget_is_enforced():
+    limiter = RateLimiter(requests_per_minute=2)
+    await limiter.acquire()
+    await limiter.acquire()
+
+    third = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0.05)
+    assert not third.done()
+
+    third.cancel()
+    await asyncio.gather(third, return_exceptions=True)
+    assert limiter.to_dict()["waiting"] == 0
+
+
+def test_headers_update_limits():
+    limiter = RateLimiter()
+    limiter.update(
+        {
+            "x-ratelimit-limit-requests": "60",
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-reset-requests": "2s",
+        }
+    )
+
+    assert limiter.to_dict()["requests_per_minute"] == 60
+    assert limiter.blocked
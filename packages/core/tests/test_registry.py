@@ -0,0 +1,68 @@
+"""Tests for the shared provider registry."""
+
+import gc
+
+import pytest
+
+from honolulu.models.fake import FakeProvider
+from honolulu.models.registry import ProviderRegistry
+
+
+async def test_fake_provider_with_inline_script():
+    registry = ProviderRegistry()
+    script = [{"content": "hi"}, {"tool_calls": [{"name": "file_read", "arguments": {}}]}]
+
+    provider = registry.get("fake", model="fake", script=script)
+
+    assert isinstance(provider, FakeProvider)
+    assert (await provider.call([{"role": "user", "content": "q"}])).content == "hi"
+    await registry.close()
+
+
+async def test_providers_shared_by_equal_options():
+    registry = ProviderRegistry()
+
+    first = registry.get("fake", model="fake", script=[{"content": "a"}], ttft=0.1)
+    same = registry.get("fake", model="fake", ttft=0.1, script=[{"content": "a"}])
+    other = registry.get("fake", model="fake", script=[{"content": "b"}], ttft=0.1)
+
+    assert first is same
+    assert first is not other
+    assert len(registry) == 2
+    await registry.close()
+
+
+async def test_clients_are_pooled_per_retry_policy():
+    pytest.importorskip("openai")
+    registry = ProviderRegistry()
+
+    routed = registry.get("openai", model="a", api_key="k", max_retries=0)
+    routed_other_model = registry.get("openai", model="b", api_key="k", max_retries=0)
+    standalone = registry.get("openai", model="a", api_key="k")
+
+    assert routed.client is routed_other_model.client
+    assert routed.client.max_retries == 0
+    assert standalone.client is not routed.client
+    assert standalone.client.max_retries > 0
+    await registry.close()
+
+
+async def test_prune_closes_clients_once_unused():
+    pytest.importorskip("openai")
+    registry = ProviderRegistry()
+    kept = registry.get("openai", model="a", api_key="k")
+    dropped = registry.get("openai", model="b", api_key="old")
+    client = dropped.client
+
+    await registry.prune([kept])
+
+    assert len(registry) == 1
+    assert not client.is_closed()  # Sessions from before the reload may still use it
+
+    del dropped
+    gc.collect()
+    await registry.prune()
+
+    assert client.is_closed()
+    assert not kept.client.is_closed()
+    await registry.close()
@@ -0,0 +1,132 @@
+"""Tests for the exact-match response cache and its single-flight requests."""
+
+import asyncio
+import time
+
+import pytest
+
+from honolulu.models.cache import (
+    CachedProvider,
+    DiskCacheBackend,
+    MemoryCacheBackend,
+    ResponseCache,
+)
+from honolulu.models.fake import FakeProvider, FakeProviderError
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+async def test_identical_calls_coalesce_into_one_request():
+    provider = FakeProvider(ttft=0.05)
+    cached = CachedProvider(provider)
+
+    responses = await asyncio.gather(*(cached.call(MESSAGES) for _ in range(5)))
+
+    assert provider.requests == 1
+    assert cached.cache.coalesced == 4
+    assert len({r.content for r in responses}) == 1
+    # Only the caller that started the request accounts for it
+    fresh = [r for r in responses if not r.cached]
+    assert len(fresh) == 1
+    assert fresh[0].usage["output_tokens"] > 0
+    assert all(r.usage["output_tokens"] == 0 for r in responses if r.cached)
+
+
+async def test_hit_replays_with_zero_usage():
+    provider = FakeProvider()
+    cached = CachedProvider(provider)
+
+    first = await cached.call(MESSAGES)
+    second = await cached.call(MESSAGES)
+
+    assert provider.requests == 1
+    assert not first.cached
+    assert second.cached
+    assert second.content == first.content
+    assert set(second.usage.values()) == {0}
+    assert cached.cache.to_dict()["hits"] == 1
+
+
+async def test_identical_streams_share_one_upstream():
+    provider = FakeProvider(ttft=0.02, chunk_delay=0.005, chunk_size=4)
+    cached = CachedProvider(provider)
+
+    async def collect():
+        return [chunk async for chunk in cached.stream(MESSAGES)]
+
+    streams = await asyncio.gather(*(collect() for _ in range(3)))
+
+    assert provider.requests == 1
+    texts = {"".join(c.content for c in s if c.type == "text") for s in streams}
+    assert len(texts) == 1
+    leaders = [s for s in streams if not s[-1].cached]
+    assert len(leaders) == 1
+
+    replay = await collect()
+    assert provider.requests == 1
+    assert all(chunk.cached for chunk in replay)
+
+
+async def test_abandoned_stream_cancels_upstream():
+    provider = FakeProvider(chunk_delay=0.05, chunk_size=1)
+    cached = CachedProvider(provider)
+
+    stream = cached.stream(MESSAGES)
+    await stream.__anext__()
+    await stream.aclose()
+    await asyncio.sleep(0.01)
+
+    assert not cached.cache._streams
+    assert len(cached.cache.backend) == 0
+
+
+async def test_failed_request_is_not_cached():
+    provider = FakeProvider(script=[{"error": 500}, {"content": "ok"}])
+    cached = CachedProvider(provider)
+
+    with pytest.raises(FakeProviderError):
+        await cached.call(MESSAGES)
+    assert (await cached.call(MESSAGES)).content == "ok"
+    assert provider.requests == 2
+
+
+async def test_identity_separates_endpoints():
+    cache = ResponseCache()
+    local = CachedProvider(FakeProvider(script=[{"content": "local"}]), cache, identity="a")
+    remote = CachedProvider(FakeProvider(script=[{"content": "remote"}]), cache, identity="b")
+
+    assert (await local.call(MESSAGES)).content == "local"
+    assert (await remote.call(MESSAGES)).content == "remote"
+
+
+def test_default_identity_includes_base_url():
+    pytest.importorskip("openai")
+    from honolulu.models.openai_provider import OpenAIProvider
+
+    cache = ResponseCache()
+    local = CachedProvider(OpenAIProvider("k", "m", base_url="http://localhost:8000/v1"), cache)
+    remote = CachedProvider(OpenAIProvider("k", "m"), cache)
+
+    assert local._identity != remote._identity
+
+
+async def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryCacheBackend(max_entries=2)
+    await backend.put("a", 1, None)
+    await backend.put("b", 2, None)
+    await backend.get("a")
+    await backend.put("c", 3, None)
+
+    assert await backend.get("b") is None
+    assert await backend.get("a") == 1
+    assert await backend.get("c") == 3
+
+
+async def test_disk_backend_expiry_and_restart(tmp_path):
+    backend = DiskCacheBackend(tmp_path, max_entries=10)
+    await backend.put("old", {"x": 1}, time.time() - 1)
+    await backend.put("new", {"x": 2}, None)
+
+    assert await backend.get("old") is None
+    reopened = DiskCacheBackend(tmp_path)
+    assert await reopened.get("new") == {"x": 2}
@@ -0,0 +1,44 @@
+"""Tests for out-of-band storage of oversized tool results."""
+
+from honolulu.tools.result_store import CHECKPOINT_CHARS, ReadResultTool, ResultStore
+
+
+async def test_offload_keeps_preview_and_handle():
+    store = ResultStore(threshold=100, preview_chars=20)
+    text = "x" * 500
+
+    assert store.should_offload(text)
+    preview = await store.offload(text)
+
+    assert len(preview) < len(text)
+    assert "500 characters stored" in preview
+
+
+async def test_read_result_returns_plain_text_page(tmp_path):
+    store = ResultStore(threshold=100, directory=tmp_path)
+    text = "line one\nline 'two'\n" + "y" * 200
+    handle = await store.put(text)
+
+    result = await ReadResultTool(store).execute(handle=handle, offset=0, limit=20)
+
+    assert result.success
+    assert result.output == f"[result {handle} chars 0–20 of {len(text)}]\n{text[:20]}"
+    store.clear()
+
+
+async def test_pages_of_stored_file_match_the_text(tmp_path):
+    store = ResultStore(directory=tmp_path)
+    text = "".join(f"{i}:é中😀\n" for i in range(3 * CHECKPOINT_CHARS // 8))
+    handle = await store.put(text)
+
+    for offset in (0, 5, CHECKPOINT_CHARS - 3, 2 * CHECKPOINT_CHARS + 7, len(text) - 4):
+        assert await store.read(handle, offset, 500) == text[offset : offset + 500]
+    assert await store.read(handle, len(text) + 10) == ""
+    store.clear()
+
+
+async def test_read_result_unknown_handle():
+    result = await ReadResultTool(ResultStore()).execute(handle="res_missing")
+
+    assert not result.success
+    assert "res_missing" in result.error
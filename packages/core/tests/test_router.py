@@ -0,0 +1,330 @@
+"""Tests for routing, fallback and hedging across fake providers."""
+
+import asyncio
+
+import pytest
+
+from honolulu.models.fake import FakeProvider, FakeProviderError
+from honolulu.models.health import CircuitState
+from honolulu.models.latency import LatencyTracker
+from honolulu.models.ledger import UsageLedger
+from honolulu.models.ratelimit import current_session
+from honolulu.models.router import ModelRouter, RoutingStrategy
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+def make_router(primary: FakeProvider, backup: FakeProvider, **kwargs) -> ModelRouter:
+    router = ModelRouter(health_probe=False, **kwargs)
+    router.register("primary", primary, priority=2)
+    router.register("backup", backup, priority=1)
+    return router
+
+
+async def call_in_session(router: ModelRouter, session: str | None, **request):
+    """Route one call as a request of session, in its own context."""
+
+    async def call():
+        current_session.set(session)
+        return await router.call(**{"messages": MESSAGES, **request})
+
+    return await asyncio.create_task(call())
+
+
+async def test_slow_primary_is_hedged_to_backup():
+    primary = FakeProvider(script=[{"content": "slow"}], ttft=1.0)
+    backup = FakeProvider(script=[{"content": "fast"}])
+    router = make_router(primary, backup, hedge_delay=0.05)
+
+    response = await router.call(MESSAGES)
+
+    assert response.content == "fast"
+    assert response.provider == "backup"
+    hedging = router.stats()["hedging"]
+    assert hedging["backup"]["wins"] == 1
+    assert hedging["primary"]["races"] == 1
+
+
+async def test_fast_primary_is_not_hedged():
+    primary = FakeProvider(script=[{"content": "quick"}])
+    backup = FakeProvider()
+    router = make_router(primary, backup, hedge_delay=0.5)
+
+    response = await router.call(MESSAGES)
+
+    assert response.provider == "primary"
+    assert backup.requests == 0
+    # The backup's circuit was claimed for the race and given back
+    assert router._health.acquire("backup")
+
+
+async def test_hedged_stream_keeps_first_stream_to_answer():
+    primary = FakeProvider(script=[{"content": "slow"}], ttft=1.0)
+    backup = FakeProvider(script=[{"content": "fast answer"}], chunk_size=4)
+    router = make_router(primary, backup, hedge_delay=0.05)
+
+    chunks = [chunk async for chunk in router.stream(MESSAGES)]
+
+    assert "".join(c.content for c in chunks if c.type == "text") == "fast answer"
+    assert router.stats()["hedging"]["backup"]["wins"] == 1
+
+
+async def test_failed_provider_falls_back_to_next():
+    primary = FakeProvider(script=[{"error": 500}])
+    backup = FakeProvider(script=[{"content": "from backup"}])
+    router = make_router(primary, backup)
+
+    response = await router.call(MESSAGES)
+
+    assert response.content == "from backup"
+    assert response.provider == "backup"
+    assert primary.requests == 1
+
+
+async def test_all_providers_failing_raises():
+    router = make_router(FakeProvider(error_rate=1.0), FakeProvider(error_rate=1.0))
+
+    with pytest.raises(RuntimeError, match="All providers failed"):
+        await router.call(MESSAGES)
+
+
+async def test_open_circuit_skips_provider_until_recovered():
+    script = [{"error": 500}, {"error": 500}, {"content": "recovered"}]
+    primary = FakeProvider(script=script)
+    backup = FakeProvider(script=[{"content": "from backup"}])
+    router = make_router(primary, backup, failure_threshold=2, recovery_timeout=0.1)
+
+    for _ in range(3):
+        assert (await router.call(MESSAGES)).provider == "backup"
+
+    # Opened after two failures: the third call never reached primary
+    assert primary.requests == 2
+    assert router._health.breaker("primary").state == CircuitState.OPEN
+
+    await asyncio.sleep(0.15)
+    response = await router.call(MESSAGES)
+    assert response.content == "recovered"
+    assert router._health.breaker("primary").state == CircuitState.CLOSED
+
+
+async def test_open_circuit_without_fallback_fails_the_request():
+    primary = FakeProvider(script=[{"error": 500}])
+    backup = FakeProvider()
+    router = make_router(primary, backup, fallback_enabled=False, failure_threshold=1)
+
+    with pytest.raises(FakeProviderError):
+        await router.call(MESSAGES)
+    with pytest.raises(RuntimeError, match=r"circuit open for \['primary'\]"):
+        await router.call(MESSAGES)
+    with pytest.raises(RuntimeError, match="circuit open"):
+        _ = [chunk async for chunk in router.stream(MESSAGES)]
+
+    assert backup.requests == 0
+
+
+async def test_open_circuit_is_probed_in_background():
+    primary = FakeProvider(script=[{"error": 500}, {"content": "scripted"}])
+    router = ModelRouter(failure_threshold=1, recovery_timeout=0.05)
+    router.register("primary", primary)
+    router.register("backup", FakeProvider())
+
+    await router.call(MESSAGES)
+    await asyncio.sleep(0.15)
+
+    assert primary.probes >= 1
+    assert primary.requests == 1  # Probes leave the script alone
+    assert (await router.call(MESSAGES)).content == "scripted"
+    assert router._health.breaker("primary").state == CircuitState.CLOSED
+    await router.close()
+
+
+async def test_rate_limited_request_is_retried_on_same_provider():
+    primary = FakeProvider(script=[{"error": 429}, {"content": "after backoff"}])
+    backup = FakeProvider()
+    router = make_router(primary, backup)
+
+    response = await router.call(MESSAGES)
+
+    assert response.content == "after backoff"
+    assert backup.requests == 0
+    assert router.stats()["rate_limits"]["primary"]["rate_limited"] == 1
+    # A 429 says nothing about the provider's health
+    assert router._health.breaker("primary").failures == 0
+
+
+async def test_session_affinity_pins_each_session():
+    router = make_router(
+        FakeProvider(), FakeProvider(), strategy=RoutingStrategy.ROUND_ROBIN, session_affinity=True
+    )
+
+    first = [(await call_in_session(router, "a")).provider for _ in range(3)]
+    second = [(await call_in_session(router, "b")).provider for _ in range(3)]
+
+    assert len(set(first)) == 1
+    assert len(set(second)) == 1
+    assert first[0] != second[0]  # New sessions are still balanced
+    assert router.stats()["affinity"]["sessions"] == {"primary": 1, "backup": 1}
+
+
+async def test_requests_outside_a_session_are_not_pinned():
+    router = make_router(
+        FakeProvider(), FakeProvider(), strategy=RoutingStrategy.ROUND_ROBIN, session_affinity=True
+    )
+
+    providers = [(await call_in_session(router, None)).provider for _ in range(4)]
+
+    assert providers == ["primary", "backup", "primary", "backup"]
+    assert router.stats()["affinity"]["sessions"] == {}
+
+
+async def test_pinned_session_moves_when_its_circuit_opens():
+    primary = FakeProvider(script=[{"content": "ok"}, {"error": 500}])
+    router = make_router(primary, FakeProvider(), session_affinity=True, failure_threshold=1)
+
+    assert (await call_in_session(router, "a")).provider == "primary"
+    assert (await call_in_session(router, "a")).provider == "backup"  # Fell back
+    assert (await call_in_session(router, "a")).provider == "backup"  # Moved
+
+    assert router.stats()["affinity"]["moves"] == 1
+
+
+async def test_latency_aware_ranks_calls_by_duration_and_streams_by_ttft():
+    router = make_router(
+        FakeProvider(),
+        FakeProvider(),
+        strategy=RoutingStrategy.LATENCY_AWARE,
+        latency_explore_rate=0,
+    )
+    # primary streams its first token sooner, backup finishes calls sooner
+    router._latency.record_success("primary", 2.0, ttft=0.1)
+    router._latency.record_success("backup", 2.0, ttft=0.5)
+    router._latency.record_success("primary", 1.0)
+    router._latency.record_success("backup", 0.2)
+
+    assert (await router.call(MESSAGES)).provider == "backup"
+    chunks = [chunk async for chunk in router.stream(MESSAGES)]
+    assert {chunk.provider for chunk in chunks} == {"primary"}
+
+
+def test_latency_version_moves_only_when_the_order_changes():
+    tracker = LatencyTracker(alpha=1.0, tail_weight=0)  # Scores are the last sample
+    tracker.add("a", priority=1)
+    tracker.add("b")
+    tracker.record_success("a", 1.0)
+    tracker.record_success("b", 2.0)
+    version = tracker.version
+
+    tracker.record_success("a", 1.5)
+    tracker.record_success("b", 1.8)  # Still slower than a
+    assert tracker.version == version
+
+    tracker.record_success("b", 0.1)
+    assert tracker.version == version + 1
+    assert tracker.order("duration") == ["b", "a"]
+    assert tracker.order("ttft") == ["a", "b"]  # No samples, priority decides
+
+
+async def test_latency_aware_explores_the_other_providers():
+    router = make_router(
+        FakeProvider(),
+        FakeProvider(),
+        strategy=RoutingStrategy.LATENCY_AWARE,
+        latency_explore_rate=1.0,
+    )
+    router._latency.record_success("primary", 0.1)
+    router._latency.record_success("backup", 5.0)
+
+    assert (await router.call(MESSAGES)).provider == "backup"
+    assert router.stats()["latency_explorations"] == 1
+
+
+def make_smart() -> ModelRouter:
+    router = ModelRouter(strategy=RoutingStrategy.SMART, health_probe=False)
+    router.register("cheap", FakeProvider(), priority=1, cost_per_1k_input=0.1)
+    router.register("default", FakeProvider(), priority=2, cost_per_1k_input=0.5, is_default=True)
+    router.register("strong", FakeProvider(), priority=3, cost_per_1k_input=1.0)
+    return router
+
+
+async def test_smart_routing_matches_provider_to_turn_complexity():
+    router = make_smart()
+    long_code = "```\n" + "x = 1\n" * 600 + "```"
+
+    simple = await router.call([{"role": "user", "content": "hi"}])
+    moderate = await router.call([{"role": "user", "content": "explain " * 120}])
+    complex_ = await router.call([{"role": "user", "content": long_code}])
+
+    assert [simple.provider, moderate.provider, complex_.provider] == [
+        "cheap",
+        "default",
+        "strong",
+    ]
+    assert router.stats()["complexity"] == {"simple": 1, "moderate": 1, "complex": 1}
+
+
+async def test_smart_routing_breaks_price_ties_by_latency():
+    router = make_smart()
+    router.register("cheap_fast", FakeProvider(), cost_per_1k_input=0.1)
+    router._latency.record_success("cheap", 2.0)
+    router._latency.record_success("cheap_fast", 0.5)
+
+    assert (await router.call(MESSAGES)).provider == "cheap_fast"
+
+
+def make_cascade(cheap_script: list[dict], ledger: UsageLedger | None = None) -> ModelRouter:
+    router = ModelRouter(strategy=RoutingStrategy.CASCADE, health_probe=False, ledger=ledger)
+    router.register("cheap", FakeProvider(script=cheap_script), cost_per_1k_input=0.1)
+    router.register(
+        "strong", FakeProvider(script=[{"content": "strong answer"}]), cost_per_1k_input=1.0
+    )
+    return router
+
+
+async def test_cascade_retry_keeps_usage_of_discarded_attempt():
+    ledger = UsageLedger()
+    cheap = [{"content": "", "usage": {"input_tokens": 1000, "output_tokens": 0}}]
+    router = make_cascade(cheap, ledger)
+
+    response = await call_in_session(router, "s")
+
+    assert response.content == "strong answer"
+    assert response.provider == "strong"
+    assert response.usage["input_tokens"] > 1000  # Both attempts
+    assert ledger.summary(provider="cheap").input_tokens == 1000
+    assert ledger.summary(provider="strong").requests == 1
+    assert router.stats()["cascade"]["retries"] == 1
+
+
+async def test_cascade_retries_unknown_tool_call():
+    cheap = [{"tool_calls": [{"name": "no_such_tool", "arguments": {}}]}]
+    router = make_cascade(cheap)
+    tools = [{"name": "file_read", "description": "", "input_schema": {}}]
+
+    response = await call_in_session(router, "s", tools=tools)
+
+    assert response.provider == "strong"
+    assert router.stats()["cascade"]["signals"] == {"unknown_tool": 1}
+
+
+async def test_cascade_level_lasts_for_the_turn_of_its_session():
+    router = make_cascade([{"content": ""}, {"content": "cheap answer"}])
+    tool_results = [
+        *MESSAGES,
+        {"role": "assistant", "content": [{"type": "tool_use", "id": "c", "name": "t"}]},
+        {"role": "user", "content": [{"type": "tool_result", "tool_use_id": "c"}]},
+    ]
+
+    assert (await call_in_session(router, "s")).provider == "strong"
+    # Later requests of the turn stay escalated, other sessions do not
+    assert (await call_in_session(router, "s", messages=tool_results)).provider == "strong"
+    assert router._cascade_levels == {"s": 1}
+    # A new turn starts cheap again
+    assert (await call_in_session(router, "s")).content == "cheap answer"
+
+
+async def test_cascade_without_session_keeps_no_state():
+    router = make_cascade([{"content": ""}, {"content": "cheap answer"}])
+
+    assert (await call_in_session(router, None)).provider == "strong"
+    assert (await call_in_session(router, None)).content == "cheap answer"
+    assert router._cascade_levels == {}
@@ -0,0 +1,104 @@
+"""Tests for incremental assembly of streamed text and JSON."""
+
+import json
+import random
+
+import pytest
+
+from honolulu.models.streaming import JSONAssembler, TextAssembler
+
+DOCUMENTS = [
+    {},
+    {"path": "/tmp/file.txt", "content": "line one\nline two"},
+    {"command": 'echo "quoted" \\ backslash', "timeout": 30},
+    {"nested": {"list": [1, 2.5, -3e2, True, False, None], "empty": {}}, "tail": []},
+    {"text": "unicode é 中文   emoji 🌺", "braces": "{[}]", "comma": "a,b"},
+    [{"a": 1}, {"b": [2, 3]}, "s"],
+]
+
+
+def fragments(text: str, rng: random.Random) -> list[str]:
+    """Split text at random positions, including single characters."""
+    parts = []
+    pos = 0
+    while pos < len(text):
+        size = rng.randint(1, 8)
+        parts.append(text[pos : pos + size])
+        pos += size
+    return parts
+
+
+def test_text_assembler_joins_fragments():
+    assembler = TextAssembler()
+    for part in ["Hel", "", "lo", " world"]:
+        assembler.append(part)
+
+    assert assembler.text() == "Hello world"
+    assert len(assembler) == 11
+    assembler.clear()
+    assert not assembler
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_json_assembler_matches_json_loads(document, ensure_ascii):
+    text = json.dumps(document, ensure_ascii=ensure_ascii)
+    rng = random.Random(text)
+
+    for _ in range(20):
+        assembler = JSONAssembler()
+        for part in fragments(text, rng):
+            assert not assembler.complete
+            assembler.append(part)
+            partial = assembler.parse_partial()
+            # A partial parse is always a prefix of the right shape
+            assert partial is None or type(partial) is type(document)
+
+        assert assembler.complete
+        assert assembler.parse() == json.loads(text)
+        assert assembler.parse_partial() == json.loads(text)
+
+
+def test_parse_partial_closes_open_string_and_containers():
+    assembler = JSONAssembler()
+    assembler.append('{"path": "/tmp/fo')
+    assert assembler.parse_partial() == {"path": "/tmp/fo"}
+
+    assembler.append('o", "lines": [1, 2')
+    assert assembler.parse_partial() == {"path": "/tmp/foo", "lines": [1, 2]}
+
+
+def test_parse_partial_drops_incomplete_key_or_value():
+    assembler = JSONAssembler()
+    assembler.append('{"a": 1, "b": tr')
+    assert assembler.parse_partial() == {"a": 1}
+
+    assembler.clear()
+    assembler.append('{"a": 1, "ke')
+    assert assembler.parse_partial() == {"a": 1}
+
+
+def test_escape_split_across_fragments():
+    assembler = JSONAssembler()
+    for part in ['{"a": "x\\', '"', 'y"}']:
+        assembler.append(part)
+
+    assert assembler.parse() == {"a": 'x"y'}
+
+
+def test_parse_partial_without_content():
+    assembler = JSONAssembler()
+    assert assembler.parse_partial() is None
+    assembler.append("  ")
+    assert assembler.parse_partial() is None
+
+
+def test_preview_waits_for_document_to_grow():
+    assembler = JSONAssembler()
+    assembler.append('{"content": "')
+    assert assembler.preview() is None
+
+    assembler.append("x" * 100)
+    assert assembler.preview() == {"content": "x" * 100}
+    assembler.append("y")
+    assert assembler.preview() is None  # Not doubled since the last preview
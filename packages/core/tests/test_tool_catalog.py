@@ -0,0 +1,71 @@
+"""Tests for the shared tool catalog and its per-session forks."""
+
+from honolulu.agent import Agent
+from honolulu.models.base import ToolCall
+from honolulu.models.fake import FakeProvider
+from honolulu.tools import ReadResultTool, ResultStore, ToolManager, get_builtin_tools
+
+
+def make_catalog() -> ToolManager:
+    catalog = ToolManager()
+    catalog.register_all(get_builtin_tools())
+    catalog.register(ReadResultTool())
+    return catalog
+
+
+def test_forks_share_definitions_until_changed():
+    catalog = make_catalog()
+    first, second = catalog.fork(), catalog.fork()
+
+    assert first.get_tool_definitions() is second.get_tool_definitions()
+
+    first.unregister("read_result")
+    assert first.get_tool_definitions() is not second.get_tool_definitions()
+    assert second.get("read_result") is not None
+    assert catalog.get("read_result") is not None
+
+
+async def test_sessions_read_their_own_result_store():
+    catalog = make_catalog()
+    agents = [
+        Agent(FakeProvider(), catalog.fork(), result_store=ResultStore(threshold=1000))
+        for _ in range(2)
+    ]
+    definitions = catalog.get_tool_definitions()
+    handles = [
+        await agent.result_store.put(f"output of session {i}") for i, agent in enumerate(agents)
+    ]
+
+    for i, agent in enumerate(agents):
+        # Registering read_result again would have forked the catalog
+        assert agent.tool_manager.get_tool_definitions() is definitions
+        call = ToolCall(id="c", name="read_result", arguments={"handle": handles[i]})
+        result = await agent._execute_tool(call)
+        assert result.success
+        assert result.output.endswith(f"output of session {i}")
+
+        other = ToolCall(id="c", name="read_result", arguments={"handle": handles[1 - i]})
+        assert not (await agent._execute_tool(other)).success
+
+
+async def test_standalone_agent_registers_read_result():
+    agent = Agent(FakeProvider(), ToolManager(), result_store=ResultStore())
+
+    assert agent.tool_manager.get("read_result") is not None
+
+
+async def test_config_reload_rebuilds_the_catalog(tmp_path, monkeypatch):
+    from honolulu.server import app
+
+    monkeypatch.chdir(tmp_path)
+    # Reloading replaces these globals; restore them afterwards
+    for name in ("config", "model_router", "tool_catalog"):
+        monkeypatch.setattr(app, name, getattr(app, name))
+    app.tool_catalog = None
+    (tmp_path / "config").mkdir()
+    (tmp_path / "config" / "default.yaml").write_text("tools:\n  result_offload_threshold: 0\n")
+    assert app._get_tool_catalog().get("read_result") is not None  # Default config
+
+    assert (await app.reload_config())["success"]
+
+    assert app._get_tool_catalog().get("read_result") is None
@@ -1,7 +1,15 @@
-import type { AppConfig, SubAgentInfo } from '../types'
+import type { AppConfig, Attachment, SubAgentInfo } from '../types'
 
 const BASE_URL = '/api'
 
+export function attachmentUrl(attachment: Attachment): string {
+  // Messages saved before uploads moved server-side still carry inline data
+  if (attachment.base64) {
+    return `data:${attachment.contentType};base64,${attachment.base64}`
+  }
+  return `${BASE_URL}/attachments/${attachment.id}`
+}
+
 export interface StartChatOptions {
   message: string
   sessionId?: string
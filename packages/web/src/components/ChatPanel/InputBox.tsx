@@ -1,5 +1,6 @@
 import { useState, useCallback, useRef, KeyboardEvent } from 'react'
 import { Send, Paperclip, X, FileText, Loader2 } from 'lucide-react'
+import { attachmentUrl } from '../../api/client'
 import type { Attachment } from '../../types'
 
 interface InputBoxProps {
@@ -74,17 +75,17 @@ export function InputBox({ onSend, disabled }: InputBoxProps) {
 
         const data = await response.json()
 
-        // Add to attachments
+        // Add to attachments (identical files share one server-side id)
         const attachment: Attachment = {
           id: data.id,
           type: data.type,
           filename: data.filename,
           contentType: data.content_type,
-          base64: data.base64,
-          text: data.text,
           pageCount: data.page_count,
         }
-        setAttachments(prev => [...prev, attachment])
+        setAttachments(prev =>
+          prev.some(a => a.id === attachment.id) ? prev : [...prev, attachment]
+        )
       }
     } catch (error) {
       console.error('Upload error:', error)
@@ -126,7 +127,7 @@ export function InputBox({ onSend, disabled }: InputBoxProps) {
               {attachment.type === 'image' ? (
                 <>
                   <img
-                    src={`data:${attachment.contentType};base64,${attachment.base64}`}
+                    src={attachmentUrl(attachment)}
                     alt={attachment.filename}
                     className="w-10 h-10 object-cover rounded"
                   />
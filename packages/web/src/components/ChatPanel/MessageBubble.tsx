@@ -2,6 +2,7 @@ import ReactMarkdown from 'react-markdown'
 import { Prism as SyntaxHighlighter } from 'react-syntax-highlighter'
 import { oneDark } from 'react-syntax-highlighter/dist/esm/styles/prism'
 import { User, Bot, FileText } from 'lucide-react'
+import { attachmentUrl } from '../../api/client'
 import type { Message, Attachment } from '../../types'
 
 interface MessageBubbleProps {
@@ -14,7 +15,7 @@ function AttachmentPreview({ attachment }: { attachment: Attachment }) {
     return (
       <div className="mt-2">
         <img
-          src={`data:${attachment.contentType};base64,${attachment.base64}`}
+          src={attachmentUrl(attachment)}
           alt={attachment.filename}
           className="max-w-[300px] max-h-[300px] rounded-lg object-contain"
         />
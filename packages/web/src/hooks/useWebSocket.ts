@@ -44,7 +44,8 @@ export function useWebSocket({ sessionId, onMessage, onError, onClose }: UseWebS
         content,
       }
       if (attachments && attachments.length > 0) {
-        message.attachments = attachments
+        // Files live on the server, only send their handles
+        message.attachments = attachments.map(({ id, type, filename }) => ({ id, type, filename }))
       }
       wsRef.current.send(JSON.stringify(message))
     } else {
@@ -10,8 +10,8 @@ export interface Attachment {
   type: 'image' | 'document';
   filename: string;
   contentType: string;
-  base64?: string;  // For images
-  text?: string;    // For PDF documents (extracted text)
+  base64?: string;  // For images (legacy; uploads are now stored server-side)
+  text?: string;    // For PDF documents (extracted text, legacy)
   pageCount?: number;  // For PDF documents
 }
 